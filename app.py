@@ -1,6 +1,7 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from mcp_controller import MCPController
+import json_codec
 import os
 from dotenv import load_dotenv
 
@@ -35,6 +36,33 @@ def process_command():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/process_command/stream', methods=['POST'])
+def process_command_stream():
+    """사용자 명령을 처리하면서 진행 상황과 생성 중인 텍스트를 스트리밍하는 API 엔드포인트
+    
+    기본은 Server-Sent Events(text/event-stream)이며, ?format=ndjson이면 한 줄에 하나의 JSON 이벤트를 보냅니다.
+    이벤트: intent, database, token, page_created, result, error
+    """
+    data = request.json or {}
+    command = data.get('command')
+    if not command:
+        return jsonify({"error": "명령이 제공되지 않았습니다."}), 400
+    
+    ndjson = request.args.get('format') == 'ndjson'
+    
+    def generate():
+        for event, payload in controller.process_command_stream(command):
+            if ndjson:
+                yield json_codec.dumps(dict(payload, event=event)) + "\n"
+            else:
+                yield f"event: {event}\ndata: {json_codec.dumps(payload)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/databases', methods=['GET'])
 def get_databases():
     """사용 가능한 데이터베이스 목록을 반환하는 API 엔드포인트"""
@@ -44,6 +72,42 @@ def get_databases():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/pages/bulk', methods=['POST'])
+def create_pages_bulk():
+    """데이터베이스에 여러 페이지를 한 번에 생성하는 API 엔드포인트
+    
+    요청 본문: {"database": "이름 또는 ID", "rows": [{"속성 이름": 값, ...}, ...]}
+    """
+    try:
+        data = request.json or {}
+        database = data.get('database')
+        rows = data.get('rows')
+        
+        if not database or not isinstance(rows, list) or not rows:
+            return jsonify({"error": "database와 rows가 필요합니다."}), 400
+        
+        result = controller.create_pages_bulk(database, rows)
+        if 'error' in result:
+            return jsonify(result), 404
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """성능 관련 통계를 반환하는 API 엔드포인트"""
+    single_flight = controller.notion_client.single_flight
+    llm_cache = controller.openai_client.cache
+    return jsonify({
+        "notion_rate_limiter": controller.notion_client.rate_limiter.stats(),
+        "notion_single_flight": single_flight.stats() if single_flight else None,
+        "intent_classifier": controller.intent_classifier.stats() if controller.intent_classifier else None,
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "conversation": controller.conversation.stats(),
+        "llm_tokens": controller.openai_client.token_usage.stats(),
+        "llm_calls": controller.openai_client.policy.stats()
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """API 서버 상태 확인 엔드포인트"""
@@ -0,0 +1,325 @@
+import os
+import json_codec
+import time
+import asyncio
+import logging
+import httpx
+from dotenv import load_dotenv
+from notion_client import (
+    NotionMCPClient,
+    NotionAPIError,
+    get_shared_rate_limiter,
+    MAX_PAGE_SIZE,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_BACKOFF_BASE,
+    DEFAULT_BACKOFF_CAP,
+    RETRYABLE_STATUS_CODES
+)
+from notion_blocks import iter_upload_chunks
+from rate_limiter import backoff_delay, parse_retry_after
+from mcp_logging import get_logger, truncate, should_log_payload
+
+# .env 파일에서 환경 변수 로드
+load_dotenv()
+
+logger = get_logger("notion.async")
+
+# 동시에 진행할 수 있는 노션 요청 수 기본값 (팬아웃 작업용)
+DEFAULT_ASYNC_CONCURRENCY = int(os.getenv("NOTION_ASYNC_CONCURRENCY", "8"))
+
+
+class AsyncNotionMCPClient:
+    """NotionMCPClient의 asyncio 버전입니다.
+
+    하나의 httpx.AsyncClient 커넥션 풀을 공유하며, 레이트 리미터는 같은 API 키를 쓰는
+    동기 클라이언트와 공유합니다. `async with` 블록으로 사용하거나 aclose()로 닫습니다.
+    """
+
+    def __init__(self, api_key=None, http_client=None, pool_maxsize=None,
+                 connect_timeout=None, read_timeout=None, rate_limiter=None,
+                 max_retries=None, concurrency=None):
+        # API 키를 인자로 받거나 환경 변수에서 가져옴
+        self.api_key = api_key or os.getenv("NOTION_API_KEY")
+        if not self.api_key:
+            raise ValueError("Notion API 키가 필요합니다.")
+
+        self.base_url = os.getenv("NOTION_BASE_URL", "https://api.notion.com/v1").rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Notion-Version": "2022-06-28"  # 노션 API 버전
+        }
+
+        # http_client를 넘기면 여러 클라이언트가 같은 커넥션 풀을 공유
+        self._owns_http_client = http_client is None
+        if http_client is None:
+            pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize
+                ),
+                timeout=httpx.Timeout(
+                    read_timeout or DEFAULT_READ_TIMEOUT,
+                    connect=connect_timeout or DEFAULT_CONNECT_TIMEOUT
+                )
+            )
+        self.http_client = http_client
+
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter(self.api_key)
+        self.max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        self.concurrency = concurrency or DEFAULT_ASYNC_CONCURRENCY
+        logger.info("노션 비동기 클라이언트 초기화됨: API 키 = %s...%s", self.api_key[:4], self.api_key[-4:])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """직접 생성한 HTTP 클라이언트를 닫습니다."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def _request(self, method, url, payload=None, params=None):
+        """레이트 리밋과 재시도를 적용하여 노션 API 요청을 보내고 JSON을 반환합니다."""
+        # 본문은 한 번만 직렬화해서 전송과 로그(크기 측정)에 함께 사용
+        body = json_codec.dumps_bytes(payload) if payload is not None else None
+        if body is not None and logger.isEnabledFor(logging.DEBUG) and should_log_payload(len(body)):
+            logger.debug("노션 API 요청 본문 %s %s: %s", method, url, truncate(body.decode("utf-8")))
+
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async()
+            started = time.perf_counter()
+            response = await self.http_client.request(
+                method,
+                url,
+                headers=self.headers,
+                content=body,
+                params=params
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("노션 API 호출", extra={"fields": {
+                    "method": method,
+                    "url": url,
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "bytes_out": len(body) if body else 0,
+                    "bytes_in": len(response.content),
+                    "attempt": attempt
+                }})
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                if response.status_code != 200:
+                    logger.warning("노션 API 오류 %s %s: %s", method, url, truncate(response.text))
+                return json_codec.loads(response.content)
+
+            attempt += 1
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP)
+                logger.warning("레이트 리밋(429), %.2f초 후 재시도 (%d/%d)", delay, attempt, self.max_retries)
+                # 같은 통합의 모든 요청을 멈춤 (대기는 다음 acquire_async()에서 이루어짐)
+                self.rate_limiter.pause(delay)
+            else:
+                delay = backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP)
+                logger.warning("상태 코드 %d, %.2f초 후 재시도 (%d/%d)", response.status_code, delay, attempt, self.max_retries)
+                await asyncio.sleep(delay)
+
+    async def get_databases(self):
+        """사용자가 접근 가능한 데이터베이스 목록을 가져옵니다."""
+        payload = {
+            "filter": {
+                "value": "database",
+                "property": "object"
+            },
+            "sort": {
+                "direction": "descending",
+                "timestamp": "last_edited_time"
+            }
+        }
+        return await self._request("POST", f"{self.base_url}/search", payload)
+
+    async def get_database(self, database_id):
+        """특정 데이터베이스의 정보를 가져옵니다."""
+        return await self._request("GET", f"{self.base_url}/databases/{database_id}")
+
+    async def query_database(self, database_id, filter_params=None, start_cursor=None, page_size=None):
+        """데이터베이스에서 데이터를 쿼리합니다 (한 페이지)."""
+        payload = dict(filter_params) if filter_params else {}
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+        if page_size:
+            payload["page_size"] = page_size
+        return await self._request("POST", f"{self.base_url}/databases/{database_id}/query", payload)
+
+    async def create_page(self, parent_id, properties, children=None):
+        """새 페이지를 생성합니다.
+
+        동기 클라이언트와 같이 첫 번째 블록 청크만 생성 요청에 담고 나머지는 생성 후 순서대로 추가합니다.
+        """
+        payload = {
+            "parent": {"database_id": parent_id},
+            "properties": properties
+        }
+        chunks = iter_upload_chunks(children)
+        try:
+            first_chunk = await self._next_chunk(chunks)
+            if first_chunk:
+                payload["children"] = first_chunk
+            page = await self._request("POST", f"{self.base_url}/pages", payload)
+            if 'id' not in page:
+                return page
+            index = 1
+            while (chunk := await self._next_chunk(chunks)) is not None:
+                index += 1
+                result = await self._append_block_chunk(page['id'], chunk)
+                if 'results' not in result:
+                    logger.error("페이지 %s에 %d번째 블록 청크 추가 실패", page['id'], index)
+                    page['append_error'] = result
+                    break
+            return page
+        finally:
+            chunks.close()
+
+    async def append_block_children(self, block_id, children):
+        """블록에 하위 항목을 추가합니다.
+
+        100개 제한과 2000자 제한에 맞게 나눈 뒤 순서대로 여러 번에 걸쳐 추가합니다.
+        """
+        result = None
+        appended = []
+        chunks = iter_upload_chunks(children)
+        try:
+            while (chunk := await self._next_chunk(chunks)) is not None:
+                result = await self._append_block_chunk(block_id, chunk)
+                if 'results' not in result:
+                    # 실패하면 중단 (이후 청크를 추가하면 순서가 어긋남)
+                    return result
+                appended.extend(result['results'])
+        finally:
+            chunks.close()
+
+        if result is None:
+            return {"object": "list", "results": []}
+        result['results'] = appended
+        return result
+
+    async def _append_block_chunk(self, block_id, children):
+        """블록에 하위 항목 한 청크(최대 100개)를 추가합니다."""
+        payload = {"children": children}
+        return await self._request("PATCH", f"{self.base_url}/blocks/{block_id}/children", payload)
+
+    async def _next_chunk(self, chunks):
+        """다음 블록 청크를 반환합니다 (없으면 None). 청크를 기다리는 동안 이벤트 루프를 막지 않습니다."""
+        return await asyncio.to_thread(next, chunks, None)
+
+    async def get_block_children(self, block_id, start_cursor=None, page_size=None):
+        """블록의 하위 항목을 가져옵니다 (한 페이지)."""
+        params = {}
+        if start_cursor:
+            params["start_cursor"] = start_cursor
+        if page_size:
+            params["page_size"] = page_size
+        return await self._request("GET", f"{self.base_url}/blocks/{block_id}/children", params=params or None)
+
+    async def search(self, query="", filter_params=None, sort_params=None, start_cursor=None, page_size=None):
+        """노션 내 객체를 검색합니다 (한 페이지)."""
+        payload = {}
+        if query:
+            payload["query"] = query
+        if filter_params:
+            payload["filter"] = filter_params
+        if sort_params:
+            payload["sort"] = sort_params
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+        if page_size:
+            payload["page_size"] = page_size
+        return await self._request("POST", f"{self.base_url}/search", payload)
+
+    async def _iter_paginated(self, fetch_page, page_size=None, max_items=None):
+        """커서를 따라가며 결과를 하나씩 반환합니다. 다음 페이지는 미리 요청합니다."""
+        page_size = min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+        if max_items is not None and max_items <= 0:
+            return
+
+        def next_size(fetched):
+            if max_items is None:
+                return page_size
+            return max(1, min(page_size, max_items - fetched))
+
+        task = asyncio.ensure_future(fetch_page(None, next_size(0)))
+        fetched = 0
+        yielded = 0
+        try:
+            while task is not None:
+                result = await task
+                if 'results' not in result:
+                    raise NotionAPIError(result)
+
+                results = result['results']
+                fetched += len(results)
+
+                task = None
+                next_cursor = result.get('next_cursor')
+                if result.get('has_more') and next_cursor and (max_items is None or fetched < max_items):
+                    task = asyncio.ensure_future(fetch_page(next_cursor, next_size(fetched)))
+
+                for item in results:
+                    if max_items is not None and yielded >= max_items:
+                        return
+                    yield item
+                    yielded += 1
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    def iter_query_database(self, database_id, filter_params=None, page_size=None, max_items=None):
+        """데이터베이스 쿼리 결과 전체를 비동기 이터레이터로 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.query_database(database_id, filter_params, cursor, size),
+            page_size,
+            max_items
+        )
+
+    def iter_block_children(self, block_id, page_size=None, max_items=None):
+        """블록의 하위 항목 전체를 비동기 이터레이터로 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.get_block_children(block_id, cursor, size),
+            page_size,
+            max_items
+        )
+
+    def iter_search(self, query="", filter_params=None, sort_params=None, page_size=None, max_items=None):
+        """검색 결과 전체를 비동기 이터레이터로 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.search(query, filter_params, sort_params, cursor, size),
+            page_size,
+            max_items
+        )
+
+    async def get_blocks_for_pages(self, page_ids, concurrency=None):
+        """여러 페이지의 블록 목록을 동시에 가져옵니다.
+
+        {page_id: [block, ...]} 형태로 반환하며, 실패한 페이지는 NotionAPIError 객체를 값으로 가집니다.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def fetch(page_id):
+            async with semaphore:
+                try:
+                    return page_id, [block async for block in self.iter_block_children(page_id)]
+                except NotionAPIError as e:
+                    return page_id, e
+
+        results = await asyncio.gather(*(fetch(page_id) for page_id in page_ids))
+        return dict(results)
+
+    # 제목 추출 로직은 동기 클라이언트와 동일
+    _extract_title_from_database = NotionMCPClient._extract_title_from_database
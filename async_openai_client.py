@@ -0,0 +1,273 @@
+import os
+import asyncio
+import httpx
+from openai import AsyncAzureOpenAI
+from dotenv import load_dotenv
+import json_codec
+from llm_cache import LLMCache, CACHE_ENABLED
+from llm_policy import LLMCallPolicy
+from token_counter import TokenUsage
+from openai_client import (
+    LLM_BACKEND,
+    DEFAULT_TOOL_CALLING,
+    COMMAND_TEMPERATURE,
+    NOTION_TOOLS,
+    INTENT_SYSTEM_PROMPT,
+    ROUTE_SYSTEM_PROMPT,
+    CHAT_SYSTEM_PROMPT,
+    content_prompt,
+    build_command_prompt,
+    record_usage,
+    record_stream_usage,
+    cache_key,
+    completion_result,
+    default_command_action,
+    parse_intent_response,
+    parse_route_message
+)
+from mcp_logging import get_logger
+
+# .env 파일에서 환경 변수 로드
+load_dotenv()
+
+logger = get_logger("openai.async")
+
+# 동시에 진행할 수 있는 LLM 요청 수 기본값
+DEFAULT_ASYNC_CONCURRENCY = int(os.getenv("OPENAI_ASYNC_CONCURRENCY", "16"))
+# 공유 커넥션 풀 크기 (동시 요청 수보다 작으면 요청이 연결을 기다림)
+DEFAULT_POOL_MAXSIZE = int(os.getenv("OPENAI_POOL_MAXSIZE", str(DEFAULT_ASYNC_CONCURRENCY)))
+DEFAULT_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+
+class AsyncOpenAIMCPClient:
+    """OpenAIMCPClient의 asyncio 버전입니다.
+
+    하나의 httpx.AsyncClient 커넥션 풀을 공유하고, 세마포어로 동시에 진행하는 LLM 호출 수를
+    제한합니다 (헤지 요청은 원래 호출의 자리를 함께 사용). 프롬프트와 응답 파싱, 응답 캐시,
+    호출 정책(마감 시간, 재시도, 헤지), OPENAI_BACKEND=fake 지원은 동기 클라이언트와 같습니다.
+    `async with` 블록으로 사용하거나 aclose()로 닫습니다.
+    """
+
+    def __init__(self, api_key=None, http_client=None, concurrency=None, cache=None, pool_maxsize=None, policy=None):
+        # API 키를 인자로 받거나 환경 변수에서 가져옴
+        self.api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
+        if not self.api_key and LLM_BACKEND != "fake":
+            raise ValueError("Azure OpenAI API 키가 필요합니다.")
+
+        self.tool_calling = DEFAULT_TOOL_CALLING
+
+        # http_client를 넘기면 여러 클라이언트가 같은 커넥션 풀을 공유
+        self._owns_http_client = http_client is None
+        if http_client is None:
+            pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize
+                ),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT)
+            )
+        self.http_client = http_client
+
+        if LLM_BACKEND == "fake":
+            # 오프라인 벤치마크/테스트용 가짜 백엔드 (API 키와 네트워크 불필요)
+            from fake_openai import FakeAsyncAzureOpenAI
+            self.client = FakeAsyncAzureOpenAI()
+            logger.info("가짜 LLM 백엔드 사용 (OPENAI_BACKEND=fake)")
+        else:
+            # Azure OpenAI 비동기 클라이언트 설정
+            self.client = AsyncAzureOpenAI(
+                api_key=self.api_key,
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                http_client=self.http_client,
+                # 재시도와 타임아웃은 호출 정책(self.policy)에서 호출 종류별로 처리
+                max_retries=0
+            )
+        # 동기 클라이언트의 policy를 넘기면 지연 기록(헤지 기준)과 호출 통계를 공유
+        self.policy = policy or LLMCallPolicy()
+
+        self.concurrency = concurrency or DEFAULT_ASYNC_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        # 동기 클라이언트의 cache를 넘기면 두 클라이언트가 같은 응답 캐시를 사용
+        if cache is None and CACHE_ENABLED:
+            cache = LLMCache()
+        self.cache = cache
+        self.token_usage = TokenUsage()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """직접 생성한 HTTP 클라이언트를 닫습니다."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def _complete(self, kind, messages, temperature, cache_if=None, on_token=None, label=None, saved_tokens=0, **options):
+        """채팅 완성을 요청하고 {"content", "tool_calls": [{"name", "arguments"}]}를 반환합니다.
+
+        캐시, 스트리밍, 호출 정책 동작은 OpenAIMCPClient._complete와 같습니다.
+        응답 캐시의 디스크(SQLite) 입출력이 이벤트 루프를 막지 않도록 캐시 조회와 저장은 스레드에서 실행합니다.
+        """
+        label = label or kind or "chat"
+        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        key = cache_key(self.cache, kind, deployment, messages, temperature, **options)
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                logger.debug("LLM 캐시 적중 (%s)", kind)
+                if on_token and cached["content"]:
+                    on_token(cached["content"])
+                return cached
+
+        async with self._semaphore:
+            if on_token is not None:
+                emitted = []
+
+                def on_piece(text):
+                    emitted.append(text)
+                    on_token(text)
+
+                # 이미 전달한 텍스트가 있으면 중복되지 않도록 재시도하지 않고, 헤지 요청도 보내지 않음
+                content = await self.policy.acall(
+                    label,
+                    lambda timeout: self._stream_content(deployment, messages, temperature, on_piece, timeout=timeout, **options),
+                    hedge=False,
+                    retry_if=lambda: not emitted
+                )
+                result = {"content": content, "tool_calls": []}
+                record_stream_usage(self.token_usage, label, deployment, messages, content, saved_tokens)
+            else:
+                response = await self.policy.acall(
+                    label,
+                    lambda timeout: self.client.chat.completions.create(
+                        model=deployment,
+                        messages=messages,
+                        temperature=temperature,
+                        timeout=timeout,
+                        **options
+                    )
+                )
+                record_usage(self.token_usage, label, response.usage, saved_tokens)
+                result = completion_result(response)
+
+        if key is not None and (cache_if is None or cache_if(result)):
+            await asyncio.to_thread(self.cache.set, kind, key, result)
+        return result
+
+    async def _stream_content(self, deployment, messages, temperature, on_token, **options):
+        """스트리밍으로 채팅 완성을 받아 조각마다 on_token을 호출하고 전체 텍스트를 반환합니다."""
+        stream = await self.client.chat.completions.create(
+            model=deployment,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            **options
+        )
+        pieces = []
+        async for chunk in stream:
+            # Azure는 콘텐츠 필터 결과만 담긴(choices가 빈) 조각을 보내기도 함
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                pieces.append(text)
+                on_token(text)
+        return "".join(pieces)
+
+    async def analyze_intent(self, user_input):
+        """사용자 입력의 의도를 분석합니다."""
+        try:
+            response = await self._complete(
+                "intent",
+                [
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_input}
+                ],
+                0.3
+            )
+            return parse_intent_response(response["content"])
+        except Exception as e:
+            logger.error("의도 분석 오류: %s", e)
+            return {"intent": "general_chat", "explanation": "오류 발생"}
+
+    async def route_command(self, user_input, conversation_history=None):
+        """의도 분석과 명령 파싱을 도구 호출 한 번으로 처리합니다 (실패하면 None)."""
+        messages = [{"role": "system", "content": ROUTE_SYSTEM_PROMPT}]
+        if conversation_history:
+            messages.extend(conversation_history)
+        messages.append({"role": "user", "content": user_input})
+
+        try:
+            message = await self._complete(
+                "route",
+                messages,
+                0.3,
+                cache_if=lambda result: bool(result["tool_calls"]),
+                tools=NOTION_TOOLS,
+                tool_choice="auto"
+            )
+        except Exception as e:
+            logger.warning("도구 호출 라우팅 실패, 2단계 분석으로 대체: %s", e)
+            return None
+
+        return parse_route_message(message)
+
+    async def chat(self, user_input, conversation_history=None, on_token=None):
+        """일반적인 대화를 처리합니다. on_token이 주어지면 답변을 스트리밍으로 전달합니다."""
+        try:
+            messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]
+            if conversation_history:
+                messages.extend(conversation_history)
+            messages.append({"role": "user", "content": user_input})
+
+            response = await self._complete(None, messages, 0.7, on_token=on_token)
+            return response["content"]
+        except Exception as e:
+            return f"대화 처리 오류: {str(e)}"
+
+    async def generate_text(self, prompt, model=None, max_tokens=1000, temperature=0.7, system_prompt=None, cache_kind="text", on_token=None):
+        """텍스트를 생성합니다 (OpenAIMCPClient.generate_text와 같은 인자)."""
+        try:
+            messages = [
+                {"role": "system", "content": system_prompt or "You are a helpful assistant."},
+                {"role": "user", "content": prompt}
+            ]
+            response = await self._complete(cache_kind, messages, temperature, on_token=on_token, max_tokens=max_tokens)
+            return response["content"]
+        except Exception as e:
+            return f"텍스트 생성 오류: {str(e)}"
+
+    async def generate_notion_content(self, prompt, content_type="text", on_token=None):
+        """노션에 적합한 콘텐츠를 생성합니다."""
+        return await self.generate_text(content_prompt(prompt, content_type), on_token=on_token)
+
+    async def generate_many(self, prompts, content_type="text"):
+        """여러 프롬프트의 노션 콘텐츠를 동시에 생성해 입력 순서대로 반환합니다.
+
+        동시에 진행하는 요청 수는 concurrency로 제한됩니다.
+        """
+        return await asyncio.gather(*(self.generate_notion_content(prompt, content_type) for prompt in prompts))
+
+    async def parse_notion_command(self, command):
+        """사용자 명령을 분석하여 노션 작업으로 변환합니다."""
+        try:
+            system_prompt, saved_tokens = build_command_prompt(command)
+            response = (await self._complete(
+                "command",
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"다음 사용자 명령을 노션 작업으로 변환해주세요: {command}"}
+                ],
+                COMMAND_TEMPERATURE,
+                saved_tokens=saved_tokens,
+                max_tokens=1000
+            ))["content"]
+            return json_codec.extract_object(response) or default_command_action(command)
+        except Exception as e:
+            logger.error("명령 파싱 오류: %s", e)
+            return default_command_action(command, "오류로 인한 기본 작업 수행")
@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from collections import deque
+from token_counter import count_message_tokens
+from mcp_logging import get_logger
+
+logger = get_logger("conversation")
+
+# 대화 기록(요약 + 최근 대화)에 사용할 프롬프트 토큰 예산.
+# 배포별로 CONVERSATION_TOKEN_BUDGET_<배포 이름> 환경 변수로 덮어쓸 수 있음 (영숫자 외 문자는 _로 바꾸고 대문자로)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "2000"))
+# 밀려난 대화를 접어 넣는 요약의 최대 토큰 수
+DEFAULT_SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "300"))
+
+SUMMARY_PREFIX = "지금까지의 대화 요약:\n"
+
+
+def token_budget_for(deployment):
+    """배포 이름에 맞는 대화 기록 토큰 예산을 반환합니다."""
+    if deployment:
+        name = re.sub(r"[^0-9A-Za-z]", "_", deployment).upper()
+        value = os.getenv(f"CONVERSATION_TOKEN_BUDGET_{name}")
+        if value:
+            return int(value)
+    return DEFAULT_TOKEN_BUDGET
+
+
+class ConversationWindow:
+    """토큰 예산 안에서 최근 대화를 유지하고, 밀려난 대화는 요약으로 접어 넣는 대화 기록입니다.
+
+    예산을 넘으면 가장 오래된 대화 쌍부터 제거하며, 가장 최근 대화는 항상 유지합니다.
+    summarizer(이전 요약, 밀려난 메시지 목록, 최대 토큰 수) -> 새 요약 이 주어지면 제거된 대화를
+    백그라운드 스레드에서 요약하므로 요청 처리 경로가 요약 호출을 기다리지 않습니다.
+    """
+
+    def __init__(self, summarizer=None, token_budget=None, summary_max_tokens=None, deployment=None):
+        self.deployment = deployment or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        self.token_budget = token_budget or token_budget_for(self.deployment)
+        self.summary_max_tokens = summary_max_tokens or DEFAULT_SUMMARY_MAX_TOKENS
+        self.summarizer = summarizer
+        self._turns = deque()      # (메시지 목록, 토큰 수)
+        self._turn_tokens = 0
+        self._summary = ""
+        self._summary_tokens = 0
+        self._pending = []         # 요약을 기다리는 밀려난 메시지
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {"turns": 0, "evicted_turns": 0, "summaries": 0, "summary_failures": 0, "dropped_turns": 0}
+
+    def messages(self):
+        """프롬프트에 넣을 대화 기록 메시지 목록 (요약이 있으면 맨 앞에 system 메시지로)을 반환합니다."""
+        with self._lock:
+            messages = [{"role": "system", "content": SUMMARY_PREFIX + self._summary}] if self._summary else []
+            for turn, _ in self._turns:
+                messages.extend(turn)
+        return messages
+
+    def add_turn(self, user_input, response):
+        """사용자 입력과 답변 한 쌍을 기록하고, 예산을 넘으면 오래된 대화를 밀어냅니다."""
+        turn = [
+            {"role": "user", "content": user_input},
+            {"role": "assistant", "content": response or ""}
+        ]
+        tokens = sum(count_message_tokens(message, self.deployment) for message in turn)
+        with self._lock:
+            self._turns.append((turn, tokens))
+            self._turn_tokens += tokens
+            self._stats["turns"] += 1
+            evicted = self._evict_locked()
+            if evicted:
+                if self.summarizer is None:
+                    self._stats["dropped_turns"] += evicted
+                elif self._worker is None:
+                    self._worker = threading.Thread(target=self._summarize_pending, name="conversation-summary", daemon=True)
+                    self._worker.start()
+
+    def _evict_locked(self):
+        """예산을 넘는 동안 가장 오래된 대화를 제거하고 제거한 대화 수를 반환합니다."""
+        evicted = 0
+        while len(self._turns) > 1 and self._summary_tokens + self._turn_tokens > self.token_budget:
+            turn, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            if self.summarizer is not None:
+                self._pending.extend(turn)
+            evicted += 1
+        self._stats["evicted_turns"] += evicted
+        return evicted
+
+    def _summarize_pending(self):
+        """밀려난 대화가 남아 있는 동안 요약에 접어 넣습니다 (백그라운드 스레드)."""
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                summary = self._summary
+                if not pending:
+                    self._worker = None
+                    return
+            try:
+                new_summary = (self.summarizer(summary, pending, self.summary_max_tokens) or "").strip()
+            except Exception as e:
+                # 요약에 실패하면 이전 요약을 유지하고 해당 대화는 버림
+                logger.warning("대화 요약 실패: %s", e)
+                with self._lock:
+                    self._stats["summary_failures"] += 1
+                    self._stats["dropped_turns"] += len(pending) // 2
+                continue
+            with self._lock:
+                self._summary = new_summary
+                self._summary_tokens = count_message_tokens({"content": SUMMARY_PREFIX + new_summary}, self.deployment)
+                self._stats["summaries"] += 1
+                # 요약이 길어져 예산을 넘으면 최근 대화를 더 밀어냄 (다음 반복에서 요약)
+                self._evict_locked()
+
+    def flush(self, timeout=None):
+        """진행 중인 요약이 끝날 때까지 기다립니다."""
+        with self._lock:
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def clear(self):
+        """대화 기록과 요약을 모두 지웁니다."""
+        with self._lock:
+            self._turns.clear()
+            self._turn_tokens = 0
+            self._summary = ""
+            self._summary_tokens = 0
+            self._pending = []
+
+    def stats(self):
+        """현재 보관 중인 대화 수, 토큰 사용량과 제거/요약 횟수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "retained_turns": len(self._turns),
+                "turn_tokens": self._turn_tokens,
+                "summary_tokens": self._summary_tokens,
+                "token_budget": self.token_budget,
+                "summarizing": self._worker is not None
+            })
+        return stats
@@ -0,0 +1,489 @@
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from flask import Flask, request, jsonify
+from notion_mirror import match_filter, property_plain_value
+from notion_blocks import MAX_CHILDREN_PER_REQUEST, MAX_RICH_TEXT_LENGTH
+from rate_limiter import TokenBucket
+from mcp_logging import get_logger
+
+logger = get_logger("fake_notion")
+
+# 가짜 서버 기본 설정 (환경 변수 또는 명령행 인자로 조정 가능)
+DEFAULT_LATENCY_MS = float(os.getenv("FAKE_NOTION_LATENCY_MS", "0"))
+DEFAULT_LATENCY_JITTER_MS = float(os.getenv("FAKE_NOTION_LATENCY_JITTER_MS", "0"))
+DEFAULT_LATENCY_DISTRIBUTION = os.getenv("FAKE_NOTION_LATENCY_DISTRIBUTION", "fixed")
+DEFAULT_ERROR_429_RATE = float(os.getenv("FAKE_NOTION_429_RATE", "0"))        # 무작위로 429를 반환할 비율
+DEFAULT_RATE_LIMIT = float(os.getenv("FAKE_NOTION_RATE_LIMIT", "0"))          # 초당 허용 요청 수 (0이면 제한 없음)
+DEFAULT_RETRY_AFTER = float(os.getenv("FAKE_NOTION_RETRY_AFTER", "1"))
+
+MAX_PAGE_SIZE = 100
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _rich_text(items):
+    """요청 형식의 rich_text 항목에 응답 형식 필드(type, plain_text)를 채웁니다."""
+    result = []
+    for item in items or []:
+        item = dict(item)
+        item.setdefault("type", "text")
+        if "plain_text" not in item:
+            item["plain_text"] = item.get("text", {}).get("content", "")
+        item.setdefault("annotations", {})
+        result.append(item)
+    return result
+
+
+def _error(status, code, message):
+    return jsonify({"object": "error", "status": status, "code": code, "message": message}), status
+
+
+class LatencyModel:
+    """요청마다 적용할 인위적인 지연 시간을 만듭니다.
+
+    distribution은 fixed, uniform(평균 ± jitter), normal(표준편차 jitter),
+    lognormal(중앙값 mean, 꼬리가 긴 분포) 중 하나입니다.
+    """
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, mean_ms=0.0, jitter_ms=0.0, distribution="fixed", seed=None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"지원하지 않는 지연 분포: {distribution}")
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self._random = random.Random(seed)
+
+    def sample(self):
+        """지연 시간(초)을 하나 뽑습니다."""
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            value = self._random.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.distribution == "normal":
+            value = self._random.gauss(self.mean_ms, self.jitter_ms)
+        elif self.distribution == "lognormal":
+            sigma = self.jitter_ms / self.mean_ms if self.jitter_ms else 0.5
+            value = self._random.lognormvariate(0, sigma) * self.mean_ms
+        else:
+            value = self.mean_ms
+        return max(0.0, value) / 1000
+
+
+class FakeNotionStore:
+    """가짜 노션 서버의 메모리 저장소입니다 (데이터베이스, 페이지, 블록)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.databases = {}   # id -> database 객체
+        self.pages = {}       # id -> page 객체
+        self.blocks = {}      # id -> block 객체
+        self.children = {}    # 부모 id -> [자식 블록 id, ...]
+
+    def _new_id(self):
+        return str(uuid.uuid4())
+
+    def _title(self, obj):
+        if obj["object"] == "database":
+            return "".join(item["plain_text"] for item in obj.get("title", []))
+        for prop_data in obj.get("properties", {}).values():
+            if prop_data.get("type") == "title":
+                return property_plain_value(prop_data)
+        return ""
+
+    def _normalize_properties(self, properties, schema=None):
+        """요청 형식의 페이지 속성 값을 응답 형식으로 변환합니다."""
+        result = {}
+        for name, value in (properties or {}).items():
+            value = dict(value)
+            prop_type = value.pop("type", None) or (schema or {}).get(name, {}).get("type") or next(iter(value), None)
+            if prop_type is None:
+                continue
+            prop_value = value.get(prop_type)
+            if prop_type in ("title", "rich_text"):
+                prop_value = _rich_text(prop_value)
+            result[name] = {"id": name, "type": prop_type, prop_type: prop_value}
+        return result
+
+    def _validate_blocks(self, blocks):
+        """노션 요청 크기 제한을 검사합니다. 위반하면 오류 메시지를 반환합니다."""
+        if len(blocks) > MAX_CHILDREN_PER_REQUEST:
+            return f"body.children.length should be ≤ `{MAX_CHILDREN_PER_REQUEST}`, instead was `{len(blocks)}`."
+        for block in blocks:
+            body = block.get(block.get("type"))
+            if not isinstance(body, dict):
+                continue
+            for item in body.get("rich_text", []):
+                content = item.get("text", {}).get("content", "")
+                if len(content) > MAX_RICH_TEXT_LENGTH:
+                    return f"body.children.rich_text.text.content.length should be ≤ `{MAX_RICH_TEXT_LENGTH}`, instead was `{len(content)}`."
+            error = self._validate_blocks(body.get("children", []))
+            if error:
+                return error
+        return None
+
+    def _add_blocks_locked(self, parent_id, blocks):
+        created = []
+        for block in blocks:
+            block_type = block.get("type")
+            body = dict(block.get(block_type) or {})
+            nested = body.pop("children", [])
+            if "rich_text" in body:
+                body["rich_text"] = _rich_text(body["rich_text"])
+            now = _now()
+            new_block = {
+                "object": "block",
+                "id": self._new_id(),
+                "parent": {"type": "block_id", "block_id": parent_id},
+                "created_time": now,
+                "last_edited_time": now,
+                "has_children": bool(nested),
+                "archived": False,
+                "type": block_type,
+                block_type: body
+            }
+            self.blocks[new_block["id"]] = new_block
+            self.children.setdefault(parent_id, []).append(new_block["id"])
+            if nested:
+                self._add_blocks_locked(new_block["id"], nested)
+            created.append(new_block)
+        if parent_id in self.blocks and created:
+            self.blocks[parent_id]["has_children"] = True
+        return created
+
+    def add_database(self, title, properties, parent_page_id=None):
+        now = _now()
+        database = {
+            "object": "database",
+            "id": self._new_id(),
+            "created_time": now,
+            "last_edited_time": now,
+            "title": _rich_text([{"text": {"content": title}}]),
+            "parent": {"type": "page_id", "page_id": parent_page_id} if parent_page_id else {"type": "workspace", "workspace": True},
+            "properties": {
+                name: dict(prop, id=name, name=name, type=prop.get("type") or next(iter(prop)))
+                for name, prop in properties.items()
+            },
+            "archived": False
+        }
+        database["url"] = f"https://www.notion.so/{database['id'].replace('-', '')}"
+        with self._lock:
+            self.databases[database["id"]] = database
+        return database
+
+    def _page_parent(self, database_id, page_id):
+        if database_id:
+            return {"type": "database_id", "database_id": database_id}
+        if page_id:
+            return {"type": "page_id", "page_id": page_id}
+        return {"type": "workspace", "workspace": True}
+
+    def add_page(self, parent, properties, children=None):
+        """페이지를 저장합니다. 부모가 없거나 블록 제한을 넘으면 (None, 오류 메시지)."""
+        database_id = parent.get("database_id")
+        page_id = parent.get("page_id")
+        with self._lock:
+            if database_id and database_id not in self.databases:
+                return None, f"Could not find database with ID: {database_id}."
+            if page_id and page_id not in self.pages:
+                return None, f"Could not find page with ID: {page_id}."
+            error = self._validate_blocks(children or [])
+            if error:
+                return None, error
+            schema = self.databases[database_id]["properties"] if database_id else None
+            now = _now()
+            page = {
+                "object": "page",
+                "id": self._new_id(),
+                "created_time": now,
+                "last_edited_time": now,
+                "parent": self._page_parent(database_id, page_id),
+                "archived": False,
+                "properties": self._normalize_properties(properties, schema)
+            }
+            page["url"] = f"https://www.notion.so/{page['id'].replace('-', '')}"
+            self.pages[page["id"]] = page
+            self._add_blocks_locked(page["id"], children or [])
+        return page, None
+
+    def update_page(self, page_id, properties):
+        with self._lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                return None
+            schema = self.databases.get(page["parent"].get("database_id"), {}).get("properties")
+            page["properties"].update(self._normalize_properties(properties, schema))
+            page["last_edited_time"] = _now()
+            return page
+
+    def append_children(self, block_id, children):
+        """블록에 하위 블록을 추가합니다. 실패하면 (None, 상태 코드, 오류 메시지)."""
+        with self._lock:
+            if block_id not in self.pages and block_id not in self.blocks:
+                return None, 404, f"Could not find block with ID: {block_id}."
+            error = self._validate_blocks(children)
+            if error:
+                return None, 400, error
+            created = self._add_blocks_locked(block_id, children)
+            if block_id in self.pages:
+                self.pages[block_id]["last_edited_time"] = _now()
+            return created, None, None
+
+    def list_children(self, block_id):
+        with self._lock:
+            if block_id not in self.pages and block_id not in self.blocks:
+                return None
+            return [self.blocks[child_id] for child_id in self.children.get(block_id, [])]
+
+    def search(self, query="", filter_params=None, sort_params=None):
+        with self._lock:
+            objects = list(self.databases.values()) + list(self.pages.values())
+        if filter_params and filter_params.get("property") == "object":
+            objects = [obj for obj in objects if obj["object"] == filter_params.get("value")]
+        if query:
+            query = query.casefold()
+            objects = [obj for obj in objects if query in self._title(obj).casefold()]
+        descending = (sort_params or {}).get("direction", "descending") == "descending"
+        return sorted(objects, key=lambda obj: obj["last_edited_time"], reverse=descending)
+
+    def query(self, database_id, filter_params=None, sorts=None):
+        with self._lock:
+            if database_id not in self.databases:
+                return None
+            pages = [page for page in self.pages.values() if page["parent"].get("database_id") == database_id]
+        pages = [page for page in pages if _matches(page, filter_params)]
+        for sort in reversed(sorts or []):
+            descending = sort.get("direction") == "descending"
+            if "timestamp" in sort:
+                key = lambda page, field=sort["timestamp"]: page[field]
+            else:
+                key = lambda page, name=sort.get("property"): str(property_plain_value(page["properties"].get(name, {})) or "")
+            pages.sort(key=key, reverse=descending)
+        return pages
+
+    def seed(self, databases=2, pages_per_database=50, blocks_per_page=5, seed=None):
+        """부하 테스트용 워크스페이스 데이터를 만듭니다. 루트 페이지를 반환합니다."""
+        rng = random.Random(seed)
+        statuses = ["진행 전", "진행 중", "완료"]
+        root, _ = self.add_page({}, {"title": {"title": [{"text": {"content": "워크스페이스"}}]}})
+        for db_index in range(databases):
+            database = self.add_database(
+                f"데이터베이스 {db_index + 1}",
+                {
+                    "Name": {"title": {}},
+                    "Status": {"select": {"options": [{"name": status} for status in statuses]}},
+                    "Description": {"rich_text": {}}
+                },
+                root["id"]
+            )
+            for page_index in range(pages_per_database):
+                blocks = [
+                    {"type": "paragraph", "paragraph": {"rich_text": [{"text": {"content": f"페이지 {page_index + 1}의 {block_index + 1}번째 문단"}}]}}
+                    for block_index in range(blocks_per_page)
+                ]
+                self.add_page(
+                    {"database_id": database["id"]},
+                    {
+                        "Name": {"title": [{"text": {"content": f"항목 {page_index + 1}"}}]},
+                        "Status": {"select": {"name": rng.choice(statuses)}},
+                        "Description": {"rich_text": [{"text": {"content": f"{database['id'][:8]} 테스트 항목"}}]}
+                    },
+                    blocks
+                )
+        return root
+
+
+def _matches(page, filter_params):
+    """타임스탬프 필터는 직접 평가하고 나머지는 미러의 필터 평가기를 사용합니다."""
+    if not filter_params:
+        return True
+    if "timestamp" in filter_params:
+        field = filter_params["timestamp"]
+        operator, expected = next(iter(filter_params.get(field, {}).items()))
+        value = page[field]
+        return {
+            "on_or_after": value >= expected,
+            "after": value > expected,
+            "on_or_before": value <= expected,
+            "before": value < expected,
+            "equals": value == expected
+        }.get(operator, True)
+    if "and" in filter_params or "or" in filter_params:
+        results = [_matches(page, sub) for sub in filter_params.get("and") or filter_params.get("or")]
+        return all(results) if "and" in filter_params else any(results)
+    result = match_filter(page, filter_params)
+    # 평가할 수 없는 필터는 통과시킴
+    return True if result is None else result
+
+
+def _paginate(items, start_cursor, page_size):
+    """커서(시작 인덱스 문자열) 기반으로 한 페이지를 잘라 노션 리스트 응답을 만듭니다."""
+    try:
+        start = int(start_cursor) if start_cursor else 0
+        page_size = min(int(page_size or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+    except ValueError:
+        return None
+    end = start + page_size
+    has_more = end < len(items)
+    return {
+        "object": "list",
+        "results": items[start:end],
+        "next_cursor": str(end) if has_more else None,
+        "has_more": has_more
+    }
+
+
+def create_app(store=None, latency=None, error_429_rate=None, rate_limit=None, retry_after=None):
+    """노션 API 일부(클라이언트가 사용하는 엔드포인트)를 흉내 내는 Flask 앱을 만듭니다."""
+    app = Flask(__name__)
+    store = store or FakeNotionStore()
+    latency = latency or LatencyModel(DEFAULT_LATENCY_MS, DEFAULT_LATENCY_JITTER_MS, DEFAULT_LATENCY_DISTRIBUTION)
+    error_429_rate = DEFAULT_ERROR_429_RATE if error_429_rate is None else error_429_rate
+    rate_limit = DEFAULT_RATE_LIMIT if rate_limit is None else rate_limit
+    retry_after = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+    bucket = TokenBucket(rate_limit, rate_limit) if rate_limit > 0 else None
+    stats = {"requests": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+
+    app.config["store"] = store
+    app.config["stats"] = stats
+
+    @app.before_request
+    def simulate_network():
+        if request.path.startswith("/_"):
+            return None
+        with stats_lock:
+            stats["requests"] += 1
+        delay = latency.sample()
+        if delay:
+            time.sleep(delay)
+
+        limited = bucket is not None and not bucket.try_acquire()
+        if limited or (error_429_rate and random.random() < error_429_rate):
+            with stats_lock:
+                stats["rate_limited"] += 1
+            response, status = _error(429, "rate_limited", "You have been rate limited. Please try again in a few minutes.")
+            response.headers["Retry-After"] = str(retry_after)
+            return response, status
+        return None
+
+    @app.route("/v1/search", methods=["POST"])
+    def search():
+        payload = request.get_json(silent=True) or {}
+        results = store.search(payload.get("query", ""), payload.get("filter"), payload.get("sort"))
+        page = _paginate(results, payload.get("start_cursor"), payload.get("page_size"))
+        if page is None:
+            return _error(400, "validation_error", "start_cursor 또는 page_size가 올바르지 않습니다.")
+        return jsonify(page)
+
+    @app.route("/v1/databases", methods=["POST"])
+    def create_database():
+        payload = request.get_json(silent=True) or {}
+        title = "".join(item.get("text", {}).get("content", "") for item in payload.get("title", []))
+        parent_page_id = payload.get("parent", {}).get("page_id")
+        if parent_page_id and parent_page_id not in store.pages:
+            return _error(404, "object_not_found", f"Could not find page with ID: {parent_page_id}.")
+        return jsonify(store.add_database(title, payload.get("properties", {}), parent_page_id))
+
+    @app.route("/v1/databases/<database_id>", methods=["GET"])
+    def get_database(database_id):
+        database = store.databases.get(database_id)
+        if database is None:
+            return _error(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        return jsonify(database)
+
+    @app.route("/v1/databases/<database_id>/query", methods=["POST"])
+    def query_database(database_id):
+        payload = request.get_json(silent=True) or {}
+        results = store.query(database_id, payload.get("filter"), payload.get("sorts"))
+        if results is None:
+            return _error(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        page = _paginate(results, payload.get("start_cursor"), payload.get("page_size"))
+        if page is None:
+            return _error(400, "validation_error", "start_cursor 또는 page_size가 올바르지 않습니다.")
+        return jsonify(page)
+
+    @app.route("/v1/pages", methods=["POST"])
+    def create_page():
+        payload = request.get_json(silent=True) or {}
+        page, error = store.add_page(payload.get("parent", {}), payload.get("properties", {}), payload.get("children"))
+        if page is None:
+            status = 400 if "should be" in error else 404
+            return _error(status, "validation_error" if status == 400 else "object_not_found", error)
+        return jsonify(page)
+
+    @app.route("/v1/pages/<page_id>", methods=["GET", "PATCH"])
+    def page(page_id):
+        if request.method == "PATCH":
+            payload = request.get_json(silent=True) or {}
+            result = store.update_page(page_id, payload.get("properties", {}))
+        else:
+            result = store.pages.get(page_id)
+        if result is None:
+            return _error(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        return jsonify(result)
+
+    @app.route("/v1/blocks/<block_id>/children", methods=["GET", "PATCH"])
+    def block_children(block_id):
+        if request.method == "PATCH":
+            payload = request.get_json(silent=True) or {}
+            created, status, error = store.append_children(block_id, payload.get("children", []))
+            if created is None:
+                return _error(status, "validation_error" if status == 400 else "object_not_found", error)
+            return jsonify({"object": "list", "results": created, "next_cursor": None, "has_more": False})
+
+        children = store.list_children(block_id)
+        if children is None:
+            return _error(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        page = _paginate(children, request.args.get("start_cursor"), request.args.get("page_size"))
+        if page is None:
+            return _error(400, "validation_error", "start_cursor 또는 page_size가 올바르지 않습니다.")
+        return jsonify(page)
+
+    @app.route("/_stats", methods=["GET"])
+    def get_stats():
+        """요청 수, 주입된 429 수와 저장된 객체 수를 반환합니다."""
+        with stats_lock:
+            result = dict(stats)
+        result.update(databases=len(store.databases), pages=len(store.pages), blocks=len(store.blocks))
+        return jsonify(result)
+
+    return app
+
+
+if __name__ == "__main__":
+    # 사용법: python fake_notion_server.py --databases 3 --pages 200 --latency-ms 80 --jitter-ms 40 --distribution lognormal
+    # 클라이언트는 NOTION_BASE_URL=http://127.0.0.1:5100/v1 로 연결합니다.
+    parser = argparse.ArgumentParser(description="로컬 가짜 노션 API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_NOTION_PORT", "5100")))
+    parser.add_argument("--databases", type=int, default=2, help="미리 만들 데이터베이스 수")
+    parser.add_argument("--pages", type=int, default=50, help="데이터베이스당 페이지 수")
+    parser.add_argument("--blocks", type=int, default=5, help="페이지당 블록 수")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_LATENCY_JITTER_MS)
+    parser.add_argument("--distribution", choices=LatencyModel.DISTRIBUTIONS, default=DEFAULT_LATENCY_DISTRIBUTION)
+    parser.add_argument("--error-429-rate", type=float, default=DEFAULT_ERROR_429_RATE)
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT, help="초당 허용 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    store = FakeNotionStore()
+    root = store.seed(args.databases, args.pages, args.blocks, seed=args.seed)
+    app = create_app(
+        store,
+        latency=LatencyModel(args.latency_ms, args.jitter_ms, args.distribution, seed=args.seed),
+        error_429_rate=args.error_429_rate,
+        rate_limit=args.rate_limit
+    )
+    print(f"가짜 노션 서버: http://{args.host}:{args.port}/v1 (루트 페이지 {root['id']})", file=sys.stderr)
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,405 @@
+import os
+import re
+import sys
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from types import SimpleNamespace
+import httpx
+import openai
+import json_codec
+from fake_notion_server import LatencyModel
+from intent_classifier import IntentClassifier, NOTION_COMMAND, GENERAL_CHAT
+from token_counter import count_tokens, count_messages_tokens
+from mcp_logging import get_logger
+
+logger = get_logger("fake_openai")
+
+# 가짜 LLM 백엔드 기본 설정 (환경 변수로 조정 가능)
+DEFAULT_LATENCY_MS = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "0"))                # 첫 토큰까지의 지연
+DEFAULT_LATENCY_JITTER_MS = float(os.getenv("FAKE_OPENAI_LATENCY_JITTER_MS", "0"))
+DEFAULT_LATENCY_DISTRIBUTION = os.getenv("FAKE_OPENAI_LATENCY_DISTRIBUTION", "fixed")
+DEFAULT_TOKEN_RATE = float(os.getenv("FAKE_OPENAI_TOKENS_PER_SECOND", "0"))          # 초당 생성 토큰 수 (0이면 즉시)
+DEFAULT_ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))                 # 무작위로 오류를 반환할 비율
+DEFAULT_ERROR_STATUS = int(os.getenv("FAKE_OPENAI_ERROR_STATUS", "429"))
+DEFAULT_SLOW_RATE = float(os.getenv("FAKE_OPENAI_SLOW_RATE", "0"))                   # 지연을 slow_factor배로 늘릴 비율 (꼬리 지연 재현)
+DEFAULT_SLOW_FACTOR = float(os.getenv("FAKE_OPENAI_SLOW_FACTOR", "10"))
+DEFAULT_SCRIPT_PATH = os.getenv("FAKE_OPENAI_SCRIPT")                                # 입력 -> 응답 스크립트 (JSON 파일)
+DEFAULT_SEED = int(os.getenv("FAKE_OPENAI_SEED")) if os.getenv("FAKE_OPENAI_SEED") else None
+
+# 프롬프트 캐시 흉내: 이 토큰 수 이상인 프롬프트의 반복된 시스템 메시지를 128토큰 단위로 캐시 적중 처리
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_BLOCK = 128
+
+_QUOTED = re.compile(r"[\"'“‘]([^\"'”’]+)[\"'”’]")
+_DATABASE_NAME = re.compile(r"(데이터\s*베이스\s*\d+)|([\w가-힣]+)\s*(?:데이터\s*베이스|디비|\bdb\b)", re.IGNORECASE)
+_CREATE_DATABASE = re.compile(r"(?:데이터\s*베이스|디비|db)\s*(?:를|을|하나)?\s*(?:새로\s*)?(?:만들|생성)", re.IGNORECASE)
+_ADD = re.compile(r"추가|등록|넣어|저장|\b(?:add|insert)\b", re.IGNORECASE)
+_MANY = re.compile(r"여러|(\d+)\s*개")
+_VIEW = re.compile(r"조회|보여|목록|리스트|알려|\b(?:show|list|query)\b", re.IGNORECASE)
+_SEARCH = re.compile(r"찾아|검색|\b(?:find|search)\b", re.IGNORECASE)
+_UPDATE = re.compile(r"수정|업데이트|변경|바꿔|\b(?:update|edit)\b", re.IGNORECASE)
+_CREATE = re.compile(r"만들|생성|작성|\b(?:create|make|write)\b", re.IGNORECASE)
+_TODO = re.compile(r"할\s*일|to-?do|체크리스트", re.IGNORECASE)
+
+# 노션 명령 여부와 매개변수 없는 명령은 로컬 의도 분류기의 규칙으로 판단
+_RULES = IntentClassifier()
+
+_SENTENCES = (
+    "이 문서는 오프라인 벤치마크를 위해 생성된 예시 콘텐츠입니다.",
+    "주요 목표와 일정, 담당자를 정리해 두면 진행 상황을 확인하기 쉽습니다.",
+    "회의에서 결정된 사항은 다음 단계의 작업 항목으로 옮겨 적습니다.",
+    "각 항목은 우선순위에 따라 검토하고 필요한 자료를 함께 첨부합니다.",
+    "완료된 작업은 상태를 갱신하고 남은 문제는 별도로 기록합니다."
+)
+
+
+def _title_from(command, default="새 페이지"):
+    match = _QUOTED.search(command)
+    return match.group(1) if match else default
+
+
+def _database_from(command):
+    match = _DATABASE_NAME.search(command)
+    if not match:
+        return None
+    return (match.group(1) or match.group(2)).strip()
+
+
+def derive_action(command):
+    """명령에서 규칙으로 노션 작업 {"action", "parameters"}를 만듭니다 (노션 명령이 아니면 None)."""
+    classifier_result = _RULES._classify_rules(command)
+    if classifier_result.get("action"):
+        return {"action": classifier_result["action"], "parameters": {}}
+    database = _database_from(command)
+    if _CREATE_DATABASE.search(command):
+        return {"action": "create_database", "parameters": {"title": _title_from(command, database or "새 데이터베이스")}}
+    if database and _ADD.search(command):
+        many = _MANY.search(command)
+        if many:
+            count = int(many.group(1)) if many.group(1) else 3
+            rows = [{"Name": f"{_title_from(command, '새 항목')} {index + 1}"} for index in range(min(count, 20))]
+            return {"action": "create_pages_bulk", "parameters": {"database_id": database, "rows": rows}}
+        return {"action": "create_page", "parameters": {"parent_id": database, "title": _title_from(command, "새 항목")}}
+    if database and _VIEW.search(command):
+        return {"action": "query_database", "parameters": {"database_id": database}}
+    if _SEARCH.search(command):
+        keyword = _title_from(command, re.sub(f"(?:{_SEARCH.pattern}).*$", "", command).strip() or command)
+        return {"action": "search_pages", "parameters": {"query": keyword}}
+    if _UPDATE.search(command) and _QUOTED.search(command):
+        return {"action": "update_page", "parameters": {"page_id": _title_from(command), "properties": {}}}
+    if _CREATE.search(command) or _ADD.search(command):
+        return {
+            "action": "create_page_in_workspace",
+            "parameters": {
+                "title": _title_from(command),
+                "content_prompt": command,
+                "content_type": "todo" if _TODO.search(command) else "text"
+            }
+        }
+    if classifier_result["intent"] == NOTION_COMMAND:
+        return {"action": "generate_content", "parameters": {"prompt": command}}
+    return None
+
+
+def generate_text(prompt, max_tokens=200):
+    """프롬프트에 따라 결정적인 예시 텍스트를 만듭니다 (같은 프롬프트면 항상 같은 결과)."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    todo = "'- [ ] '" in prompt
+    bullet = not todo and "'- '" in prompt
+    lines = []
+    tokens = 0
+    while tokens < max_tokens and len(lines) < 8:
+        sentence = rng.choice(_SENTENCES)
+        line = f"- [ ] {sentence}" if todo else f"- {sentence}" if bullet else sentence
+        tokens += count_tokens(line)
+        lines.append(line)
+    return ("\n" if todo or bullet else " ").join(lines)
+
+
+def _message(content=None, tool_calls=None):
+    return SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+
+
+def _tool_call(index, name, arguments):
+    return SimpleNamespace(
+        id=f"call_{index}",
+        type="function",
+        function=SimpleNamespace(name=name, arguments=json_codec.dumps(arguments))
+    )
+
+
+class FakeChatCompletions:
+    """client.chat.completions.create()를 흉내 내는 가짜 LLM 백엔드입니다.
+
+    시스템 프롬프트로 호출 종류(의도 분석, 도구 호출 라우팅, 명령 파싱, 요약, 텍스트 생성)를 구분해
+    스크립트에 있는 응답 또는 규칙으로 만든 응답을 돌려줍니다. 첫 토큰 지연, 초당 생성 토큰 수,
+    오류/지연 주입을 설정할 수 있으며 오류는 openai SDK와 같은 예외로 발생시킵니다.
+    """
+
+    def __init__(self, latency=None, token_rate=None, error_rate=None, error_status=None,
+                 slow_rate=None, slow_factor=None, script=None, seed=None):
+        seed = DEFAULT_SEED if seed is None else seed
+        self.latency = latency or LatencyModel(DEFAULT_LATENCY_MS, DEFAULT_LATENCY_JITTER_MS, DEFAULT_LATENCY_DISTRIBUTION, seed=seed)
+        self.token_rate = DEFAULT_TOKEN_RATE if token_rate is None else token_rate
+        self.error_rate = DEFAULT_ERROR_RATE if error_rate is None else error_rate
+        self.error_status = error_status or DEFAULT_ERROR_STATUS
+        self.slow_rate = DEFAULT_SLOW_RATE if slow_rate is None else slow_rate
+        self.slow_factor = slow_factor or DEFAULT_SLOW_FACTOR
+        self.script = script if script is not None else self._load_script(DEFAULT_SCRIPT_PATH)
+        self._random = random.Random(seed)
+        self._seen_prefixes = set()
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "errors": 0, "slow": 0, "timeouts": 0}
+
+    def stats(self):
+        """요청 수와 주입된 오류/지연/타임아웃 수를 반환합니다."""
+        with self._lock:
+            return dict(self._counts)
+
+    @staticmethod
+    def _load_script(path):
+        """{"입력": 응답} 형식의 스크립트를 읽습니다. 응답이 객체면 노션 작업, 문자열이면 텍스트 답변."""
+        if not path:
+            return {}
+        with open(path, "rb") as f:
+            return json_codec.loads(f.read())
+
+    def _scripted(self, user_input):
+        if user_input in self.script:
+            return self.script[user_input]
+        for pattern, response in self.script.items():
+            if pattern and pattern in user_input:
+                return response
+        return None
+
+    def _respond(self, messages, tools, max_tokens):
+        """호출 종류에 맞는 (content, tool_calls)를 만듭니다."""
+        # 순환 import를 피하려고 여기서 가져옴
+        from openai_client import INTENT_SYSTEM_PROMPT, COMMAND_PROMPT_PREFIX, SUMMARY_SYSTEM_PROMPT
+
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        user_input = messages[-1]["content"] if messages else ""
+        if system.startswith(COMMAND_PROMPT_PREFIX):
+            user_input = user_input.split(": ", 1)[-1]
+        scripted = self._scripted(user_input)
+        if scripted is None:
+            action = derive_action(user_input)
+        else:
+            action = scripted if isinstance(scripted, dict) else None
+
+        if system == INTENT_SYSTEM_PROMPT:
+            intent = NOTION_COMMAND if action else GENERAL_CHAT
+            return json_codec.dumps({"intent": intent, "explanation": "오프라인 가짜 응답"}), None
+        if system.startswith(COMMAND_PROMPT_PREFIX):
+            action = action or {"action": "generate_content", "parameters": {"prompt": user_input}}
+            return json_codec.dumps(dict(action, description="오프라인 가짜 응답")), None
+        if system == SUMMARY_SYSTEM_PROMPT:
+            return generate_text(user_input, min(max_tokens or 100, 100)), None
+        if tools and action:
+            return None, [_tool_call(0, action["action"], action.get("parameters") or {})]
+        if isinstance(scripted, str):
+            return scripted, None
+        return generate_text(user_input, max_tokens or 200), None
+
+    def _cached_tokens(self, messages, prompt_tokens):
+        """반복된 시스템 메시지를 프롬프트 캐시 적중으로 계산합니다 (Azure의 128토큰 단위 접두사 캐시 흉내)."""
+        if prompt_tokens < PROMPT_CACHE_MIN_TOKENS or not messages or messages[0]["role"] != "system":
+            return 0
+        prefix = messages[0]["content"]
+        with self._lock:
+            seen = prefix in self._seen_prefixes
+            self._seen_prefixes.add(prefix)
+        if not seen:
+            return 0
+        return count_messages_tokens(messages[:1]) // PROMPT_CACHE_BLOCK * PROMPT_CACHE_BLOCK
+
+    def _plan_failure(self, timeout):
+        """설정된 비율로 오류나 지연을 정하고 (첫 토큰까지 기다릴 시간(초), 기다린 뒤 발생시킬 예외 또는 None)을 반환합니다."""
+        with self._lock:
+            self._counts["requests"] += 1
+            failed = self.error_rate and self._random.random() < self.error_rate
+            slow = not failed and self.slow_rate and self._random.random() < self.slow_rate
+            if failed:
+                self._counts["errors"] += 1
+            if slow:
+                self._counts["slow"] += 1
+        delay = self.latency.sample() * (self.slow_factor if slow else 1)
+        request = httpx.Request("POST", "https://fake-openai.local/chat/completions")
+        if timeout is not None and delay > timeout:
+            with self._lock:
+                self._counts["timeouts"] += 1
+            return timeout, openai.APITimeoutError(request=request)
+        if failed:
+            headers = {"retry-after": "1"} if self.error_status == 429 else {}
+            response = httpx.Response(self.error_status, headers=headers, request=request)
+            return delay, openai.APIStatusError(f"가짜 오류 ({self.error_status})", response=response, body=None)
+        return delay, None
+
+    def _prepare(self, model, messages, tools, max_tokens, stream):
+        """응답 내용과 (스트리밍이 아니면) 생성에 걸릴 시간(초), 완성 응답 객체를 만듭니다."""
+        content, tool_calls = self._respond(messages, tools, max_tokens)
+        if stream:
+            return content or "", 0.0, None
+        completion_tokens = count_tokens(content or "") + sum(
+            count_tokens(call.function.arguments) for call in tool_calls or []
+        )
+        prompt_tokens = count_messages_tokens(messages)
+        generation = completion_tokens / self.token_rate if self.token_rate > 0 else 0.0
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=self._cached_tokens(messages, prompt_tokens))
+        )
+        choice = SimpleNamespace(
+            index=0,
+            finish_reason="tool_calls" if tool_calls else "stop",
+            message=_message(content, tool_calls)
+        )
+        response = SimpleNamespace(id="fake-completion", object="chat.completion", model=model, choices=[choice], usage=usage)
+        return content, generation, response
+
+    def _chunks(self, model, content):
+        """텍스트를 어절 단위 조각으로 나눠 (조각 생성에 걸릴 시간(초), 스트리밍 조각)을 반환합니다."""
+        for piece in re.findall(r"\S+\s*", content):
+            seconds = count_tokens(piece) / self.token_rate if self.token_rate > 0 else 0.0
+            delta = SimpleNamespace(role="assistant", content=piece)
+            yield seconds, SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+
+    def create(self, model=None, messages=None, temperature=None, tools=None, tool_choice=None,
+               max_tokens=None, stream=False, timeout=None, **kwargs):
+        messages = messages or []
+        delay, error = self._plan_failure(timeout)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        content, generation, response = self._prepare(model, messages, tools, max_tokens, stream)
+        if stream:
+            return self._stream(model, content)
+        time.sleep(generation)
+        return response
+
+    def _stream(self, model, content):
+        """텍스트를 어절 단위 조각으로 token_rate 속도에 맞춰 내보냅니다."""
+        for seconds, chunk in self._chunks(model, content):
+            time.sleep(seconds)
+            yield chunk
+
+
+class AsyncFakeChatCompletions(FakeChatCompletions):
+    """FakeChatCompletions의 asyncio 버전입니다. 지연을 asyncio.sleep으로 흉내 내므로 동시 요청이 스레드를 점유하지 않습니다."""
+
+    async def create(self, model=None, messages=None, temperature=None, tools=None, tool_choice=None,
+                     max_tokens=None, stream=False, timeout=None, **kwargs):
+        messages = messages or []
+        delay, error = self._plan_failure(timeout)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        content, generation, response = self._prepare(model, messages, tools, max_tokens, stream)
+        if stream:
+            return self._astream(model, content)
+        await asyncio.sleep(generation)
+        return response
+
+    async def _astream(self, model, content):
+        for seconds, chunk in self._chunks(model, content):
+            await asyncio.sleep(seconds)
+            yield chunk
+
+
+class FakeAzureOpenAI:
+    """AzureOpenAI 대신 OpenAIMCPClient.client로 사용할 수 있는 가짜 클라이언트입니다."""
+
+    def __init__(self, **options):
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(**options))
+
+
+class FakeAsyncAzureOpenAI:
+    """AsyncAzureOpenAI 대신 AsyncOpenAIMCPClient.client로 사용할 수 있는 가짜 클라이언트입니다."""
+
+    def __init__(self, **options):
+        self.chat = SimpleNamespace(completions=AsyncFakeChatCompletions(**options))
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))]
+
+
+def run_benchmark(commands, repeat=1, profile=False, **backend_options):
+    """가짜 LLM 백엔드로 MCPController.process_command를 반복 실행하고 명령별 지연(ms)을 보고합니다.
+
+    backend_options는 FakeChatCompletions 인자(latency, token_rate, error_rate 등)입니다.
+    """
+    os.environ["OPENAI_BACKEND"] = "fake"
+    from mcp_controller import MCPController
+
+    controller = MCPController()
+    controller.openai_client.client = FakeAzureOpenAI(**backend_options)
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    timings = {command: [] for command in commands}
+    for _ in range(repeat):
+        for command in commands:
+            started = time.perf_counter()
+            controller.process_command(command)
+            timings[command].append((time.perf_counter() - started) * 1000)
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+
+    report = {
+        command: {
+            "runs": len(values),
+            "mean_ms": round(sum(values) / len(values), 1),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1)
+        }
+        for command, values in timings.items()
+    }
+    report["_llm_backend"] = controller.openai_client.client.chat.completions.stats()
+    report["_llm_calls"] = controller.openai_client.policy.stats()
+    report["_llm_tokens"] = controller.openai_client.token_usage.stats()
+    return report
+
+
+if __name__ == "__main__":
+    # 사용법: python fake_openai.py "데이터베이스 1 보여줘" "안녕" --repeat 20 --latency-ms 300 --tokens-per-second 50
+    # 노션 API도 오프라인으로 돌리려면 fake_notion_server.py를 띄우고 NOTION_BASE_URL을 설정합니다.
+    parser = argparse.ArgumentParser(description="가짜 LLM 백엔드로 명령 처리 파이프라인 벤치마크")
+    parser.add_argument("commands", nargs="+", help="처리할 명령")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_LATENCY_JITTER_MS)
+    parser.add_argument("--distribution", choices=LatencyModel.DISTRIBUTIONS, default=DEFAULT_LATENCY_DISTRIBUTION)
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKEN_RATE)
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE)
+    parser.add_argument("--error-status", type=int, default=DEFAULT_ERROR_STATUS)
+    parser.add_argument("--slow-rate", type=float, default=DEFAULT_SLOW_RATE)
+    parser.add_argument("--script", default=DEFAULT_SCRIPT_PATH, help="입력 -> 응답 스크립트 JSON 파일")
+    parser.add_argument("--profile", action="store_true", help="cProfile 결과를 표준 오류로 출력")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.commands,
+        args.repeat,
+        args.profile,
+        latency=LatencyModel(args.latency_ms, args.jitter_ms, args.distribution, seed=args.seed),
+        token_rate=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_rate=args.slow_rate,
+        script=FakeChatCompletions._load_script(args.script),
+        seed=args.seed
+    )
+    print(json_codec.dumps(report, indent=2))
@@ -0,0 +1,202 @@
+import os
+import re
+import sys
+import math
+import threading
+from collections import Counter
+import json_codec
+from search_index import tokenize
+from mcp_logging import get_logger
+
+logger = get_logger("intent")
+
+# 로컬 의도 분류 사용 여부 (0이면 항상 LLM으로 의도 분석)
+FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH", "1") not in ("0", "false", "False")
+# 이 신뢰도 이상이면 LLM 의도 분석 없이 로컬 분류 결과를 사용
+DEFAULT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+# 선택 사항: train 명령으로 만든 나이브 베이즈 모델 파일
+DEFAULT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH")
+
+NOTION_COMMAND = "notion_command"
+GENERAL_CHAT = "general_chat"
+
+# 노션 대상을 가리키는 단어와 노션 작업 동사
+_NOTION_NOUN = re.compile(
+    r"노션|notion|데이터\s*베이스|디비|\bdb\b|페이지|워크\s*스페이스|항목|\bdatabases?\b|\bpages?\b|\bworkspace\b",
+    re.IGNORECASE
+)
+_NOTION_VERB = re.compile(
+    r"추가|생성|만들|작성|등록|조회|보여|찾아|검색|목록|리스트|수정|업데이트|변경|넣어|저장|정리해|알려|써\s*줘|초안|"
+    r"\b(?:add|create|make|show|list|find|search|query|update|edit|insert|write|draft)\b",
+    re.IGNORECASE
+)
+# 매개변수가 없어 LLM 없이 바로 실행할 수 있는 명령
+_LIST_DATABASES = re.compile(
+    r"^(?:내\s*|나의\s*|노션\s*|전체\s*|모든\s*)*(?:데이터\s*베이스|디비|db)\s*(?:목록|리스트|들)?\s*"
+    r"(?:을|를|좀)?\s*(?:보여\s*(?:줘|주세요|줄래)|알려\s*(?:줘|주세요)|조회(?:해\s*(?:줘|주세요))?|뭐\s*있어)\s*[.?!]*$",
+    re.IGNORECASE
+)
+_LIST_DATABASES_EN = re.compile(r"^(?:please\s+)?(?:show|list)\s+(?:me\s+)?(?:my\s+|all\s+)?(?:notion\s+)?databases\s*[.?!]*$", re.IGNORECASE)
+# 작업 요청이 아니라 사용법을 묻는 질문 (노션 단어와 동사가 함께 있어도 LLM이 판단)
+_HOW_TO = re.compile(r"방법|어떻게|하는\s*법|\bhow\s+(?:to|do|can|should)\b", re.IGNORECASE)
+# 노션과 무관한 인사/잡담
+_SMALL_TALK = re.compile(r"^(?:안녕|하이|hi|hello|고마워|감사|반가워|잘\s*가|ㅎㅎ|ㅋㅋ)", re.IGNORECASE)
+
+
+class NaiveBayesIntentModel:
+    """글자 2-gram 기반 다항 나이브 베이즈 의도 분류 모델입니다."""
+
+    def __init__(self, class_counts=None, token_counts=None):
+        self.class_counts = class_counts or {}    # 의도 -> 학습 문장 수
+        self.token_counts = token_counts or {}    # 의도 -> {토큰: 빈도}
+        self._totals = {label: sum(counts.values()) for label, counts in self.token_counts.items()}
+        self._vocabulary = len({token for counts in self.token_counts.values() for token in counts})
+
+    @classmethod
+    def train(cls, examples):
+        """(문장, 의도) 쌍으로 모델을 학습합니다."""
+        class_counts = Counter()
+        token_counts = {}
+        for text, label in examples:
+            class_counts[label] += 1
+            token_counts.setdefault(label, Counter()).update(tokenize(text))
+        return cls(dict(class_counts), {label: dict(counts) for label, counts in token_counts.items()})
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = json_codec.loads(f.read())
+        return cls(data["class_counts"], data["token_counts"])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(json_codec.dumps_bytes({"class_counts": self.class_counts, "token_counts": self.token_counts}))
+
+    def predict_proba(self, text):
+        """의도별 확률을 반환합니다."""
+        tokens = tokenize(text)
+        total_examples = sum(self.class_counts.values())
+        if not total_examples:
+            return {}
+        log_scores = {}
+        for label, count in self.class_counts.items():
+            counts = self.token_counts.get(label, {})
+            denominator = self._totals.get(label, 0) + self._vocabulary + 1
+            score = math.log(count / total_examples)
+            for token in tokens:
+                score += math.log((counts.get(token, 0) + 1) / denominator)
+            log_scores[label] = score
+        best = max(log_scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+
+class IntentClassifier:
+    """키워드/정규식 규칙과 (선택적인) 학습 모델로 의도를 로컬에서 분류합니다.
+
+    classify()는 신뢰도가 임계값 이상일 때만 결과를 반환하고, 확신하지 못하면 None을 반환해
+    호출자가 LLM 의도 분석으로 넘어가게 합니다. stats()로 로컬 처리 비율을 확인할 수 있습니다.
+    """
+
+    def __init__(self, threshold=None, model=None, model_path=None):
+        self.threshold = DEFAULT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        model_path = model_path or DEFAULT_MODEL_PATH
+        if model is None and model_path:
+            try:
+                model = NaiveBayesIntentModel.load(model_path)
+                logger.info("의도 분류 모델 로드됨: %s", model_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("의도 분류 모델을 불러오지 못했습니다 (%s): %s", model_path, e)
+        self.model = model
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _classify_rules(self, text):
+        """규칙으로 분류해 {"intent", "confidence", "action"(선택)}을 반환합니다."""
+        if _LIST_DATABASES.match(text) or _LIST_DATABASES_EN.match(text):
+            return {"intent": NOTION_COMMAND, "confidence": 0.97, "action": "get_databases"}
+        has_noun = bool(_NOTION_NOUN.search(text))
+        has_verb = bool(_NOTION_VERB.search(text))
+        if has_noun and has_verb and not _HOW_TO.search(text):
+            return {"intent": NOTION_COMMAND, "confidence": 0.9}
+        # 인사로 시작해도 작업 요청이 이어지면(예: "안녕, KT 할 일 3개 추가해줘") 잡담으로 단정하지 않음
+        if _SMALL_TALK.match(text) and not has_noun and not has_verb:
+            return {"intent": GENERAL_CHAT, "confidence": 0.95}
+        # 노션 단어만 있거나(예: "노션이 뭐야?") 작업 동사만 있는 경우(예: "할 일 목록 만들어줘"),
+        # 사용법 질문(예: "노션에서 데이터베이스 만드는 방법 알려줘"),
+        # 또는 규칙에 걸리는 단어가 없는 경우(예: "add 3 tasks to KT")는 확신할 수 없으므로 LLM이 판단
+        return {"intent": NOTION_COMMAND if has_noun or has_verb else GENERAL_CHAT, "confidence": 0.5}
+
+    def _classify_model(self, text):
+        if self.model is None:
+            return None
+        probabilities = self.model.predict_proba(text)
+        if not probabilities:
+            return None
+        intent, confidence = max(probabilities.items(), key=lambda item: item[1])
+        return {"intent": intent, "confidence": round(confidence, 4)}
+
+    def classify(self, text):
+        """확신할 수 있으면 {"intent", "confidence", "source", "action"(선택)}, 아니면 None."""
+        text = (text or "").strip()
+        result = self._classify_rules(text)
+        if result["confidence"] >= self.threshold:
+            result["source"] = "rules"
+        else:
+            model_result = self._classify_model(text)
+            if model_result and model_result["confidence"] >= self.threshold:
+                result = dict(model_result, source="model")
+            else:
+                result = None
+
+        with self._lock:
+            self._counts["total"] += 1
+            if result is None:
+                self._counts["fallback"] += 1
+            else:
+                self._counts[result["source"]] += 1
+                self._counts[result["intent"]] += 1
+                if result.get("action"):
+                    self._counts["direct_action"] += 1
+        logger.debug("로컬 의도 분류 '%s': %s", text, result)
+        return result
+
+    def stats(self):
+        """로컬 분류 처리 비율(LLM 호출을 건너뛴 비율)과 세부 집계를 반환합니다."""
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts.get("total", 0)
+        hits = total - counts.get("fallback", 0)
+        return {
+            "total": total,
+            "hits": hits,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "rules": counts.get("rules", 0),
+            "model": counts.get("model", 0),
+            "fallback": counts.get("fallback", 0),
+            "direct_action": counts.get("direct_action", 0),
+            NOTION_COMMAND: counts.get(NOTION_COMMAND, 0),
+            GENERAL_CHAT: counts.get(GENERAL_CHAT, 0),
+            "threshold": self.threshold,
+            "model_loaded": self.model is not None
+        }
+
+
+if __name__ == "__main__":
+    # 사용법: python intent_classifier.py train <학습 데이터.jsonl> <모델.json>
+    #         python intent_classifier.py classify "<문장>"
+    # 학습 데이터는 한 줄에 {"text": "...", "intent": "notion_command" | "general_chat"} 형식입니다.
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "train":
+        with open(args[1], encoding="utf-8") as f:
+            examples = [json_codec.loads(line) for line in f if line.strip()]
+        model = NaiveBayesIntentModel.train((example["text"], example["intent"]) for example in examples)
+        model.save(args[2])
+        print(f"{len(examples)}개 문장으로 학습한 모델 저장: {args[2]}")
+    elif len(args) == 2 and args[0] == "classify":
+        classifier = IntentClassifier()
+        print(classifier.classify(args[1]) or "확신 없음 (LLM으로 분석)")
+    else:
+        print("사용법: python intent_classifier.py train <학습 데이터.jsonl> <모델.json> | classify <문장>")
+        sys.exit(1)
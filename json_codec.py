@@ -0,0 +1,59 @@
+import re
+import json
+
+# orjson이 설치되어 있으면 사용하고, 없으면 표준 json 모듈을 사용
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 표준 json과 orjson의 파싱 오류를 모두 잡을 수 있는 예외 (orjson.JSONDecodeError도 이 클래스의 하위 클래스)
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# 모델 응답에서 JSON 객체 부분만 찾는 패턴 (가끔 모델이 앞뒤에 다른 텍스트를 추가함)
+_JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def dumps_bytes(obj, indent=None, default=None):
+    """객체를 UTF-8 JSON 바이트로 직렬화합니다 (비ASCII 문자는 이스케이프하지 않음)."""
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent else 0
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # 64비트를 넘는 정수나 문자열이 아닌 키 등 orjson이 지원하지 않는 값은 표준 모듈로 처리
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=indent, default=default).encode("utf-8")
+
+
+def dumps(obj, indent=None, default=None):
+    """객체를 JSON 문자열로 직렬화합니다."""
+    if orjson is None:
+        return json.dumps(obj, ensure_ascii=False, indent=indent, default=default)
+    return dumps_bytes(obj, indent, default).decode("utf-8")
+
+
+def loads(data):
+    """JSON 문자열 또는 바이트를 파싱합니다. 실패하면 JSONDecodeError를 발생시킵니다."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def extract_object(text):
+    """텍스트에서 첫 '{'부터 마지막 '}'까지를 JSON 객체로 파싱합니다.
+
+    객체를 찾지 못하거나 파싱에 실패하면 None을 반환합니다.
+    """
+    if not text:
+        return None
+    match = _JSON_OBJECT_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        result = loads(match.group(0))
+    except JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
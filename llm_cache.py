@@ -0,0 +1,177 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import closing
+import json_codec
+from mcp_logging import get_logger
+
+logger = get_logger("llm_cache")
+
+# LLM 응답 캐시 설정 (환경 변수로 조정 가능)
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH")                                     # 설정하면 SQLite 디스크 캐시 사용
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))                # 메모리 LRU 최대 항목 수
+DEFAULT_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.5"))       # 이보다 높은 temperature는 캐시하지 않음
+
+# 호출 종류별 TTL (초). LLM_CACHE_TTL_<종류> 환경 변수로 덮어쓸 수 있음
+DEFAULT_TTLS = {
+    "intent": 86400,   # 의도 분석
+    "route": 3600,     # 도구 호출 라우팅
+    "command": 3600,   # 노션 명령 파싱
+    "text": 600        # 일반 텍스트 생성
+}
+CACHE_TTLS = {
+    kind: float(os.getenv(f"LLM_CACHE_TTL_{kind.upper()}", str(ttl)))
+    for kind, ttl in DEFAULT_TTLS.items()
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_expires_idx ON llm_cache (expires_at);
+"""
+
+# 디스크에서 만료 항목을 정리하는 주기 (저장 횟수 기준)
+_PURGE_EVERY = 200
+
+
+def _normalize_text(text):
+    """캐시 키용으로 텍스트를 정규화합니다 (NFC, 앞뒤 공백과 연속 공백 정리)."""
+    if not isinstance(text, str):
+        return text
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(deployment, messages, temperature, **options):
+    """(배포 이름, 메시지, temperature, 기타 옵션)을 정규화해 캐시 키를 만듭니다."""
+    normalized = [
+        [message.get("role"), _normalize_text(message.get("content"))]
+        for message in messages
+    ]
+    material = json_codec.dumps_bytes(
+        [deployment, normalized, round(float(temperature), 3), sorted(options.items())],
+        default=str
+    )
+    return hashlib.sha256(material).hexdigest()
+
+
+class LLMCache:
+    """LLM 응답을 메모리 LRU와 (선택적인) SQLite 디스크에 2단계로 캐시합니다.
+
+    get()은 메모리, 디스크 순으로 찾고 디스크에서 찾은 항목은 메모리로 올립니다.
+    항목은 호출 종류별 TTL이 지나면 만료되며, temperature가 높은 호출은 캐시하지 않습니다.
+    """
+
+    def __init__(self, path=None, max_entries=None, ttls=None, max_temperature=None):
+        self.path = path if path is not None else DEFAULT_CACHE_PATH
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.ttls = dict(CACHE_TTLS, **(ttls or {}))
+        self.max_temperature = DEFAULT_MAX_TEMPERATURE if max_temperature is None else max_temperature
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+        if self.path:
+            with closing(self._connect()) as conn:
+                conn.executescript(SCHEMA)
+                conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+                conn.commit()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def is_cacheable(self, kind, temperature):
+        """캐시 대상 호출인지 확인합니다. 대상이 아니면 bypassed로 집계합니다."""
+        if kind in self.ttls and self.ttls[kind] > 0 and temperature <= self.max_temperature:
+            return True
+        self._count("bypassed")
+        return False
+
+    def get(self, key):
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self.path:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            if row is not None:
+                value = json_codec.loads(row[0])
+                self._remember(key, row[1], value)
+                self._count("disk_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def set(self, kind, key, value):
+        """값을 호출 종류의 TTL로 저장합니다. value는 JSON으로 직렬화할 수 있어야 합니다."""
+        expires_at = time.time() + self.ttls[kind]
+        self._remember(key, expires_at, value)
+        self._count("stores")
+        if not self.path:
+            return
+        try:
+            with self._disk_lock, closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, kind, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, kind, json_codec.dumps(value), expires_at)
+                )
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+                conn.commit()
+        except sqlite3.Error as e:
+            # 디스크 캐시 실패는 응답에 영향을 주지 않음
+            logger.warning("LLM 캐시 디스크 저장 실패: %s", e)
+
+    def clear(self):
+        """메모리와 디스크의 모든 항목을 지웁니다."""
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            with self._disk_lock, closing(self._connect()) as conn:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def stats(self):
+        """메모리/디스크 적중, 미스, 우회 횟수와 적중률을 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["disk_path"] = self.path
+        return stats
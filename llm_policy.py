@@ -0,0 +1,326 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import openai
+from rate_limiter import backoff_delay, parse_retry_after
+from mcp_logging import get_logger
+
+logger = get_logger("llm_policy")
+
+# 호출 종류별 기본 정책: (전체 마감 시간(초), 재시도 횟수, 헤지 요청 사용 여부)
+# LLM_DEADLINE_<종류>, LLM_RETRIES_<종류>, LLM_HEDGE_<종류> 환경 변수로 덮어쓸 수 있음
+DEFAULT_POLICIES = {
+    "intent": (10.0, 2, True),     # 의도 분석: 짧고 지연에 민감
+    "route": (20.0, 2, True),      # 도구 호출 라우팅: 모든 명령이 거쳐 가는 첫 호출
+    "command": (30.0, 2, False),   # 노션 명령 파싱
+    "text": (60.0, 2, False),      # 텍스트/콘텐츠 생성
+    "chat": (60.0, 1, False),      # 일반 대화
+    "summary": (30.0, 1, False)    # 대화 기록 요약 (백그라운드)
+}
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value not in ("0", "false", "False")
+
+
+CALL_POLICIES = {
+    kind: {
+        "deadline": float(os.getenv(f"LLM_DEADLINE_{kind.upper()}", str(deadline))),
+        "retries": int(os.getenv(f"LLM_RETRIES_{kind.upper()}", str(retries))),
+        "hedge": _env_bool(f"LLM_HEDGE_{kind.upper()}", hedge)
+    }
+    for kind, (deadline, retries, hedge) in DEFAULT_POLICIES.items()
+}
+
+# 재시도 백오프 설정 (노션 클라이언트와 같은 full jitter 방식)
+DEFAULT_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+DEFAULT_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+# 지연 기록이 충분하지 않을 때 헤지 요청을 보내기까지 기다리는 시간 (초)
+DEFAULT_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+# 헤지 기준으로 사용할 지연 백분위수와 최소 표본 수
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20
+# 헤지 요청을 실행할 스레드 수 (모두 사용 중이면 헤지를 건너뜀)
+DEFAULT_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "8"))
+
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class DeadlineExceeded(TimeoutError):
+    """호출 종류의 마감 시간 안에 응답을 받지 못했을 때 발생합니다."""
+
+
+def is_retryable(error):
+    """다시 시도할 만한 오류(429/5xx, 연결 오류, 타임아웃)인지 확인합니다."""
+    if isinstance(error, openai.APIConnectionError):  # APITimeoutError 포함
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_after(error):
+    """오류 응답의 Retry-After 헤더 값(초)을 반환합니다. 없으면 None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    return parse_retry_after(headers.get("retry-after"))
+
+
+class LatencyTracker:
+    """호출 종류별 최근 성공 응답 지연을 보관하고 백분위수를 계산합니다."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, seconds):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, kind, percentile, min_samples=1):
+        """지연 백분위수(초)를 반환합니다. 표본이 min_samples보다 적으면 None."""
+        with self._lock:
+            samples = sorted(self._samples.get(kind, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class LLMCallPolicy:
+    """LLM 호출에 호출 종류별 마감 시간, 지터 백오프 재시도, 헤지 요청을 적용합니다.
+
+    call(kind, fn)의 fn은 남은 시간(초)을 timeout 인자로 받아 API를 한 번 호출하는 함수입니다.
+    비동기 클라이언트는 코루틴 함수를 받는 acall()을 사용합니다 (집계와 지연 기록은 공유).
+    헤지가 켜진 종류는 첫 요청이 최근 p95 지연을 넘기면 같은 요청을 한 번 더 보내고
+    먼저 도착한 응답을 사용합니다 (늦은 요청은 백그라운드에서 끝나고 결과는 버림).
+    헤지 요청은 LLM_HEDGE_WORKERS 크기의 풀에서만 실행하며, 풀이 가득 차면 헤지 없이 첫 요청을 기다립니다.
+    """
+
+    def __init__(self, policies=None, hedge_delay=None, max_workers=None):
+        self.policies = {kind: dict(policy) for kind, policy in CALL_POLICIES.items()}
+        for kind, policy in (policies or {}).items():
+            self.policies.setdefault(kind, dict(CALL_POLICIES["text"])).update(policy)
+        self.hedge_delay = DEFAULT_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self.latency = LatencyTracker()
+        max_workers = max_workers or DEFAULT_HEDGE_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        # 헤지 요청이 풀 대기열에서 기다리지 않도록 빈 작업자 수만큼만 헤지를 보냄
+        self._hedge_slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def _count(self, kind, name, amount=1):
+        with self._lock:
+            self._counts.setdefault(kind, Counter())[name] += amount
+
+    def policy(self, kind):
+        return self.policies.get(kind) or self.policies["text"]
+
+    def hedge_after(self, kind):
+        """헤지 요청을 보내기까지 기다릴 시간 (최근 지연 p95, 표본이 부족하면 기본값)."""
+        p95 = self.latency.percentile(kind, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+        return self.hedge_delay if p95 is None else p95
+
+    def call(self, kind, fn, hedge=True, retry_if=None):
+        """정책을 적용해 fn(timeout)을 호출하고 결과를 반환합니다.
+
+        hedge=False이면 헤지 요청을 보내지 않습니다 (스트리밍 호출 등).
+        retry_if가 주어지면 그 결과가 참일 때만 재시도합니다.
+        마감 시간이 지나면 DeadlineExceeded를, 재시도할 수 없는 오류는 그대로 발생시킵니다.
+        """
+        policy = self.policy(kind)
+        deadline = time.monotonic() + policy["deadline"]
+        hedge = hedge and policy["hedge"]
+        self._count(kind, "calls")
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count(kind, "deadline_exceeded")
+                raise DeadlineExceeded(f"LLM 호출 마감 시간 초과 ({kind}, {policy['deadline']}초)")
+            try:
+                if hedge:
+                    return self._call_hedged(kind, fn, deadline)
+                started = time.monotonic()
+                result = fn(remaining)
+                self.latency.record(kind, time.monotonic() - started)
+                return result
+            except DeadlineExceeded:
+                self._count(kind, "deadline_exceeded")
+                raise
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(kind, attempt, e, deadline, retry_if)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def acall(self, kind, fn, hedge=True, retry_if=None):
+        """call()의 asyncio 버전입니다. fn은 timeout 인자를 받는 코루틴 함수입니다.
+
+        헤지 요청을 보낸 경우 먼저 끝난 쪽의 결과를 사용하고 나머지 요청은 취소합니다.
+        """
+        policy = self.policy(kind)
+        deadline = time.monotonic() + policy["deadline"]
+        hedge = hedge and policy["hedge"]
+        self._count(kind, "calls")
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count(kind, "deadline_exceeded")
+                raise DeadlineExceeded(f"LLM 호출 마감 시간 초과 ({kind}, {policy['deadline']}초)")
+            try:
+                if hedge:
+                    return await self._acall_hedged(kind, fn, deadline)
+                started = time.monotonic()
+                result = await fn(remaining)
+                self.latency.record(kind, time.monotonic() - started)
+                return result
+            except DeadlineExceeded:
+                self._count(kind, "deadline_exceeded")
+                raise
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(kind, attempt, e, deadline, retry_if)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def _retry_delay(self, kind, attempt, error, deadline, retry_if):
+        """attempt번째 재시도까지 기다릴 시간(초)을 반환합니다. 재시도하지 않을 오류면 None."""
+        policy = self.policy(kind)
+        retryable = is_retryable(error) and (retry_if is None or retry_if())
+        if not retryable or attempt > policy["retries"]:
+            self._count(kind, "failures")
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            delay = backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP)
+        delay = min(delay, max(0.0, deadline - time.monotonic()))
+        self._count(kind, "retries")
+        logger.warning("LLM 호출 실패 (%s), %.2f초 후 재시도 (%d/%d): %s", kind, delay, attempt, policy["retries"], error)
+        return delay
+
+    def _call_hedged(self, kind, fn, deadline):
+        """첫 요청이 p95 지연을 넘기면 헤지 요청을 보내고 먼저 성공한 결과를 반환합니다.
+
+        첫 요청은 호출마다 별도 스레드에서 바로 실행하므로 풀 크기에 묶이거나 대기열에서 기다리지 않습니다.
+        헤지 요청만 풀에서 실행하며, 풀이 모두 사용 중이면 대기열에 넣지 않고 헤지를 건너뜁니다.
+        각 시도의 타임아웃은 시도가 실제로 시작될 때의 남은 시간이고, 지연은 호출 시작 시점부터 기록합니다.
+        """
+        started = time.monotonic()
+        results = queue.Queue()
+
+        def attempt(name):
+            try:
+                results.put((name, fn(deadline - time.monotonic()), None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        def hedge_attempt():
+            try:
+                attempt("hedge")
+            finally:
+                self._hedge_slots.release()
+
+        threading.Thread(target=attempt, args=("primary",), name="llm-primary", daemon=True).start()
+        hedge_at = started + min(self.hedge_after(kind), max(0.0, deadline - started))
+        outstanding = 1
+        hedged = False
+        error = None
+        while outstanding:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait_until = deadline if hedged else min(deadline, hedge_at)
+            try:
+                name, result, exc = results.get(timeout=max(0.0, wait_until - now))
+            except queue.Empty:
+                if not hedged and time.monotonic() < deadline:
+                    hedged = True
+                    if self._hedge_slots.acquire(blocking=False):
+                        logger.debug("LLM 응답 지연 (%s, %.2f초 초과), 헤지 요청 전송", kind, hedge_at - started)
+                        self._count(kind, "hedges")
+                        self._executor.submit(hedge_attempt)
+                        outstanding += 1
+                    else:
+                        self._count(kind, "hedges_skipped")
+                continue
+            outstanding -= 1
+            if exc is not None:
+                error = error or exc
+                continue
+            self.latency.record(kind, time.monotonic() - started)
+            if name == "hedge":
+                self._count(kind, "hedge_wins")
+            return result
+        if error is not None and not outstanding:
+            raise error
+        raise DeadlineExceeded(f"LLM 호출 마감 시간 초과 ({kind})")
+
+    async def _acall_hedged(self, kind, fn, deadline):
+        """_call_hedged()의 asyncio 버전입니다. 헤지 요청은 태스크로 실행하므로 풀 제한이 없습니다."""
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn(deadline - started))
+        pending = {primary}
+        try:
+            hedge_after = min(self.hedge_after(kind), max(0.0, deadline - started))
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done and time.monotonic() < deadline:
+                logger.debug("LLM 응답 지연 (%s, %.2f초 초과), 헤지 요청 전송", kind, hedge_after)
+                self._count(kind, "hedges")
+                pending.add(asyncio.ensure_future(fn(deadline - time.monotonic())))
+            error = None
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                # 모든 완료 태스크의 예외를 꺼내 두어야 "예외를 확인하지 않음" 경고가 나지 않음
+                errors = {task: task.exception() for task in done}
+                for task, exc in errors.items():
+                    if exc is None:
+                        self.latency.record(kind, time.monotonic() - started)
+                        if task is not primary:
+                            self._count(kind, "hedge_wins")
+                        return task.result()
+                    error = error or exc
+            if error is not None and not pending:
+                raise error
+            raise DeadlineExceeded(f"LLM 호출 마감 시간 초과 ({kind})")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        """종류별 호출/재시도/실패/헤지 횟수와 최근 지연 p50, p95(ms)를 반환합니다."""
+        with self._lock:
+            counts = {kind: dict(counter) for kind, counter in self._counts.items()}
+        stats = {}
+        for kind, counter in counts.items():
+            p50 = self.latency.percentile(kind, 50)
+            p95 = self.latency.percentile(kind, 95)
+            stats[kind] = {
+                "calls": counter.get("calls", 0),
+                "retries": counter.get("retries", 0),
+                "failures": counter.get("failures", 0),
+                "deadline_exceeded": counter.get("deadline_exceeded", 0),
+                "hedges": counter.get("hedges", 0),
+                "hedge_wins": counter.get("hedge_wins", 0),
+                "hedges_skipped": counter.get("hedges_skipped", 0),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "deadline": self.policy(kind)["deadline"],
+                "hedge": self.policy(kind)["hedge"]
+            }
+        return stats
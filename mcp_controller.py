@@ -1,13 +1,24 @@
-import json
 import re
 import os
+import queue
+import threading
 from notion_client import NotionMCPClient
+from notion_mirror import NotionMirror
+from search_index import SearchIndex, page_property_texts
+from intent_classifier import IntentClassifier, FAST_PATH_ENABLED, GENERAL_CHAT
 from openai_client import OpenAIMCPClient
+from conversation_memory import ConversationWindow
 from dotenv import load_dotenv
+from mcp_logging import get_logger, LazyJSON
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+logger = get_logger("controller")
+
+# 조회 명령에 limit이 없을 때 표시할 최대 페이지 수 (블록 트리는 표시하는 페이지만 가져옴)
+DEFAULT_QUERY_LIMIT = int(os.getenv("NOTION_QUERY_LIMIT", "20"))
+
 class MCPController:
     def __init__(self, notion_api_key=None, openai_api_key=None):
         """노션 및 OpenAI 클라이언트를 초기화합니다."""
@@ -17,88 +28,148 @@ class MCPController:
         
         self.notion_client = NotionMCPClient(api_key=notion_api_key)
         self.openai_client = OpenAIMCPClient(api_key=openai_api_key)
-        self.conversation_history = []  # 대화 기록 저장
+        # NOTION_MIRROR_PATH가 설정되어 있으면 로컬 SQLite 미러로 읽기 요청을 처리
+        self.notion_mirror = NotionMirror(self.notion_client) if os.getenv("NOTION_MIRROR_PATH") else None
+        # 페이지 전문 검색용 역색인 (미러 동기화, 페이지 생성/블록 추가 시 증분 갱신)
+        self.search_index = SearchIndex()
+        self.notion_client.search_index = self.search_index
+        if self.notion_mirror:
+            self.notion_mirror.search_index = self.search_index
+            self.search_index.add_from_mirror(self.notion_mirror)
+        # 명백한 입력은 LLM 없이 로컬에서 의도를 분류
+        self.intent_classifier = IntentClassifier() if FAST_PATH_ENABLED else None
+        # 토큰 예산 안에서 최근 대화를 유지하고 밀려난 대화는 백그라운드에서 요약
+        self.conversation = ConversationWindow(summarizer=self.openai_client.summarize_conversation)
+        # 스트리밍 요청의 진행 이벤트를 받을 리스너 (요청 스레드별)
+        self._progress = threading.local()
+    
+    def _emit(self, event, **data):
+        """스트리밍 중인 요청이면 진행 이벤트를 전달합니다."""
+        listener = getattr(self._progress, "listener", None)
+        if listener is not None:
+            listener(event, data)
+    
+    def _token_callback(self):
+        """스트리밍 중이면 생성된 텍스트 조각을 token 이벤트로 보내는 콜백을, 아니면 None을 반환합니다."""
+        if getattr(self._progress, "listener", None) is None:
+            return None
+        return lambda text: self._emit("token", text=text)
+    
+    def process_command_stream(self, command):
+        """process_command를 실행하면서 진행 이벤트를 (이벤트 이름, 데이터) 튜플로 하나씩 반환합니다.
+        
+        intent, database, token, page_created 이벤트가 발생하는 대로 전달되고,
+        마지막에 최종 응답을 담은 result 이벤트가 전달됩니다.
+        """
+        events = queue.Queue()
+        done = object()
+        
+        def run():
+            self._progress.listener = lambda event, data: events.put((event, data))
+            try:
+                result = self.process_command(command)
+                events.put(("result", {"result": result}))
+            except Exception as e:
+                events.put(("error", {"error": str(e)}))
+            finally:
+                self._progress.listener = None
+                events.put(done)
+        
+        threading.Thread(target=run, name="mcp-command-stream", daemon=True).start()
+        while True:
+            item = events.get()
+            if item is done:
+                return
+            yield item
     
     def process_command(self, command):
         """사용자 명령어를 처리합니다."""
         try:
-            print(f"\n[디버그] 입력 명령: '{command}'")
+            logger.debug("입력 명령: '%s'", command)
             
-            # 사용자 입력의 의도 분석
-            intent_result = self.openai_client.analyze_intent(command)
-            print(f"\n[디버그] 의도 분석 결과(원본): {intent_result}")
+            # 로컬 분류기가 확신하면 의도 분석 LLM 호출을 건너뜀
+            fast_intent = self.intent_classifier.classify(command) if self.intent_classifier else None
+            action_data = None
+            if fast_intent and fast_intent.get("action"):
+                # 매개변수가 없는 명령은 LLM 없이 바로 실행
+                action_data = {"action": fast_intent["action"], "parameters": {}}
+            elif fast_intent and fast_intent["intent"] == GENERAL_CHAT:
+                action_data = {"action": "general_chat"}
             
-            try:
-                intent_data = json.loads(intent_result)
-                print(f"\n[디버그] 의도 분석 결과(파싱됨): {intent_data}")
-                
-                if intent_data["intent"] == "notion_command":
+            source = "local" if action_data else "llm"
+            
+            # 도구 호출 한 번으로 의도 분석과 명령 파싱을 함께 처리
+            if action_data is None and self.openai_client.tool_calling:
+                action_data = self.openai_client.route_command(command, self.conversation.messages())
+            
+            if action_data is None:
+                # 사용자 입력의 의도 분석 (파싱된 딕셔너리로 전달됨)
+                intent_data = fast_intent or self.openai_client.analyze_intent(command)
+                logger.debug("의도 분석 결과: %s", LazyJSON(intent_data))
+                if intent_data.get("intent") == "notion_command":
                     # Notion 관련 명령 처리
-                    parsed_command = self.openai_client.parse_notion_command(command)
-                    print(f"\n[디버그] 명령 분석 결과(원본):\n{parsed_command}")
-                    
-                    try:
-                        # JSON 형식으로 파싱
-                        action_data = json.loads(parsed_command)
-                        print(f"\n[디버그] 파싱된 JSON:\n{json.dumps(action_data, indent=2, ensure_ascii=False)}")
-                        
-                        # 명령에 따라 적절한 작업 수행
-                        action = action_data.get("action")
-                        print(f"\n[디버그] 감지된 작업: {action}")
-                        
-                        if action == "create_page":
-                            return self._create_page(action_data.get("parameters"))
-                        elif action == "create_database":
-                            return self._create_database(action_data.get("parameters"))
-                        elif action == "create_page_in_workspace":
-                            return self._create_page_in_workspace(action_data.get("parameters"))
-                        elif action == "update_page":
-                            return self._update_page(action_data.get("parameters"))
-                        elif action == "query_database":
-                            return self._query_database(action_data.get("parameters"))
-                        elif action == "get_databases":
-                            return self._get_databases()
-                        elif action == "generate_content":
-                            return self._generate_content(action_data.get("parameters"))
-                        else:
-                            return f"지원하지 않는 작업: {action}"
-                    except json.JSONDecodeError as e:
-                        print(f"\n[디버그] 명령 JSON 파싱 오류: {str(e)}")
-                        # 일반 대화로 처리
-                        response = self.openai_client.chat(command, self.conversation_history)
-                        return f"명령 형식 오류. 일반 응답으로 대체합니다: {response}"
+                    action_data = self.openai_client.parse_notion_command(command)
                 else:
-                    # 일반 대화 처리
-                    response = self.openai_client.chat(command, self.conversation_history)
-                    
-                    # 대화 기록 업데이트
-                    self.conversation_history.append({"role": "user", "content": command})
-                    self.conversation_history.append({"role": "assistant", "content": response})
-                    
-                    # 대화 기록이 너무 길어지면 초기화
-                    if len(self.conversation_history) > 10:  # 최대 5개의 대화 쌍 유지
-                        self.conversation_history = []
-                    
-                    return response
-            except json.JSONDecodeError as e:
-                print(f"\n[디버그] 의도 JSON 파싱 오류: {str(e)}")
-                # 의도 분석이 실패하면 일반 대화로 처리
-                response = self.openai_client.chat(command, self.conversation_history)
+                    action_data = {"action": "general_chat"}
+            logger.debug("명령 분석 결과:\n%s", LazyJSON(action_data, indent=2))
+            self._emit(
+                "intent",
+                intent=GENERAL_CHAT if action_data.get("action") == "general_chat" else "notion_command",
+                action=action_data.get("action"),
+                source=source
+            )
+            
+            if action_data.get("action") == "general_chat":
+                # 일반 대화 처리 (라우팅 단계에서 이미 답변했으면 그대로 사용)
+                # 라우팅 응답은 스트리밍되지 않으므로 스트리밍 중이면 chat()으로 다시 요청해 조각 단위로 전달
+                on_token = self._token_callback()
+                response = action_data.get("response")
+                if not response or on_token is not None:
+                    response = self.openai_client.chat(command, self.conversation.messages(), on_token=on_token)
                 
-                # 대화 기록 업데이트
-                self.conversation_history.append({"role": "user", "content": command})
-                self.conversation_history.append({"role": "assistant", "content": response})
+                # 대화 기록 업데이트 (예산을 넘으면 오래된 대화부터 요약으로 접어 넣음)
+                self.conversation.add_turn(command, response)
                 
                 return response
+            
+            return self._dispatch_action(action_data)
                 
         except Exception as e:
-            print(f"\n[디버그] 전역 예외 발생: {str(e)}")
+            logger.error("전역 예외 발생: %s", e)
             return f"명령 처리 중 오류 발생: {str(e)}"
     
+    def _dispatch_action(self, action_data):
+        """분석된 노션 작업을 해당 처리 함수로 실행합니다."""
+        # 명령에 따라 적절한 작업 수행
+        action = action_data.get("action")
+        parameters = action_data.get("parameters") or {}
+        logger.debug("감지된 작업: %s", action)
+        
+        if action == "create_page":
+            return self._create_page(parameters)
+        elif action == "create_pages_bulk":
+            return self._create_pages_bulk(parameters)
+        elif action == "create_database":
+            return self._create_database(parameters)
+        elif action == "create_page_in_workspace":
+            return self._create_page_in_workspace(parameters)
+        elif action == "update_page":
+            return self._update_page(parameters)
+        elif action == "query_database":
+            return self._query_database(parameters)
+        elif action == "search_pages":
+            return self._search_pages(parameters)
+        elif action == "get_databases":
+            return self._get_databases()
+        elif action == "generate_content":
+            return self._generate_content(parameters)
+        else:
+            return f"지원하지 않는 작업: {action}"
+    
     def _create_database(self, parameters):
         """노션 데이터베이스를 생성합니다."""
         try:
-            print(f"\n[디버그] 데이터베이스 생성 매개변수: {json.dumps(parameters, indent=2, ensure_ascii=False)}")
+            logger.debug("데이터베이스 생성 매개변수: %s", LazyJSON(parameters, indent=2))
             
             title = parameters.get("title", "새 데이터베이스")
             parent_page_id = parameters.get("parent_page_id", None)
@@ -112,7 +183,7 @@ class MCPController:
                 
                 if 'id' in page_response:
                     parent_page_id = page_response['id']
-                    print(f"\n[디버그] 부모 페이지 생성됨: {parent_page_id}")
+                    logger.debug("부모 페이지 생성됨: %s", parent_page_id)
                 else:
                     return f"부모 페이지 생성 실패: {page_response}"
             
@@ -138,56 +209,21 @@ class MCPController:
             # 콘텐츠 생성
             children = []
             if content_prompt:
-                content = self.openai_client.generate_notion_content(content_prompt, content_type)
+                content = self.openai_client.generate_notion_content(content_prompt, content_type, on_token=self._token_callback())
                 
-                # 생성된 내용을 블록으로 변환
-                if content_type == "text":
-                    for paragraph in content.split("\n\n"):
-                        if paragraph.strip():
-                            children.append({
-                                "object": "block", 
-                                "type": "paragraph",
-                                "paragraph": {
-                                    "rich_text": [{"type": "text", "text": {"content": paragraph}}]
-                                }
-                            })
-                elif content_type in ["todo", "bullet"]:
-                    for line in content.split("\n"):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        if line.startswith("- [ ]"):
-                            children.append({
-                                "object": "block", 
-                                "type": "to_do",
-                                "to_do": {
-                                    "rich_text": [{"type": "text", "text": {"content": line[5:].strip()}}],
-                                    "checked": False
-                                }
-                            })
-                        elif line.startswith("-"):
-                            children.append({
-                                "object": "block", 
-                                "type": "bulleted_list_item",
-                                "bulleted_list_item": {
-                                    "rich_text": [{"type": "text", "text": {"content": line[1:].strip()}}]
-                                }
-                            })
-                        else:
-                            children.append({
-                                "object": "block", 
-                                "type": "paragraph",
-                                "paragraph": {
-                                    "rich_text": [{"type": "text", "text": {"content": line}}]
-                                }
-                            })
+                # 생성된 내용을 블록으로 변환 (업로드와 함께 순차적으로 변환됨)
+                children = self._content_to_blocks(content, content_type)
             
             # 페이지 생성
             response = self.notion_client.create_page_in_workspace(title, icon, children)
             
             if 'id' in response:
+                self._emit("page_created", id=response['id'], url=response.get('url', ''))
                 page_url = response.get('url', '')
-                return f"워크스페이스에 페이지 '{title}' 생성 완료 (ID: {response.get('id')})\n링크: {page_url}"
+                message = f"워크스페이스에 페이지 '{title}' 생성 완료 (ID: {response.get('id')})\n링크: {page_url}"
+                if 'append_error' in response:
+                    message += f"\n⚠️ 일부 내용 추가 실패: {response['append_error']}"
+                return message
             else:
                 return f"페이지 생성 실패: {response}"
         except Exception as e:
@@ -196,34 +232,22 @@ class MCPController:
     def _create_page(self, parameters):
         """노션 페이지를 생성합니다."""
         try:
-            print(f"\n[디버그] 페이지 생성 매개변수: {json.dumps(parameters, indent=2, ensure_ascii=False)}")
+            logger.debug("페이지 생성 매개변수: %s", LazyJSON(parameters, indent=2))
             
             parent_id = parameters.get("parent_id")
             properties = parameters.get("properties", {})
             
             # 부모 ID가 실제 UUID가 아닌 텍스트 설명인 경우 처리
-            if parent_id and not self._is_valid_uuid(parent_id):
-                # 데이터베이스 이름에서 추출
-                db_name_match = re.search(r"(.*?)(?:\s+데이터베이스(?:\s+ID)?)?$", parent_id)
-                if db_name_match:
-                    db_name = db_name_match.group(1).strip()
-                    print(f"\n[디버그] 데이터베이스 이름 '{db_name}'으로 ID 검색 중")
-                    actual_id = self.notion_client.find_database_by_name(db_name)
-                    if actual_id:
-                        parent_id = actual_id
-                        print(f"\n[디버그] 데이터베이스 ID를 찾았습니다: {parent_id}")
-                    else:
-                        print(f"\n[디버그] 데이터베이스 '{db_name}'을 찾을 수 없습니다.")
-                        parent_id = None
+            parent_id = self._resolve_database_id(parent_id)
             
             # 데이터베이스 ID가 없는 경우 처리
             if not parent_id:
-                # 사용자의 데이터베이스 목록 가져오기
-                databases = self.notion_client.get_databases()
-                if 'results' in databases and len(databases['results']) > 0:
+                # 사용자의 데이터베이스 목록 가져오기 (캐시된 카탈로그 사용)
+                databases = self.notion_client.database_catalog.entries()
+                if databases:
                     # 첫 번째 데이터베이스 사용
-                    parent_id = databases['results'][0]['id']
-                    print(f"\n[디버그] 데이터베이스 ID 없음. 첫 번째 데이터베이스 사용: {parent_id}")
+                    parent_id = databases[0]['id']
+                    logger.debug("데이터베이스 ID 없음. 첫 번째 데이터베이스 사용: %s", parent_id)
                 else:
                     # 데이터베이스가 없으면 워크스페이스에 페이지를 생성
                     title = parameters.get("title", "새 페이지")
@@ -238,174 +262,317 @@ class MCPController:
                         "icon": icon
                     })
             
-            # 데이터베이스 스키마 확인
-            db_info = self.notion_client.get_database(parent_id)
-            print(f"\n[디버그] 데이터베이스 스키마: {json.dumps(db_info.get('properties', {}), indent=2, ensure_ascii=False)}")
-            
-            # 속성 이름 매핑 (영어 -> 한글)
-            property_name_mapping = {
-                "Name": "이름",
-                "Description": "설명",
-                "Status": "상태",
-                "Date": "날짜",
-                "Tags": "태그",
-                "Priority": "우선순위",
-                "Assignee": "담당자",
-                "Created": "생성일",
-                "Updated": "수정일"
-            }
-            
-            # 매핑된 속성 이름으로 변환
-            mapped_properties = {}
-            for prop_name, prop_value in properties.items():
-                # 매핑된 이름이 있으면 사용, 없으면 원래 이름 사용
-                mapped_name = property_name_mapping.get(prop_name, prop_name)
-                mapped_properties[mapped_name] = prop_value
-                print(f"\n[디버그] 속성 이름 매핑: {prop_name} -> {mapped_name}")
-            
-            # 페이지 타이틀 속성이 없으면 기본값 추가
-            if mapped_properties and not any('title' in prop for prop in mapped_properties.values()):
-                # 타이틀 속성 찾기
-                title_property = None
-                for prop_name, prop_info in db_info.get('properties', {}).items():
-                    if prop_info.get('type') == 'title':
-                        title_property = prop_name
-                        break
-                
-                if title_property and title_property not in mapped_properties:
-                    title_content = parameters.get('title', '새 페이지')
-                    mapped_properties[title_property] = {
-                        "title": [{"text": {"content": title_content}}]
-                    }
-                    print(f"\n[디버그] 페이지 타이틀 자동 추가: {title_property} = {title_content}")
-            
-            # 속성 타입 검증 및 수정
-            validated_properties = {}
-            for prop_name, prop_value in mapped_properties.items():
-                # 데이터베이스에 해당 속성이 있는지 확인
-                if prop_name in db_info.get('properties', {}):
-                    prop_type = db_info['properties'][prop_name].get('type')
-                    print(f"\n[디버그] 속성 '{prop_name}' 타입: {prop_type}")
-                    
-                    # 속성 타입에 따라 적절한 형식으로 변환
-                    if prop_type == 'title':
-                        # title 타입은 title 키가 있어야 함
-                        if isinstance(prop_value, list) and len(prop_value) > 0:
-                            # 리스트 형식으로 제공된 경우
-                            validated_properties[prop_name] = {"title": prop_value}
-                        elif 'title' in prop_value:
-                            # 이미 title 키가 있는 경우
-                            validated_properties[prop_name] = prop_value
-                        else:
-                            # 텍스트만 제공된 경우
-                            validated_properties[prop_name] = {
-                                "title": [{"text": {"content": str(prop_value)}}]
-                            }
-                    elif prop_type == 'rich_text' and 'rich_text' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'number' and 'number' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'select' and 'select' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'multi_select' and 'multi_select' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'date' and 'date' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'formula':
-                        # formula 타입은 읽기 전용이므로 제외
-                        print(f"\n[디버그] formula 타입 속성 '{prop_name}'은 제외됨 (읽기 전용)")
-                    elif prop_type == 'relation':
-                        # relation 타입은 특별한 처리가 필요하므로 제외
-                        print(f"\n[디버그] relation 타입 속성 '{prop_name}'은 제외됨 (특별한 처리 필요)")
-                    elif prop_type == 'rollup':
-                        # rollup 타입은 읽기 전용이므로 제외
-                        print(f"\n[디버그] rollup 타입 속성 '{prop_name}'은 제외됨 (읽기 전용)")
-                    elif prop_type == 'people' and 'people' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'files' and 'files' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'checkbox' and 'checkbox' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'url' and 'url' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'email' and 'email' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    elif prop_type == 'phone_number' and 'phone_number' in prop_value:
-                        validated_properties[prop_name] = prop_value
-                    else:
-                        # 알 수 없는 타입이거나 속성 형식이 맞지 않는 경우
-                        print(f"\n[디버그] 속성 '{prop_name}'의 타입 '{prop_type}'은 지원되지 않거나 형식이 맞지 않음")
-                else:
-                    # 데이터베이스에 없는 속성은 제외
-                    print(f"\n[디버그] 데이터베이스에 없는 속성 '{prop_name}'은 제외됨")
+            self._emit("database", id=parent_id)
+            
+            # 데이터베이스 스키마 확인 (캐시 사용)
+            schema = self.notion_client.get_database_schema(parent_id)
+            property_types = schema['property_types']
+            logger.debug("데이터베이스 스키마: %s", property_types)
+            
+            validated_properties = self._validate_properties(properties, schema, parameters.get('title', '새 페이지'))
             
             # 페이지 내용이 문자열로 제공된 경우 OpenAI로 생성
             if "content_prompt" in parameters:
                 content_type = parameters.get("content_type", "text")
                 content = self.openai_client.generate_notion_content(
-                    parameters.get("content_prompt"), content_type
+                    parameters.get("content_prompt"), content_type, on_token=self._token_callback()
                 )
                 
-                # 생성된 내용을 블록으로 변환
-                if content_type == "text":
-                    children = []
-                    for paragraph in content.split("\n\n"):
-                        if paragraph.strip():
-                            children.append({
-                                "object": "block", 
-                                "type": "paragraph",
-                                "paragraph": {
-                                    "rich_text": [{"type": "text", "text": {"content": paragraph}}]
-                                }
-                            })
-                elif content_type in ["todo", "bullet"]:
-                    # TODO 및 bullet 목록을 파싱하여 Notion 형식으로 변환
-                    children = []
-                    for line in content.split("\n"):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        if line.startswith("- [ ]"):
-                            children.append({
-                                "object": "block", 
-                                "type": "to_do",
-                                "to_do": {
-                                    "rich_text": [{"type": "text", "text": {"content": line[5:].strip()}}],
-                                    "checked": False
-                                }
-                            })
-                        elif line.startswith("-"):
-                            children.append({
-                                "object": "block", 
-                                "type": "bulleted_list_item",
-                                "bulleted_list_item": {
-                                    "rich_text": [{"type": "text", "text": {"content": line[1:].strip()}}]
-                                }
-                            })
-                        else:
-                            # 그 외의 텍스트는 단락으로 처리
-                            children.append({
-                                "object": "block", 
-                                "type": "paragraph",
-                                "paragraph": {
-                                    "rich_text": [{"type": "text", "text": {"content": line}}]
-                                }
-                            })
+                # 생성된 내용을 블록으로 변환 (업로드와 함께 순차적으로 변환됨)
+                children = self._content_to_blocks(content, content_type)
             else:
                 children = parameters.get("children", [])
             
             # 페이지 생성
-            print(f"\n[디버그] 페이지 생성 요청: parent_id={parent_id}, properties={validated_properties}")
+            logger.debug("페이지 생성 요청: parent_id=%s, properties=%s", parent_id, validated_properties)
             result = self.notion_client.create_page(parent_id, validated_properties, children)
             
             if 'id' in result:
+                self._emit("page_created", id=result['id'], url=result.get('url', ''))
+                if self.notion_mirror and self.notion_mirror.is_mirrored(parent_id):
+                    # 새 페이지가 반영될 때까지 미러 대신 노션 API로 조회
+                    self.notion_mirror.mark_stale(parent_id)
+                    self.notion_mirror.sync_in_background(parent_id)
                 page_url = result.get('url', '')
-                return f"페이지 생성 완료: {result.get('id')}\n링크: {page_url}"
+                message = f"페이지 생성 완료: {result.get('id')}\n링크: {page_url}"
+                if 'append_error' in result:
+                    message += f"\n⚠️ 일부 내용 추가 실패: {result['append_error']}"
+                return message
             else:
                 return f"페이지 생성 실패: {result}"
         except Exception as e:
             return f"페이지 생성 중 오류 발생: {str(e)}"
     
+    def _resolve_database_id(self, database):
+        """데이터베이스 이름(또는 "xx 데이터베이스" 같은 설명)을 ID로 바꿉니다. 찾지 못하면 None."""
+        if not database or self._is_valid_uuid(database):
+            return database
+        # 데이터베이스 이름에서 추출
+        db_name_match = re.search(r"(.*?)(?:\s+데이터베이스(?:\s+ID)?)?$", database)
+        if not db_name_match:
+            return None
+        db_name = db_name_match.group(1).strip()
+        logger.debug("데이터베이스 이름 '%s'으로 ID 검색 중", db_name)
+        actual_id = self.notion_client.find_database_by_name(db_name)
+        if actual_id:
+            logger.debug("데이터베이스 ID를 찾았습니다: %s", actual_id)
+        else:
+            logger.debug("데이터베이스 '%s'을 찾을 수 없습니다.", db_name)
+        return actual_id
+    
+    def _coerce_property_value(self, prop_type, value):
+        """문자열/숫자 같은 단순 값을 노션 속성 값 형식으로 감쌉니다. 이미 형식이 맞으면 그대로 반환합니다."""
+        if isinstance(value, dict) or (prop_type == 'title' and isinstance(value, list)):
+            return value
+        if prop_type == 'title':
+            return {"title": [{"text": {"content": str(value)}}]}
+        if prop_type == 'rich_text':
+            return {"rich_text": [{"text": {"content": str(value)}}]}
+        if prop_type == 'number' and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return {"number": value}
+        if prop_type in ('select', 'status') and isinstance(value, str):
+            return {prop_type: {"name": value}}
+        if prop_type == 'multi_select':
+            names = value if isinstance(value, list) else [name.strip() for name in str(value).split(",")]
+            return {"multi_select": [{"name": str(name)} for name in names if name]}
+        if prop_type == 'date' and isinstance(value, str):
+            return {"date": {"start": value}}
+        if prop_type == 'checkbox' and isinstance(value, bool):
+            return {"checkbox": value}
+        if prop_type in ('url', 'email', 'phone_number') and isinstance(value, str):
+            return {prop_type: value}
+        return value
+    
+    def _validate_properties(self, properties, schema, title="새 페이지"):
+        """속성 이름을 데이터베이스 스키마에 맞추고 형식이 맞지 않는 속성을 제외합니다."""
+        property_types = schema['property_types']
+        
+        # 속성 이름 매핑 (영어 -> 한글)
+        property_name_mapping = {
+            "Name": "이름",
+            "Description": "설명",
+            "Status": "상태",
+            "Date": "날짜",
+            "Tags": "태그",
+            "Priority": "우선순위",
+            "Assignee": "담당자",
+            "Created": "생성일",
+            "Updated": "수정일"
+        }
+        
+        # 매핑된 속성 이름으로 변환
+        mapped_properties = {}
+        for prop_name, prop_value in properties.items():
+            # 데이터베이스에 같은 이름이 없을 때만 매핑된 이름 사용
+            mapped_name = prop_name if prop_name in property_types else property_name_mapping.get(prop_name, prop_name)
+            mapped_properties[mapped_name] = prop_value
+            logger.debug("속성 이름 매핑: %s -> %s", prop_name, mapped_name)
+        
+        # 페이지 타이틀 속성이 없으면 기본값 추가
+        if not any(isinstance(prop, dict) and 'title' in prop for prop in mapped_properties.values()):
+            # 타이틀 속성 찾기
+            title_property = schema['title_property']
+            
+            if title_property and title_property not in mapped_properties:
+                mapped_properties[title_property] = {
+                    "title": [{"text": {"content": title}}]
+                }
+                logger.debug("페이지 타이틀 자동 추가: %s = %s", title_property, title)
+        
+        # 속성 타입 검증 및 수정
+        validated_properties = {}
+        for prop_name, prop_value in mapped_properties.items():
+            # 데이터베이스에 해당 속성이 있는지 확인
+            if prop_name in property_types:
+                prop_type = property_types[prop_name]
+                logger.debug("속성 '%s' 타입: %s", prop_name, prop_type)
+                prop_value = self._coerce_property_value(prop_type, prop_value)
+        
+                # 속성 타입에 따라 적절한 형식으로 변환
+                if prop_type == 'title':
+                    # title 타입은 title 키가 있어야 함
+                    if isinstance(prop_value, list) and len(prop_value) > 0:
+                        # 리스트 형식으로 제공된 경우
+                        validated_properties[prop_name] = {"title": prop_value}
+                    elif 'title' in prop_value:
+                        # 이미 title 키가 있는 경우
+                        validated_properties[prop_name] = prop_value
+                    else:
+                        # 텍스트만 제공된 경우
+                        validated_properties[prop_name] = {
+                            "title": [{"text": {"content": str(prop_value)}}]
+                        }
+                elif prop_type == 'rich_text' and 'rich_text' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'number' and 'number' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'select' and 'select' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'status' and 'status' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'multi_select' and 'multi_select' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'date' and 'date' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'formula':
+                    # formula 타입은 읽기 전용이므로 제외
+                    logger.debug("formula 타입 속성 '%s'은 제외됨 (읽기 전용)", prop_name)
+                elif prop_type == 'relation':
+                    # relation 타입은 특별한 처리가 필요하므로 제외
+                    logger.debug("relation 타입 속성 '%s'은 제외됨 (특별한 처리 필요)", prop_name)
+                elif prop_type == 'rollup':
+                    # rollup 타입은 읽기 전용이므로 제외
+                    logger.debug("rollup 타입 속성 '%s'은 제외됨 (읽기 전용)", prop_name)
+                elif prop_type == 'people' and 'people' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'files' and 'files' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'checkbox' and 'checkbox' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'url' and 'url' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'email' and 'email' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                elif prop_type == 'phone_number' and 'phone_number' in prop_value:
+                    validated_properties[prop_name] = prop_value
+                else:
+                    # 알 수 없는 타입이거나 속성 형식이 맞지 않는 경우
+                    logger.debug("속성 '%s'의 타입 '%s'은 지원되지 않거나 형식이 맞지 않음", prop_name, prop_type)
+            else:
+                # 데이터베이스에 없는 속성은 제외
+                logger.debug("데이터베이스에 없는 속성 '%s'은 제외됨", prop_name)
+        
+        return validated_properties
+    
+    def create_pages_bulk(self, database, rows, max_workers=None):
+        """여러 행을 데이터베이스 페이지로 한 번에 생성합니다.
+        
+        데이터베이스와 스키마는 한 번만 확인하고, 모든 행을 먼저 검증한 뒤 유효한 행만
+        제한된 수의 작업자로 동시에 생성합니다. rows의 각 항목은 속성 이름 -> 값 딕셔너리
+        (값은 단순 값 또는 노션 속성 형식)이거나 {"title", "properties", "content"} 형태이며,
+        문자열이면 제목으로 사용합니다.
+        {"database_id", "created", "failed", "results": [{"index", "id"/"error", ...}]}를 반환합니다.
+        """
+        database_id = self._resolve_database_id(database)
+        if not database_id:
+            return {"error": f"데이터베이스를 찾을 수 없습니다: {database}"}
+        self._emit("database", id=database_id)
+        schema = self.notion_client.get_database_schema(database_id)
+        title_property = schema['title_property']
+        if not title_property:
+            return {"error": f"데이터베이스 스키마를 가져올 수 없습니다: {database_id}"}
+        
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            if isinstance(row, str):
+                row = {"title": row}
+            elif not isinstance(row, dict):
+                results[index] = {"index": index, "error": "행 형식이 올바르지 않습니다."}
+                continue
+            if "properties" in row or "title" in row or "content" in row:
+                properties = row.get("properties") or {}
+                title = row.get("title")
+                content = row.get("content")
+            else:
+                properties, title, content = row, None, None
+            
+            validated = self._validate_properties(properties, schema, title or "")
+            title_items = validated.get(title_property, {}).get("title") or []
+            if not any(item.get("text", {}).get("content") for item in title_items):
+                results[index] = {"index": index, "error": "제목이 없습니다."}
+                continue
+            children = list(self._content_to_blocks(content, "text")) if content else None
+            pending.append((index, {"properties": validated, "children": children}))
+        
+        if pending:
+            created = self.notion_client.create_pages_bulk(
+                database_id, [row for _, row in pending], max_workers=max_workers
+            )
+            for (index, _), result in zip(pending, created):
+                result["index"] = index
+                results[index] = result
+                if 'id' in result:
+                    self._emit("page_created", id=result['id'], url=result.get('url', ''), index=index)
+            if self.notion_mirror and self.notion_mirror.is_mirrored(database_id):
+                self.notion_mirror.mark_stale(database_id)
+                self.notion_mirror.sync_in_background(database_id)
+        
+        failed = sum(1 for result in results if 'error' in result)
+        return {
+            "database_id": database_id,
+            "created": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
+    
+    def _create_pages_bulk(self, parameters):
+        """여러 페이지 일괄 생성 명령을 처리합니다."""
+        try:
+            parameters = parameters or {}
+            rows = parameters.get("rows") or []
+            if not rows:
+                return "생성할 항목이 없습니다."
+            
+            result = self.create_pages_bulk(parameters.get("database_id"), rows)
+            if 'error' in result:
+                return f"페이지 일괄 생성 실패: {result['error']}"
+            
+            lines = [f"페이지 일괄 생성 완료: {len(rows)}개 중 {result['created']}개 성공, {result['failed']}개 실패"]
+            for row_result in result["results"]:
+                if 'error' in row_result:
+                    lines.append(f"- {row_result['index'] + 1}번째 항목 실패: {row_result['error']}")
+                elif 'append_error' in row_result:
+                    lines.append(f"- {row_result['index'] + 1}번째 항목 일부 내용 추가 실패: {row_result['append_error']}")
+            return "\n".join(lines)
+        except Exception as e:
+            return f"페이지 일괄 생성 중 오류 발생: {str(e)}"
+    
+    def _content_to_blocks(self, content, content_type):
+        """생성된 텍스트를 노션 블록으로 하나씩 변환합니다."""
+        if content_type == "text":
+            for paragraph in content.split("\n\n"):
+                if paragraph.strip():
+                    yield {
+                        "object": "block", 
+                        "type": "paragraph",
+                        "paragraph": {
+                            "rich_text": [{"type": "text", "text": {"content": paragraph}}]
+                        }
+                    }
+        elif content_type in ["todo", "bullet"]:
+            # TODO 및 bullet 목록을 파싱하여 Notion 형식으로 변환
+            for line in content.split("\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("- [ ]"):
+                    yield {
+                        "object": "block", 
+                        "type": "to_do",
+                        "to_do": {
+                            "rich_text": [{"type": "text", "text": {"content": line[5:].strip()}}],
+                            "checked": False
+                        }
+                    }
+                elif line.startswith("-"):
+                    yield {
+                        "object": "block", 
+                        "type": "bulleted_list_item",
+                        "bulleted_list_item": {
+                            "rich_text": [{"type": "text", "text": {"content": line[1:].strip()}}]
+                        }
+                    }
+                else:
+                    # 그 외의 텍스트는 단락으로 처리
+                    yield {
+                        "object": "block", 
+                        "type": "paragraph",
+                        "paragraph": {
+                            "rich_text": [{"type": "text", "text": {"content": line}}]
+                        }
+                    }
+    
     def _is_valid_uuid(self, uuid_str):
         """문자열이 유효한 UUID 형식인지 확인합니다."""
         uuid_pattern = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
@@ -417,6 +584,13 @@ class MCPController:
             page_id = parameters.get("page_id")
             properties = parameters.get("properties", {})
             result = self.notion_client.update_page(page_id, properties)
+            if 'id' in result:
+                # 검색 색인의 제목/속성 텍스트를 바꾸고, 미러는 다시 동기화될 때까지 노션 API로 조회
+                self.search_index.update_page(result)
+                database_id = result.get('parent', {}).get('database_id')
+                if database_id and self.notion_mirror and self.notion_mirror.is_mirrored(database_id):
+                    self.notion_mirror.mark_stale(database_id)
+                    self.notion_mirror.sync_in_background(database_id)
             return f"페이지 업데이트 완료: {result.get('id', '알 수 없음')}"
         except Exception as e:
             return f"페이지 업데이트 중 오류 발생: {str(e)}"
@@ -424,21 +598,18 @@ class MCPController:
     def _query_database(self, parameters):
         """노션 데이터베이스를 쿼리합니다."""
         try:
-            database_id = parameters.get("database_id")
+            database = parameters.get("database_id")
             
             # 데이터베이스 ID가 이름인 경우 처리
-            if database_id and not self._is_valid_uuid(database_id):
-                db_name_match = re.search(r"(.*?)(?:\s+데이터베이스(?:\s+ID)?)?$", database_id)
-                if db_name_match:
-                    db_name = db_name_match.group(1).strip()
-                    actual_id = self.notion_client.find_database_by_name(db_name)
-                    if actual_id:
-                        database_id = actual_id
-                    else:
-                        return f"데이터베이스 '{db_name}'을 찾을 수 없습니다."
+            database_id = self._resolve_database_id(database)
+            if database and not database_id:
+                return f"데이터베이스 '{database}'을 찾을 수 없습니다."
             
-            # 데이터베이스 스키마 정보 가져오기
-            db_info = self.notion_client.get_database(database_id)
+            self._emit("database", id=database_id)
+            
+            # 데이터베이스 스키마 정보 가져오기 (캐시 사용)
+            schema = self.notion_client.get_database_schema(database_id)
+            property_types = schema['property_types']
             
             # 필터 파라미터 형식 변환
             filter_params = {}
@@ -450,20 +621,16 @@ class MCPController:
                     property_name = user_filter.get("property")
                     
                     # 해당 속성이 실제로 존재하는지 확인
-                    if 'properties' in db_info and property_name in db_info['properties']:
+                    if property_name in property_types:
                         # 속성이 존재하면 그대로 사용
-                        prop_type = db_info['properties'][property_name].get('type', 'rich_text')
+                        prop_type = property_types[property_name] or 'rich_text'
                     else:
-                        # 속성이 존재하지 않으면 타이틀 속성 찾기
-                        title_property = None
-                        for prop_name, prop_data in db_info.get('properties', {}).items():
-                            if prop_data.get('type') == 'title':
-                                title_property = prop_name
-                                prop_type = 'title'
-                                break
+                        # 속성이 존재하지 않으면 타이틀 속성 사용
+                        title_property = schema['title_property']
+                        prop_type = 'title'
                         
                         if title_property:
-                            print(f"\n[디버그] 속성 '{property_name}'을 찾을 수 없어 타이틀 속성 '{title_property}'로 대체합니다.")
+                            logger.debug("속성 '%s'을 찾을 수 없어 타이틀 속성 '%s'로 대체합니다.", property_name, title_property)
                             property_name = title_property
                         else:
                             return f"데이터베이스에 타이틀 속성이 없습니다."
@@ -502,28 +669,36 @@ class MCPController:
                     # 사용자가 제공한 필터가 이미 올바른 형식이면 그대로 사용
                     filter_params = {"filter": user_filter}
             
-            print(f"\n[디버그] 최종 필터 파라미터: {json.dumps(filter_params, indent=2, ensure_ascii=False)}")
-            result = self.notion_client.query_database(database_id, filter_params)
-            
-            # 상세 정보 추출
-            pages = result.get('results', [])
-            
-            if not pages:
-                return "데이터베이스에서 페이지를 찾을 수 없습니다."
+            logger.debug("최종 필터 파라미터: %s", LazyJSON(filter_params, indent=2))
+            # 표시할 페이지 수보다 하나 더 읽어 잘린 결과인지 확인
+            limit = int(parameters.get("limit") or DEFAULT_QUERY_LIMIT)
+            # 미러가 최신이면 로컬에서 조회, 아니면 노션 API 사용
+            mirrored = self._query_mirror(database_id, filter_params, limit + 1)
+            if mirrored is not None:
+                pages = [page for page, _ in mirrored]
+                mirrored_trees = {page['id']: block_tree for page, block_tree in mirrored}
+            else:
+                # 커서를 따라가며 페이지를 하나씩 가져옴 (100개 초과 데이터베이스도 잘리지 않음)
+                pages = self.notion_client.iter_query_database(
+                    database_id, filter_params, max_items=limit + 1
+                )
+                mirrored_trees = None
             
             # 데이터베이스 정보 가져오기
             db_name = "알 수 없음"
-            title_property = None
-            for prop_name, prop_data in db_info.get('properties', {}).items():
-                if prop_data.get('type') == 'title':
-                    title_property = prop_name
-                    break
+            title_property = schema['title_property']
                     
-            # 결과 메시지 생성
-            response = [f"'{db_name}' 데이터베이스 조회 결과: {len(pages)}개의 페이지 찾음"]
+            # 결과 메시지 생성 (페이지 수는 스트리밍이 끝난 뒤 채움)
+            response = [None]
+            page_count = 0
+            truncated = False
             
-            # 각 페이지 정보 및 내용 가져오기
+            # 각 페이지 정보 및 내용 가져오기 (limit개까지만 블록 트리를 조회)
             for i, page in enumerate(pages):
+                if page_count >= limit:
+                    truncated = True
+                    break
+                page_count += 1
                 page_id = page.get('id', '알 수 없음')
                 page_url = page.get('url', '링크 없음')
                 
@@ -544,88 +719,20 @@ class MCPController:
                 # 페이지 내용(블록) 가져오기
                 try:
                     # 페이지 블록 내용 가져오기
-                    print(f"\n[디버그] 페이지 {page_id}의 내용 가져오기")
-                    block_content = self.notion_client.get_block_children(page_id)
+                    logger.debug("페이지 %s의 내용 가져오기", page_id)
+                    if mirrored_trees is not None:
+                        block_tree = mirrored_trees.get(page_id, [])
+                    else:
+                        block_tree = self.notion_client.get_block_tree(page_id)
+                    content_lines = self._format_block_tree(block_tree)
                     
-                    if block_content and 'results' in block_content and block_content['results']:
+                    if content_lines:
                         page_info.append(f"\n   📄 페이지 내용:")
-                        
-                        for block in block_content['results']:
-                            block_type = block.get('type')
-                            if block_type == 'paragraph':
-                                text_content = ""
-                                for rich_text in block.get('paragraph', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                if text_content.strip():
-                                    page_info.append(f"   • {text_content}")
-                            elif block_type == 'heading_1':
-                                heading_text = ""
-                                for rich_text in block.get('heading_1', {}).get('rich_text', []):
-                                    heading_text += rich_text.get('plain_text', '')
-                                if heading_text.strip():
-                                    page_info.append(f"   # {heading_text}")
-                            elif block_type == 'heading_2':
-                                heading_text = ""
-                                for rich_text in block.get('heading_2', {}).get('rich_text', []):
-                                    heading_text += rich_text.get('plain_text', '')
-                                if heading_text.strip():
-                                    page_info.append(f"   ## {heading_text}")
-                            elif block_type == 'heading_3':
-                                heading_text = ""
-                                for rich_text in block.get('heading_3', {}).get('rich_text', []):
-                                    heading_text += rich_text.get('plain_text', '')
-                                if heading_text.strip():
-                                    page_info.append(f"   ### {heading_text}")
-                            elif block_type == 'bulleted_list_item':
-                                text_content = ""
-                                for rich_text in block.get('bulleted_list_item', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                if text_content.strip():
-                                    page_info.append(f"   • {text_content}")
-                            elif block_type == 'numbered_list_item':
-                                text_content = ""
-                                for rich_text in block.get('numbered_list_item', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                if text_content.strip():
-                                    page_info.append(f"   1. {text_content}")
-                            elif block_type == 'to_do':
-                                text_content = ""
-                                for rich_text in block.get('to_do', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                is_checked = block.get('to_do', {}).get('checked', False)
-                                checkbox = "☑" if is_checked else "☐"
-                                if text_content.strip():
-                                    page_info.append(f"   {checkbox} {text_content}")
-                            elif block_type == 'code':
-                                code_content = ""
-                                for rich_text in block.get('code', {}).get('rich_text', []):
-                                    code_content += rich_text.get('plain_text', '')
-                                code_language = block.get('code', {}).get('language', '')
-                                if code_content.strip():
-                                    page_info.append(f"   ```{code_language}\n   {code_content}\n   ```")
-                            elif block_type == 'quote':
-                                text_content = ""
-                                for rich_text in block.get('quote', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                if text_content.strip():
-                                    page_info.append(f"   > {text_content}")
-                            elif block_type == 'callout':
-                                text_content = ""
-                                for rich_text in block.get('callout', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                emoji = block.get('callout', {}).get('icon', {}).get('emoji', '💡')
-                                if text_content.strip():
-                                    page_info.append(f"   {emoji} {text_content}")
-                            elif block_type == 'toggle':
-                                text_content = ""
-                                for rich_text in block.get('toggle', {}).get('rich_text', []):
-                                    text_content += rich_text.get('plain_text', '')
-                                if text_content.strip():
-                                    page_info.append(f"   ▶ {text_content}")
+                        page_info.extend(content_lines)
                     else:
                         page_info.append(f"\n   📄 페이지에 내용이 없습니다.")
                 except Exception as e:
-                    print(f"\n[디버그] 페이지 내용 가져오기 오류: {str(e)}")
+                    logger.warning("페이지 내용 가져오기 오류: %s", e)
                     page_info.append(f"\n   ⚠️ 페이지 내용을 가져오는 중 오류가 발생했습니다: {str(e)}")
                 
                 # 주요 속성 추가
@@ -682,11 +789,114 @@ class MCPController:
                 
                 response.append(''.join(page_info))
             
+            if page_count == 0:
+                return "데이터베이스에서 페이지를 찾을 수 없습니다."
+            
+            response[0] = f"'{db_name}' 데이터베이스 조회 결과: {page_count}개의 페이지 찾음"
+            if truncated:
+                response[0] += f" (처음 {limit}개만 표시, 더 보려면 limit을 늘리세요)"
             return '\n'.join(response)
         except Exception as e:
-            print(f"\n[디버그] 데이터베이스 쿼리 중 오류 발생: {str(e)}")
+            logger.error("데이터베이스 쿼리 중 오류 발생: %s", e)
             return f"데이터베이스 쿼리 중 오류 발생: {str(e)}"
     
+    def _format_block(self, node, indent):
+        """블록 트리 노드 하나를 표시용 문자열로 변환합니다. 표시할 내용이 없으면 None."""
+        block_type = node.get('type')
+        text_content = node.get('text', '')
+        if not text_content.strip():
+            return None
+        
+        if block_type in ('paragraph', 'bulleted_list_item'):
+            return f"{indent}• {text_content}"
+        elif block_type == 'heading_1':
+            return f"{indent}# {text_content}"
+        elif block_type == 'heading_2':
+            return f"{indent}## {text_content}"
+        elif block_type == 'heading_3':
+            return f"{indent}### {text_content}"
+        elif block_type == 'numbered_list_item':
+            return f"{indent}1. {text_content}"
+        elif block_type == 'to_do':
+            checkbox = "☑" if node.get('checked') else "☐"
+            return f"{indent}{checkbox} {text_content}"
+        elif block_type == 'code':
+            return f"{indent}```{node.get('language', '')}\n{indent}{text_content}\n{indent}```"
+        elif block_type == 'quote':
+            return f"{indent}> {text_content}"
+        elif block_type == 'callout':
+            return f"{indent}{node.get('emoji', '💡')} {text_content}"
+        elif block_type == 'toggle':
+            return f"{indent}▶ {text_content}"
+        elif block_type == 'child_page':
+            return f"{indent}📄 {text_content}"
+        return None
+    
+    def _format_block_tree(self, nodes, indent="   "):
+        """블록 트리를 들여쓰기된 문자열 리스트로 변환합니다."""
+        lines = []
+        for node in nodes:
+            line = self._format_block(node, indent)
+            if line:
+                lines.append(line)
+            # 제목이 없는 컨테이너(열 등)의 하위 블록도 표시
+            child_indent = indent + "  " if line else indent
+            lines.extend(self._format_block_tree(node.get('children', []), child_indent))
+        return lines
+    
+    def _query_mirror(self, database_id, filter_params, limit=None):
+        """미러에서 데이터베이스를 조회합니다. 미러를 사용할 수 없으면 None.
+        
+        미러 대상 데이터베이스가 오래되었으면 백그라운드 동기화를 시작하고 이번 요청은 노션 API로 처리합니다.
+        """
+        if not self.notion_mirror or not self.notion_mirror.is_mirrored(database_id):
+            return None
+        result = self.notion_mirror.query(database_id, filter_params, max_items=limit)
+        if result is None:
+            if not self.notion_mirror.is_fresh(database_id):
+                self.notion_mirror.sync_in_background(database_id)
+            return None
+        logger.debug("미러에서 조회: %s (%d개)", database_id, len(result))
+        return result
+    
+    def _search_pages(self, parameters):
+        """페이지 제목, 속성, 본문에서 검색어를 찾습니다.
+        
+        로컬 색인의 BM25 결과(본문 검색 포함)를 먼저 보여주고, 색인에 없는 페이지도 찾을 수 있도록
+        노션 검색 API 결과를 중복 없이 이어 붙입니다 (색인은 미러 동기화나 이 프로세스에서 만든 페이지만 포함).
+        """
+        try:
+            query = (parameters or {}).get("query", "").strip()
+            if not query:
+                return "검색어가 필요합니다."
+            limit = int(parameters.get("limit") or 10)
+            
+            hits = self.search_index.search(query, limit=limit) if len(self.search_index) else []
+            logger.debug("색인 검색 '%s': %d건", query, len(hits))
+            seen = {hit['id'] for hit in hits}
+            if len(hits) < limit:
+                for page in self.notion_client.iter_search(query, {"value": "page", "property": "object"}, max_items=limit):
+                    if page['id'] in seen:
+                        continue
+                    seen.add(page['id'])
+                    title, _ = page_property_texts(page)
+                    hits.append({"id": page['id'], "title": title, "url": page.get('url'), "snippet": None})
+                    if len(hits) >= limit:
+                        break
+            
+            if not hits:
+                return f"'{query}'에 대한 검색 결과가 없습니다."
+            lines = [f"'{query}' 검색 결과 ({len(hits)}건):"]
+            for i, hit in enumerate(hits, start=1):
+                lines.append(f"{i}. {hit['title'] or '(제목 없음)'} (ID: {hit['id']})")
+                if hit['url']:
+                    lines.append(f"   {hit['url']}")
+                if hit['snippet']:
+                    lines.append(f"   {hit['snippet']}")
+            return "\n".join(lines)
+        except Exception as e:
+            return f"페이지 검색 중 오류 발생: {str(e)}"
+    
     def _get_databases(self):
         """사용 가능한 데이터베이스 목록을 가져옵니다."""
         try:
@@ -710,7 +920,7 @@ class MCPController:
         try:
             prompt = parameters.get("prompt", "")
             content_type = parameters.get("content_type", "text")
-            content = self.openai_client.generate_notion_content(prompt, content_type)
+            content = self.openai_client.generate_notion_content(prompt, content_type, on_token=self._token_callback())
             return content
         except Exception as e:
             return f"콘텐츠 생성 중 오류 발생: {str(e)}" 
\ No newline at end of file
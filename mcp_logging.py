@@ -0,0 +1,75 @@
+import os
+import random
+import logging
+import json_codec
+
+# 로그 설정 (환경 변수로 조정 가능)
+LOG_LEVEL = os.getenv("MCP_LOG_LEVEL", "INFO").upper()
+PAYLOAD_LOG_LIMIT = int(os.getenv("MCP_LOG_PAYLOAD_LIMIT", "500"))           # 본문 로그 최대 글자 수
+LARGE_PAYLOAD_BYTES = int(os.getenv("MCP_LOG_LARGE_PAYLOAD_BYTES", "10000"))  # 샘플링 대상 본문 크기
+LARGE_PAYLOAD_SAMPLE_RATE = float(os.getenv("MCP_LOG_LARGE_PAYLOAD_SAMPLE_RATE", "0.1"))
+
+ROOT_LOGGER_NAME = "mcp"
+
+
+class StructuredFormatter(logging.Formatter):
+    """메시지 뒤에 구조화된 필드(key=value)를 붙여 출력하는 포매터입니다."""
+
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def _configure_root_logger():
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(StructuredFormatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+_configure_root_logger()
+
+
+def get_logger(name):
+    """mcp 하위 로거를 반환합니다 (예: get_logger("notion") -> "mcp.notion")."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+class LazyJSON:
+    """로그가 실제로 출력될 때만 JSON으로 직렬화되는 래퍼입니다.
+
+    logger.debug("본문: %s", LazyJSON(payload)) 처럼 사용하면 DEBUG가 꺼져 있을 때
+    직렬화 비용이 들지 않습니다.
+    """
+
+    __slots__ = ("obj", "limit", "indent")
+
+    def __init__(self, obj, limit=PAYLOAD_LOG_LIMIT, indent=None):
+        self.obj = obj
+        self.limit = limit
+        self.indent = indent
+
+    def __str__(self):
+        text = json_codec.dumps(self.obj, indent=self.indent, default=str)
+        return truncate(text, self.limit)
+
+
+def truncate(text, limit=PAYLOAD_LOG_LIMIT):
+    """limit 글자를 넘으면 잘라서 표시합니다."""
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... ({len(text)}자)"
+    return text
+
+
+def should_log_payload(size):
+    """본문을 로그로 남길지 결정합니다. 큰 본문은 일정 비율로만 샘플링합니다."""
+    if size <= LARGE_PAYLOAD_BYTES:
+        return True
+    return random.random() < LARGE_PAYLOAD_SAMPLE_RATE
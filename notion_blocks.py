@@ -0,0 +1,134 @@
+import copy
+import queue
+import threading
+
+# 노션 API 요청 크기 제한
+MAX_CHILDREN_PER_REQUEST = 100   # 요청 하나에 담을 수 있는 블록 수
+MAX_RICH_TEXT_LENGTH = 2000      # rich_text 항목 하나의 최대 글자 수
+MAX_RICH_TEXT_ITEMS = 100        # rich_text 배열의 최대 항목 수
+
+
+def split_text(text, limit=MAX_RICH_TEXT_LENGTH):
+    """텍스트를 limit 글자 이하 조각으로 나눕니다. 가능하면 줄바꿈이나 공백에서 자릅니다."""
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind("\n", limit // 2, limit)
+        if cut == -1:
+            cut = text.rfind(" ", limit // 2, limit)
+        if cut == -1:
+            cut = limit
+        else:
+            cut += 1  # 구분 문자는 앞 조각에 포함
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def _split_rich_text_item(item):
+    """글자 수 제한을 넘는 rich_text 항목을 여러 항목으로 나눕니다."""
+    content = item.get("text", {}).get("content")
+    if item.get("type", "text") != "text" or content is None or len(content) <= MAX_RICH_TEXT_LENGTH:
+        return [item]
+    items = []
+    for piece in split_text(content):
+        new_item = copy.deepcopy(item)
+        new_item["text"]["content"] = piece
+        new_item.pop("plain_text", None)
+        items.append(new_item)
+    return items
+
+
+def normalize_block(block):
+    """블록을 노션 제한에 맞게 나눈 블록 리스트로 변환합니다.
+
+    2000자를 넘는 텍스트는 여러 rich_text 항목으로, rich_text 항목이 100개를 넘으면
+    같은 타입의 블록 여러 개로 나눕니다.
+    """
+    block_type = block.get("type")
+    body = block.get(block_type) if block_type else None
+    if not isinstance(body, dict) or "rich_text" not in body:
+        return [block]
+
+    items = []
+    for item in body["rich_text"]:
+        items.extend(_split_rich_text_item(item))
+    if len(items) <= MAX_RICH_TEXT_ITEMS and len(items) == len(body["rich_text"]):
+        return [block]
+
+    blocks = []
+    for start in range(0, len(items), MAX_RICH_TEXT_ITEMS):
+        new_block = dict(block)
+        new_block[block_type] = dict(body)
+        new_block[block_type]["rich_text"] = items[start:start + MAX_RICH_TEXT_ITEMS]
+        if start > 0:
+            # 하위 블록은 첫 번째 조각에만 유지
+            new_block[block_type].pop("children", None)
+        blocks.append(new_block)
+    return blocks
+
+
+def iter_normalized_blocks(blocks):
+    """블록 이터러블을 노션 제한에 맞게 나눈 블록을 하나씩 반환합니다."""
+    for block in blocks or []:
+        for normalized in normalize_block(block):
+            yield normalized
+
+
+def iter_chunks(blocks, size=MAX_CHILDREN_PER_REQUEST):
+    """블록을 요청 하나에 담을 수 있는 크기의 리스트로 묶어 반환합니다."""
+    chunk = []
+    for block in blocks:
+        chunk.append(block)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def prefetch(iterable, depth=2):
+    """백그라운드 스레드에서 iterable을 최대 depth개까지 미리 준비합니다.
+
+    다음 청크를 준비하는 작업과 현재 청크 업로드가 겹쳐서 진행됩니다.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((done, e))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, name="notion-block-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_upload_chunks(blocks):
+    """블록을 정규화하고 청크로 묶는 작업을 백그라운드에서 미리 진행하는 이터레이터를 반환합니다."""
+    return prefetch(iter_chunks(iter_normalized_blocks(blocks)))
@@ -0,0 +1,297 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from mcp_logging import get_logger
+
+logger = get_logger("notion.cache")
+
+# 데이터베이스 카탈로그 기본 TTL (초)
+DEFAULT_CATALOG_TTL = float(os.getenv("NOTION_CATALOG_TTL", "300"))
+
+
+def normalize_name(name):
+    """이름 비교용으로 문자열을 정규화합니다 (NFC, 대소문자 무시, 공백 제거)."""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFC", name)
+    return re.sub(r"\s+", "", name).casefold()
+
+
+class DatabaseCatalog:
+    """노션 데이터베이스 목록을 TTL 기반으로 캐시하는 카탈로그입니다.
+
+    이름 -> ID 조회를 매번 /search 호출 없이 메모리에서 처리합니다.
+    TTL이 지나면 기존 데이터를 그대로 반환하면서 백그라운드에서 갱신합니다.
+    """
+
+    def __init__(self, loader, title_getter, ttl=None, miss_refresh_interval=5.0):
+        # loader: 데이터베이스 객체 리스트를 반환하는 함수
+        # title_getter: 데이터베이스 객체에서 제목을 추출하는 함수
+        self.loader = loader
+        self.title_getter = title_getter
+        self.ttl = DEFAULT_CATALOG_TTL if ttl is None else ttl
+        # 이름을 못 찾았을 때 강제 갱신을 허용하는 최소 간격 (초)
+        self.miss_refresh_interval = miss_refresh_interval
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = None
+        self._entries = []       # 검색 결과 순서(최근 수정 순) 유지
+        self._by_id = {}
+        self._by_title = {}
+        self._by_normalized = {}
+
+    def _build(self, databases):
+        """데이터베이스 객체 리스트로 조회용 인덱스를 만듭니다."""
+        entries = []
+        by_id = {}
+        by_title = {}
+        by_normalized = {}
+        for db in databases:
+            if 'id' not in db:
+                continue
+            title = self.title_getter(db)
+            entry = {
+                "id": db['id'],
+                "title": title,
+                "normalized_title": normalize_name(title),
+                "last_edited_time": db.get('last_edited_time')
+            }
+            entries.append(entry)
+            by_id[entry["id"]] = entry
+            # 같은 이름이 여러 개면 가장 최근에 수정된 것(먼저 나온 것)을 우선
+            by_title.setdefault(title, entry)
+            by_normalized.setdefault(entry["normalized_title"], entry)
+        return entries, by_id, by_title, by_normalized
+
+    def refresh(self):
+        """노션에서 데이터베이스 목록을 다시 읽어 카탈로그를 갱신합니다."""
+        with self._refresh_lock:
+            databases = self.loader()
+            if databases is None:
+                # 조회 실패 시 기존 카탈로그 유지
+                return False
+            entries, by_id, by_title, by_normalized = self._build(databases)
+            with self._lock:
+                self._entries = entries
+                self._by_id = by_id
+                self._by_title = by_title
+                self._by_normalized = by_normalized
+                self._loaded_at = time.monotonic()
+            logger.info("데이터베이스 카탈로그 갱신: %d개", len(entries))
+            return True
+
+    def _refresh_in_background(self):
+        """이미 갱신 중이 아니면 백그라운드 스레드에서 카탈로그를 갱신합니다."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("백그라운드 카탈로그 갱신 오류: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="notion-catalog-refresh", daemon=True).start()
+
+    def invalidate(self):
+        """카탈로그를 무효화합니다. 다음 조회 시 동기적으로 다시 읽습니다."""
+        with self._lock:
+            self._loaded_at = None
+
+    def age(self):
+        """마지막 갱신 이후 경과 시간(초)을 반환합니다. 로드 전이면 None."""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            return None
+        return time.monotonic() - loaded_at
+
+    def _ensure_loaded(self):
+        """카탈로그가 비어 있으면 동기 갱신, 만료되었으면 백그라운드 갱신을 시작합니다."""
+        age = self.age()
+        if age is None:
+            self.refresh()
+        elif age > self.ttl:
+            self._refresh_in_background()
+
+    def entries(self):
+        """캐시된 데이터베이스 항목 리스트를 반환합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, database_id):
+        """ID로 캐시된 데이터베이스 항목을 반환합니다."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_id.get(database_id)
+
+    def peek_last_edited_time(self, database_id):
+        """네트워크 호출 없이 캐시에 있는 last_edited_time을 반환합니다."""
+        with self._lock:
+            entry = self._by_id.get(database_id)
+        return entry["last_edited_time"] if entry else None
+
+    def _lookup(self, name):
+        """정확한 이름 -> 정규화된 이름 -> 부분 문자열 순으로 찾습니다."""
+        normalized = normalize_name(name)
+        with self._lock:
+            entry = self._by_title.get(name) or self._by_normalized.get(normalized)
+            if entry:
+                return entry
+            # 부분 일치는 기존 동작과의 호환을 위한 폴백
+            if normalized:
+                for entry in self._entries:
+                    if normalized in entry["normalized_title"]:
+                        return entry
+        return None
+
+    def find_by_name(self, name):
+        """이름으로 데이터베이스 항목을 찾습니다. 없으면 None."""
+        self._ensure_loaded()
+        entry = self._lookup(name)
+        age = self.age()
+        if entry is None and age is not None and age > self.miss_refresh_interval:
+            # 캐시 이후 새로 생긴 데이터베이스일 수 있으므로 한 번만 다시 읽음
+            self.refresh()
+            entry = self._lookup(name)
+        return entry
+
+
+# 데이터베이스 스키마 캐시 기본 TTL (초)
+DEFAULT_SCHEMA_TTL = float(os.getenv("NOTION_SCHEMA_TTL", "600"))
+
+
+def parse_database_schema(database):
+    """데이터베이스 객체에서 자주 쓰는 스키마 정보를 추출합니다."""
+    properties = database.get('properties', {})
+    title_property = None
+    property_types = {}
+    select_options = {}
+    for prop_name, prop_data in properties.items():
+        prop_type = prop_data.get('type')
+        property_types[prop_name] = prop_type
+        if prop_type == 'title' and title_property is None:
+            title_property = prop_name
+        elif prop_type in ('select', 'multi_select', 'status'):
+            options = prop_data.get(prop_type, {}).get('options', [])
+            select_options[prop_name] = [option.get('name') for option in options]
+    return {
+        "id": database.get('id'),
+        "properties": properties,
+        "title_property": title_property,
+        "property_types": property_types,
+        "select_options": select_options,
+        "last_edited_time": database.get('last_edited_time')
+    }
+
+
+class SchemaCache:
+    """데이터베이스 ID별로 파싱된 스키마를 캐시합니다.
+
+    항목은 TTL이 지나거나, 카탈로그의 last_edited_time이 바뀌거나,
+    쓰기 요청이 스키마 검증 오류로 실패하면 무효화됩니다.
+    """
+
+    def __init__(self, loader, ttl=None, edited_time_getter=None):
+        # loader: database_id -> 데이터베이스 객체(dict)를 반환하는 함수
+        # edited_time_getter: database_id -> 알려진 최신 last_edited_time (없으면 None)
+        self.loader = loader
+        self.ttl = DEFAULT_SCHEMA_TTL if ttl is None else ttl
+        self.edited_time_getter = edited_time_getter
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _is_fresh(self, database_id, cached):
+        if time.monotonic() - cached["loaded_at"] > self.ttl:
+            return False
+        if self.edited_time_getter:
+            edited_time = self.edited_time_getter(database_id)
+            if edited_time and cached["schema"]["last_edited_time"] and edited_time != cached["schema"]["last_edited_time"]:
+                return False
+        return True
+
+    def get(self, database_id):
+        """캐시된 스키마를 반환합니다. 없거나 만료되었으면 다시 읽습니다."""
+        with self._lock:
+            cached = self._entries.get(database_id)
+        if cached and self._is_fresh(database_id, cached):
+            return cached["schema"]
+
+        database = self.loader(database_id)
+        schema = parse_database_schema(database)
+        if 'properties' in database:
+            # 오류 응답은 캐시하지 않음
+            with self._lock:
+                self._entries[database_id] = {"schema": schema, "loaded_at": time.monotonic()}
+        return schema
+
+    def invalidate(self, database_id=None):
+        """특정 데이터베이스(또는 전체)의 스키마 캐시를 무효화합니다."""
+        with self._lock:
+            if database_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(database_id, None)
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합칩니다.
+
+    먼저 도착한 호출(리더)만 실제로 실행하고, 실행 중에 같은 키로 들어온 호출은
+    리더의 결과(또는 예외)를 그대로 받습니다. 결과는 캐시하지 않으므로 실행이 끝난 뒤
+    들어온 호출은 다시 실행됩니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> {"done": Event, "result": ..., "error": ...}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, fn):
+        """key에 해당하는 진행 중인 호출이 있으면 그 결과를, 없으면 fn()을 실행한 결과를 반환합니다."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    def stats(self):
+        """실행된 호출 수, 합쳐진 호출 수, 현재 진행 중인 키 수를 반환합니다."""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls)
+            }
@@ -1,29 +1,277 @@
 import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import json_codec
 from dotenv import load_dotenv
+from notion_cache import DatabaseCatalog, SchemaCache, SingleFlight
+from rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from notion_blocks import iter_upload_chunks
+from mcp_logging import get_logger, truncate, should_log_payload
+from search_index import blocks_text
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+logger = get_logger("notion")
+
+# 커넥션 풀 기본 설정 (환경 변수로 조정 가능)
+DEFAULT_POOL_CONNECTIONS = int(os.getenv("NOTION_POOL_CONNECTIONS", "4"))
+DEFAULT_POOL_MAXSIZE = int(os.getenv("NOTION_POOL_MAXSIZE", "16"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("NOTION_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("NOTION_READ_TIMEOUT", "30"))
+
+# 노션 API 페이지네이션 최대 page_size
+MAX_PAGE_SIZE = 100
+
+# 블록 트리 조회 기본 설정
+DEFAULT_BLOCK_TREE_DEPTH = int(os.getenv("NOTION_BLOCK_TREE_DEPTH", "3"))
+DEFAULT_BLOCK_TREE_CONCURRENCY = int(os.getenv("NOTION_BLOCK_TREE_CONCURRENCY", "4"))
+
+# 여러 페이지를 한 번에 생성할 때 동시에 진행할 요청 수 (레이트 리미터가 전체 속도를 제한)
+DEFAULT_BULK_WORKERS = int(os.getenv("NOTION_BULK_WORKERS", "4"))
+
+# 하위 블록이 있어도 따라 내려가지 않는 블록 타입 (별도 페이지/데이터베이스)
+BLOCK_TREE_SKIP_TYPES = {"child_page", "child_database"}
+
+# 레이트 리밋 설정 (노션은 통합당 평균 초당 3회 요청 허용)
+DEFAULT_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+DEFAULT_RATE_BURST = float(os.getenv("NOTION_RATE_BURST", "3"))
+DEFAULT_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "5"))
+DEFAULT_BACKOFF_BASE = float(os.getenv("NOTION_BACKOFF_BASE", "0.5"))
+DEFAULT_BACKOFF_CAP = float(os.getenv("NOTION_BACKOFF_CAP", "30"))
+
+# 재시도 대상 상태 코드 (레이트 리밋 및 일시적인 게이트웨이 오류)
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+# 동시에 들어온 동일한 읽기 요청(같은 메서드, URL, 본문)을 하나의 요청으로 합칠지 여부
+DEFAULT_SINGLE_FLIGHT = os.getenv("NOTION_SINGLE_FLIGHT", "1") not in ("0", "false", "False")
+
+# 풀 설정별로 공유되는 세션 (여러 클라이언트/컨트롤러 인스턴스가 같은 keep-alive 연결을 재사용)
+_shared_sessions = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def get_shared_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """풀 설정에 해당하는 공유 requests 세션을 반환합니다. 없으면 생성합니다."""
+    key = (pool_connections, pool_maxsize)
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            # pool_connections: 호스트별 풀 개수, pool_maxsize: 호스트당 최대 연결 수
+            # pool_block=True 이면 풀이 가득 찼을 때 새 연결을 만들지 않고 대기
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=True
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _shared_sessions[key] = session
+        return session
+
+
+# 통합(API 키)별로 공유되는 레이트 리미터
+_shared_rate_limiters = {}
+
+
+def get_shared_rate_limiter(api_key, rate=DEFAULT_RATE_LIMIT, burst=DEFAULT_RATE_BURST):
+    """API 키별 공유 토큰 버킷을 반환합니다. 없으면 생성합니다."""
+    with _shared_sessions_lock:
+        limiter = _shared_rate_limiters.get(api_key)
+        if limiter is None:
+            limiter = TokenBucket(rate, burst)
+            _shared_rate_limiters[api_key] = limiter
+        return limiter
+
+
+def close_shared_sessions():
+    """공유 세션을 모두 닫습니다 (프로세스 종료 시 사용)."""
+    with _shared_sessions_lock:
+        for session in _shared_sessions.values():
+            session.close()
+        _shared_sessions.clear()
+
+
+class NotionAPIError(Exception):
+    """노션 API가 오류 응답을 반환했을 때 발생합니다 (스트리밍 API 전용)."""
+    
+    def __init__(self, response_body):
+        self.response_body = response_body
+        message = response_body.get("message", str(response_body)) if isinstance(response_body, dict) else str(response_body)
+        super().__init__(message)
+
+
 class NotionMCPClient:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, pool_connections=None, pool_maxsize=None,
+                 connect_timeout=None, read_timeout=None, session=None, catalog_ttl=None, schema_ttl=None,
+                 rate_limiter=None, max_retries=None, default_parent_page_id=None):
         # API 키를 인자로 받거나 환경 변수에서 가져옴
         self.api_key = api_key or os.getenv("NOTION_API_KEY")
         if not self.api_key:
             raise ValueError("Notion API 키가 필요합니다.")
         
-        self.base_url = "https://api.notion.com/v1"
+        # 커넥션 풀 및 타임아웃 설정
+        self.pool_connections = pool_connections or DEFAULT_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        self.timeout = (
+            connect_timeout or DEFAULT_CONNECT_TIMEOUT,
+            read_timeout or DEFAULT_READ_TIMEOUT
+        )
+        # 세션을 직접 넘기지 않으면 같은 풀 설정의 공유 세션을 사용
+        self.session = session or get_shared_session(self.pool_connections, self.pool_maxsize)
+        
+        # 같은 통합(API 키)을 쓰는 모든 클라이언트가 하나의 레이트 리미터를 공유
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter(self.api_key)
+        self.max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        
+        # 페이지/데이터베이스 생성 시 사용할 기본 부모 페이지 (한 번 결정되면 캐시)
+        self.configured_parent_page_id = default_parent_page_id or os.getenv("NOTION_DEFAULT_PARENT_PAGE_ID")
+        self._default_parent_page_id = None
+        self._parent_page_lock = threading.Lock()
+        
+        # 진행 중인 동일 읽기 요청 공유 (GET, /search, 데이터베이스 쿼리)
+        self.single_flight = SingleFlight() if DEFAULT_SINGLE_FLIGHT else None
+        
+        # 생성/추가한 페이지 내용을 증분으로 반영할 검색 색인 (선택 사항, SearchIndex)
+        self.search_index = None
+        
+        # NOTION_BASE_URL로 다른 서버(예: fake_notion_server.py)에 연결할 수 있음
+        self.base_url = os.getenv("NOTION_BASE_URL", "https://api.notion.com/v1").rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28"  # 노션 API 버전
         }
-        print(f"[노션 클라이언트] 초기화됨: API 키 = {self.api_key[:4]}...{self.api_key[-4:]}")
+        
+        # 이름 -> ID 조회용 데이터베이스 카탈로그 (TTL 캐시)
+        self.database_catalog = DatabaseCatalog(
+            self._load_database_catalog,
+            self._extract_title_from_database,
+            ttl=catalog_ttl
+        )
+        # 데이터베이스 ID별 스키마 캐시 (카탈로그의 last_edited_time이 바뀌면 무효화)
+        self.schema_cache = SchemaCache(
+            self.get_database,
+            ttl=schema_ttl,
+            edited_time_getter=self.database_catalog.peek_last_edited_time
+        )
+        logger.info("노션 클라이언트 초기화됨: API 키 = %s...%s", self.api_key[:4], self.api_key[-4:])
+    
+    def _request(self, method, url, payload=None, params=None):
+        """공유 커넥션 풀을 통해 노션 API 요청을 보냅니다.
+        
+        레이트 리미터로 요청 속도를 맞추고, 429/5xx 응답은 Retry-After 또는
+        지터가 적용된 지수 백오프로 재시도합니다.
+        """
+        # 본문은 한 번만 직렬화해서 전송과 로그(크기 측정)에 함께 사용
+        body = json_codec.dumps_bytes(payload) if payload is not None else None
+        if body is not None and logger.isEnabledFor(logging.DEBUG) and should_log_payload(len(body)):
+            logger.debug("노션 API 요청 본문 %s %s: %s", method, url, truncate(body.decode("utf-8")))
+        
+        if self.single_flight is not None and self._is_read_request(method, url):
+            # 같은 요청이 이미 진행 중이면 새로 보내지 않고 그 응답을 함께 사용
+            key = (method, url, body, tuple(sorted(params.items())) if params else None)
+            return self.single_flight.do(key, lambda: self._send(method, url, body, params))
+        return self._send(method, url, body, params)
+    
+    def _is_read_request(self, method, url):
+        """부작용이 없는 읽기 요청인지 확인합니다 (GET, 검색, 데이터베이스 쿼리)."""
+        if method == "GET":
+            return True
+        return method == "POST" and (url.endswith("/search") or url.endswith("/query"))
+    
+    def _send(self, method, url, body, params):
+        """직렬화된 본문을 보내고 재시도 규칙에 따라 최종 응답을 반환합니다."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            response = self.session.request(
+                method,
+                url,
+                headers=self.headers,
+                data=body,
+                params=params,
+                timeout=self.timeout
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("노션 API 호출", extra={"fields": {
+                    "method": method,
+                    "url": url,
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "bytes_out": len(body) if body else 0,
+                    "bytes_in": len(response.content),
+                    "attempt": attempt
+                }})
+            
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                if response.status_code != 200:
+                    logger.warning("노션 API 오류 %s %s: %s", method, url, truncate(response.text))
+                return response
+            
+            attempt += 1
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP)
+                logger.warning("레이트 리밋(429), %.2f초 후 재시도 (%d/%d)", delay, attempt, self.max_retries)
+                # 같은 통합의 모든 요청을 멈춤 (대기는 다음 acquire()에서 이루어짐)
+                self.rate_limiter.pause(delay)
+            else:
+                delay = backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP)
+                logger.warning("상태 코드 %d, %.2f초 후 재시도 (%d/%d)", response.status_code, delay, attempt, self.max_retries)
+                time.sleep(delay)
+    
+    def _iter_paginated(self, fetch_page, page_size=None, max_items=None):
+        """커서를 따라가며 결과를 하나씩 반환합니다.
+        
+        현재 페이지를 소비하는 동안 다음 페이지를 백그라운드에서 미리 가져옵니다.
+        fetch_page(start_cursor, page_size)는 노션 API 응답(dict)을 반환해야 합니다.
+        """
+        page_size = min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+        if max_items is not None and max_items <= 0:
+            return
+        
+        def next_size(fetched):
+            if max_items is None:
+                return page_size
+            return max(1, min(page_size, max_items - fetched))
+        
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-prefetch")
+        try:
+            future = executor.submit(fetch_page, None, next_size(0))
+            fetched = 0
+            yielded = 0
+            while future is not None:
+                result = future.result()
+                if 'results' not in result:
+                    raise NotionAPIError(result)
+                
+                results = result['results']
+                fetched += len(results)
+                
+                # 다음 페이지가 필요하면 현재 페이지를 소비하기 전에 미리 요청
+                future = None
+                next_cursor = result.get('next_cursor')
+                if result.get('has_more') and next_cursor and (max_items is None or fetched < max_items):
+                    future = executor.submit(fetch_page, next_cursor, next_size(fetched))
+                
+                for item in results:
+                    if max_items is not None and yielded >= max_items:
+                        return
+                    yield item
+                    yielded += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def get_databases(self):
         """사용자가 접근 가능한 데이터베이스 목록을 가져옵니다."""
-        print("[노션 API] 데이터베이스 목록 조회 - search 엔드포인트 사용")
+        logger.debug("데이터베이스 목록 조회 - search 엔드포인트 사용")
         url = f"{self.base_url}/search"
         
         # 데이터베이스만 필터링
@@ -38,23 +286,17 @@ class NotionMCPClient:
             }
         }
         
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)}")
-        
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("POST", url, payload)
         
         if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            return response.json()
+            return json_codec.loads(response.content)
             
-        # 응답에서 데이터베이스 이름을 추출하여 로그 출력
-        result = response.json()
-        if 'results' in result and result['results']:
-            print(f"[노션 API] {len(result['results'])}개의 데이터베이스를 찾았습니다.")
+        # 응답에서 데이터베이스 이름을 추출하여 로그 출력 (DEBUG일 때만)
+        result = json_codec.loads(response.content)
+        if result.get('results') and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%d개의 데이터베이스를 찾았습니다.", len(result['results']))
             for db in result['results']:
-                title = self._extract_title_from_database(db)
-                print(f"[노션 API] 데이터베이스: {title} (ID: {db['id']})")
+                logger.debug("데이터베이스: %s (ID: %s)", self._extract_title_from_database(db), db['id'])
                 
         return result
     
@@ -71,56 +313,141 @@ class NotionMCPClient:
                             break
             return title
         except Exception as e:
-            print(f"[노션 API] 데이터베이스 제목 추출 오류: {e}")
+            logger.warning("데이터베이스 제목 추출 오류: %s", e)
             return "제목 추출 오류"
     
+    def _load_database_catalog(self):
+        """카탈로그 갱신용으로 모든 데이터베이스를 가져옵니다. 실패하면 None."""
+        logger.debug("데이터베이스 카탈로그 갱신 - search 엔드포인트 사용")
+        try:
+            return list(self.iter_search(
+                filter_params={"value": "database", "property": "object"},
+                sort_params={"direction": "descending", "timestamp": "last_edited_time"}
+            ))
+        except NotionAPIError as e:
+            logger.error("데이터베이스 카탈로그 갱신 실패: %s", e)
+            return None
+    
     def find_database_by_name(self, name):
         """이름으로 데이터베이스를 찾습니다."""
-        print(f"[노션 API] '{name}' 이름의 데이터베이스 검색 중")
-        
-        # 데이터베이스 목록 가져오기
-        databases = self.get_databases()
+        logger.debug("'%s' 이름의 데이터베이스 검색 중", name)
         
-        if 'results' not in databases or not databases['results']:
-            print("[노션 API] 데이터베이스를 찾을 수 없습니다.")
-            return None
-            
-        # 이름 기준으로 데이터베이스 검색
-        for db in databases['results']:
-            title = self._extract_title_from_database(db)
-            if name.lower() in title.lower():
-                print(f"[노션 API] 데이터베이스를 찾았습니다: {title} (ID: {db['id']})")
-                return db['id']
+        # 캐시된 카탈로그에서 이름으로 검색 (필요할 때만 /search 호출)
+        entry = self.database_catalog.find_by_name(name)
+        if entry:
+            logger.debug("데이터베이스를 찾았습니다: %s (ID: %s)", entry['title'], entry['id'])
+            return entry['id']
                 
-        print(f"[노션 API] '{name}' 이름의 데이터베이스를 찾을 수 없습니다.")
+        logger.info("'%s' 이름의 데이터베이스를 찾을 수 없습니다.", name)
         return None
     
     def get_database(self, database_id):
         """특정 데이터베이스의 정보를 가져옵니다."""
         url = f"{self.base_url}/databases/{database_id}"
-        print(f"[노션 API 요청] GET {url}")
-        response = requests.get(url, headers=self.headers)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("GET", url)
         
         if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            return response.json()
+            return json_codec.loads(response.content)
             
-        result = response.json()
+        result = json_codec.loads(response.content)
         
         # 디버깅: 데이터베이스 속성 확인
-        if 'properties' in result:
-            print(f"[노션 API] 데이터베이스 속성 정보:")
-            for prop_name, prop_data in result['properties'].items():
-                prop_type = prop_data.get('type', '알 수 없음')
-                print(f"  - {prop_name} (타입: {prop_type})")
-                
-                # 타이틀 속성 특별 표시
-                if prop_type == 'title':
-                    print(f"    [타이틀 속성]")
+        if 'properties' in result and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("데이터베이스 속성 정보: %s", ", ".join(
+                f"{prop_name}({prop_data.get('type', '알 수 없음')})"
+                for prop_name, prop_data in result['properties'].items()
+            ))
         
         return result
     
+    def get_default_parent_page_id(self, refresh=False):
+        """페이지/데이터베이스 생성에 사용할 기본 부모 페이지 ID를 반환합니다.
+        
+        한 번 결정된 ID는 캐시하며, refresh=True 이면 설정값을 무시하고 다시 검색합니다.
+        (page_id, 오류 메시지) 튜플을 반환합니다.
+        """
+        with self._parent_page_lock:
+            if not refresh and self._default_parent_page_id:
+                return self._default_parent_page_id, None
+            
+            if not refresh and self.configured_parent_page_id:
+                self._default_parent_page_id = self.configured_parent_page_id
+                logger.info("설정된 기본 부모 페이지 사용: %s", self._default_parent_page_id)
+                return self._default_parent_page_id, None
+            
+            # 가장 최근에 수정된 페이지를 부모로 선택
+            url_search = f"{self.base_url}/search"
+            payload_search = {
+                "filter": {
+                    "value": "page",
+                    "property": "object"
+                },
+                "sort": {
+                    "direction": "descending",
+                    "timestamp": "last_edited_time"
+                },
+                "page_size": 1
+            }
+            
+            response_search = self._request("POST", url_search, payload_search)
+            
+            if response_search.status_code != 200:
+                logger.error("페이지 검색 실패: %s", truncate(response_search.text))
+                return None, f"페이지 검색 실패: {response_search.text}"
+            
+            search_results = json_codec.loads(response_search.content)
+            if not search_results.get('results'):
+                logger.error("사용 가능한 페이지를 찾을 수 없습니다.")
+                return None, "사용 가능한 페이지를 찾을 수 없습니다."
+            
+            self._default_parent_page_id = search_results['results'][0]['id']
+            logger.info("부모 페이지를 찾았습니다: %s", self._default_parent_page_id)
+            return self._default_parent_page_id, None
+    
+    def invalidate_default_parent_page(self):
+        """캐시된 기본 부모 페이지를 무효화합니다."""
+        with self._parent_page_lock:
+            self._default_parent_page_id = None
+    
+    def _is_parent_error(self, response):
+        """응답이 부모 페이지 문제(삭제, 권한 없음 등)로 인한 실패인지 확인합니다."""
+        if response.status_code == 404:
+            return True
+        if response.status_code == 400:
+            try:
+                message = json_codec.loads(response.content).get("message", "")
+            except ValueError:
+                return False
+            return "parent" in message
+        return False
+    
+    def _post_with_default_parent(self, url, build_payload):
+        """기본 부모 페이지 아래에 객체를 생성합니다.
+        
+        캐시된 부모 페이지가 더 이상 유효하지 않으면 한 번 다시 찾아서 재시도합니다.
+        """
+        for attempt in range(2):
+            parent_page_id, error = self.get_default_parent_page_id(refresh=attempt > 0)
+            if error:
+                return {"error": error}
+            
+            payload = build_payload(parent_page_id)
+            
+            response = self._request("POST", url, payload)
+            
+            if response.status_code == 200:
+                return json_codec.loads(response.content)
+            
+            if attempt == 0 and self._is_parent_error(response):
+                logger.warning("기본 부모 페이지 %s가 유효하지 않아 다시 찾습니다.", parent_page_id)
+                self.invalidate_default_parent_page()
+                continue
+            return json_codec.loads(response.content)
+    
+    def get_database_schema(self, database_id):
+        """캐시된 데이터베이스 스키마(타이틀 속성, 속성 타입, 선택 옵션)를 반환합니다."""
+        return self.schema_cache.get(database_id)
+    
     def create_database(self, parent_page_id, title, properties=None):
         """새 데이터베이스를 생성합니다."""
         url = f"{self.base_url}/databases"
@@ -148,74 +475,59 @@ class NotionMCPClient:
                 }
             }
         
-        # 페이지 ID가 없으면 워크스페이스 루트 사용
-        if not parent_page_id:
-            # 먼저 사용자 페이지 목록 가져오기
-            url_search = f"{self.base_url}/search"
-            payload_search = {
-                "filter": {
-                    "value": "page",
-                    "property": "object"
+        def build_payload(parent_id):
+            return {
+                "parent": {
+                    "type": "page_id",
+                    "page_id": parent_id
                 },
-                "sort": {
-                    "direction": "descending",
-                    "timestamp": "last_edited_time"
-                }
-            }
-            response_search = requests.post(url_search, headers=self.headers, json=payload_search)
-            
-            if response_search.status_code == 200:
-                search_results = response_search.json()
-                if 'results' in search_results and search_results['results']:
-                    parent_page_id = search_results['results'][0]['id']
-                    print(f"[노션 API] 부모 페이지를 찾았습니다: {parent_page_id}")
-                else:
-                    return {"error": "부모 페이지를 찾을 수 없습니다. 먼저 페이지를 생성하세요."}
-            else:
-                return {"error": "페이지 검색 중 오류가 발생했습니다."}
-        
-        # 데이터베이스 생성 요청
-        payload = {
-            "parent": {
-                "type": "page_id",
-                "page_id": parent_page_id
-            },
-            "title": [
-                {
-                    "type": "text",
-                    "text": {
-                        "content": title
+                "title": [
+                    {
+                        "type": "text",
+                        "text": {
+                            "content": title
+                        }
                     }
-                }
-            ],
-            "properties": properties
-        }
-        
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)[:500]}...")
+                ],
+                "properties": properties
+            }
         
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        # 페이지 ID가 없으면 캐시된 기본 부모 페이지 사용
+        if not parent_page_id:
+            result = self._post_with_default_parent(url, build_payload)
+        else:
+            payload = build_payload(parent_page_id)
+            
+            response = self._request("POST", url, payload)
+            
+            result = json_codec.loads(response.content)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
+        if 'id' in result:
+            # 새 데이터베이스가 이름 조회에 바로 반영되도록 카탈로그 무효화
+            self.database_catalog.invalidate()
             
-        return response.json()
+        return result
     
-    def query_database(self, database_id, filter_params=None):
-        """데이터베이스에서 데이터를 쿼리합니다."""
+    def query_database(self, database_id, filter_params=None, start_cursor=None, page_size=None):
+        """데이터베이스에서 데이터를 쿼리합니다 (한 페이지)."""
         url = f"{self.base_url}/databases/{database_id}/query"
-        payload = filter_params if filter_params else {}
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)}")
+        payload = dict(filter_params) if filter_params else {}
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+        if page_size:
+            payload["page_size"] = page_size
         
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("POST", url, payload)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json()
+        return json_codec.loads(response.content)
+    
+    def iter_query_database(self, database_id, filter_params=None, page_size=None, max_items=None):
+        """데이터베이스 쿼리 결과 전체를 커서를 따라가며 하나씩 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.query_database(database_id, filter_params, cursor, size),
+            page_size,
+            max_items
+        )
     
     def create_page(self, parent_id, properties, children=None):
         """새 페이지를 생성합니다."""
@@ -224,154 +536,257 @@ class NotionMCPClient:
             "parent": {"database_id": parent_id},
             "properties": properties
         }
-        if children:
-            payload["children"] = children
-        
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)[:500]}...")
+        # 첫 번째 청크만 생성 요청에 담고 나머지는 생성 후 순서대로 추가
+        chunks = iter_upload_chunks(children)
+        first_chunk = next(chunks, None)
+        if first_chunk:
+            payload["children"] = first_chunk
         
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("POST", url, payload)
         
         if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
+            if response.status_code == 400:
+                # 스키마가 바뀌었을 수 있으므로 캐시된 스키마를 버림
+                self.schema_cache.invalidate(parent_id)
+            chunks.close()
+            return json_codec.loads(response.content)
             
-        return response.json()
+        return self._append_remaining_chunks(json_codec.loads(response.content), first_chunk, chunks)
+    
+    def create_pages_bulk(self, database_id, rows, max_workers=None):
+        """데이터베이스에 여러 페이지를 제한된 수의 작업자로 동시에 생성합니다.
+        
+        rows는 {"properties": {...}, "children": [...]} 리스트이며, 입력 순서대로
+        {"index", "id", "url"} 또는 {"index", "error"} 결과 리스트를 반환합니다.
+        요청 속도는 공유 레이트 리미터가 맞추므로 작업자 수는 대기 중인 요청 수만 정합니다.
+        """
+        def create(indexed_row):
+            index, row = indexed_row
+            try:
+                result = self.create_page(database_id, row.get("properties", {}), row.get("children"))
+            except Exception as e:
+                return {"index": index, "error": str(e)}
+            if 'id' not in result:
+                return {"index": index, "error": result.get("message", str(result))}
+            entry = {"index": index, "id": result['id'], "url": result.get('url', '')}
+            if 'append_error' in result:
+                entry["append_error"] = result['append_error']
+            return entry
+        
+        with ThreadPoolExecutor(max_workers=max_workers or DEFAULT_BULK_WORKERS,
+                                thread_name_prefix="notion-bulk") as executor:
+            results = list(executor.map(create, enumerate(rows)))
+        
+        failed = sum(1 for result in results if 'error' in result)
+        logger.info("페이지 일괄 생성", extra={"fields": {
+            "database_id": database_id,
+            "rows": len(results),
+            "failed": failed
+        }})
+        return results
     
     def create_page_in_workspace(self, title, icon=None, children=None):
         """워크스페이스에 새 페이지를 생성합니다 (데이터베이스 없이)."""
         url = f"{self.base_url}/pages"
         
-        # 먼저 최상위 페이지를 찾아서 그 아래에 새 페이지를 생성
-        url_search = f"{self.base_url}/search"
-        payload_search = {
-            "filter": {
-                "value": "page",
-                "property": "object"
-            },
-            "sort": {
-                "direction": "descending",
-                "timestamp": "last_edited_time"
-            },
-            "page_size": 10
-        }
-        
-        print(f"[노션 API 요청] 최상위 페이지 검색 POST {url_search}")
-        response_search = requests.post(url_search, headers=self.headers, json=payload_search)
-        print(f"[노션 API 응답] 상태 코드: {response_search.status_code}")
-        
-        parent_page_id = None
-        if response_search.status_code == 200:
-            search_results = response_search.json()
-            if 'results' in search_results and search_results['results']:
-                # 첫 번째 페이지를 부모로 선택
-                parent_page_id = search_results['results'][0]['id']
-                print(f"[노션 API] 부모 페이지를 찾았습니다: {parent_page_id}")
-            else:
-                print(f"[노션 API 오류] 사용 가능한 페이지를 찾을 수 없습니다.")
-                return {"error": "사용 가능한 페이지를 찾을 수 없습니다."}
-        else:
-            print(f"[노션 API 오류] 페이지 검색 실패: {response_search.text}")
-            return {"error": f"페이지 검색 실패: {response_search.text}"}
-        
-        # 페이지 생성 요청
-        payload = {
-            "parent": {
-                "type": "page_id",
-                "page_id": parent_page_id
-            },
-            "properties": {
-                "title": [
-                    {
-                        "type": "text",
-                        "text": {
-                            "content": title
+        def build_payload(parent_id):
+            payload = {
+                "parent": {
+                    "type": "page_id",
+                    "page_id": parent_id
+                },
+                "properties": {
+                    "title": [
+                        {
+                            "type": "text",
+                            "text": {
+                                "content": title
+                            }
                         }
-                    }
-                ]
+                    ]
+                }
             }
-        }
-        
-        if icon:
-            if icon.startswith("http"):
-                payload["icon"] = {"type": "external", "external": {"url": icon}}
-            else:
-                payload["icon"] = {"type": "emoji", "emoji": icon}
-        
-        if children:
-            payload["children"] = children
             
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)[:500]}...")
-        
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
+            if icon:
+                if icon.startswith("http"):
+                    payload["icon"] = {"type": "external", "external": {"url": icon}}
+                else:
+                    payload["icon"] = {"type": "emoji", "emoji": icon}
             
-        return response.json()
+            if first_chunk:
+                payload["children"] = first_chunk
+            return payload
+        
+        # 첫 번째 청크만 생성 요청에 담고 나머지는 생성 후 순서대로 추가
+        chunks = iter_upload_chunks(children)
+        first_chunk = next(chunks, None)
+        
+        # 캐시된 기본 부모 페이지 아래에 새 페이지를 생성
+        result = self._post_with_default_parent(url, build_payload)
+        if 'id' not in result:
+            chunks.close()
+            return result
+        return self._append_remaining_chunks(result, first_chunk, chunks)
     
     def update_page(self, page_id, properties):
         """페이지를 업데이트합니다."""
         url = f"{self.base_url}/pages/{page_id}"
         payload = {"properties": properties}
         
-        print(f"[노션 API 요청] PATCH {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)}")
-        
-        response = requests.patch(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("PATCH", url, payload)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json()
+        return json_codec.loads(response.content)
     
     def get_page(self, page_id):
         """페이지 정보를 가져옵니다."""
         url = f"{self.base_url}/pages/{page_id}"
         
-        print(f"[노션 API 요청] GET {url}")
-        response = requests.get(url, headers=self.headers)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("GET", url)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json()
+        return json_codec.loads(response.content)
     
-    def get_block_children(self, block_id):
-        """블록의 하위 항목을 가져옵니다."""
+    def get_block_children(self, block_id, start_cursor=None, page_size=None):
+        """블록의 하위 항목을 가져옵니다 (한 페이지)."""
         url = f"{self.base_url}/blocks/{block_id}/children"
+        params = {}
+        if start_cursor:
+            params["start_cursor"] = start_cursor
+        if page_size:
+            params["page_size"] = page_size
         
-        print(f"[노션 API 요청] GET {url}")
-        response = requests.get(url, headers=self.headers)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("GET", url, params=params or None)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json()
+        return json_codec.loads(response.content)
     
-    def append_block_children(self, block_id, children):
-        """블록에 하위 항목을 추가합니다."""
+    def iter_block_children(self, block_id, page_size=None, max_items=None):
+        """블록의 하위 항목 전체를 커서를 따라가며 하나씩 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.get_block_children(block_id, cursor, size),
+            page_size,
+            max_items
+        )
+    
+    def _append_block_chunk(self, block_id, children):
+        """블록에 하위 항목 한 청크(최대 100개)를 추가합니다."""
         url = f"{self.base_url}/blocks/{block_id}/children"
         payload = {"children": children}
         
-        print(f"[노션 API 요청] PATCH {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)[:500]}...")
+        response = self._request("PATCH", url, payload)
         
-        response = requests.patch(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json()
+        return json_codec.loads(response.content)
+    
+    def _compact_block(self, block):
+        """블록 객체를 트리 표시에 필요한 정보만 담은 노드로 변환합니다."""
+        block_type = block.get('type')
+        body = block.get(block_type, {}) if block_type else {}
+        node = {
+            "id": block.get('id'),
+            "type": block_type,
+            "text": ''.join(item.get('plain_text', '') for item in body.get('rich_text', []))
+        }
+        if block_type == 'to_do':
+            node["checked"] = body.get('checked', False)
+        elif block_type == 'code':
+            node["language"] = body.get('language', '')
+        elif block_type == 'callout':
+            node["emoji"] = (body.get('icon') or {}).get('emoji', '💡')
+        elif block_type in BLOCK_TREE_SKIP_TYPES:
+            node["text"] = body.get('title', '')
+        return node
     
-    def search(self, query="", filter_params=None, sort_params=None):
-        """노션 내 객체를 검색합니다."""
+    def get_block_tree(self, block_id, max_depth=None, concurrency=None):
+        """블록(페이지)의 하위 블록 트리를 너비 우선으로 가져옵니다.
+        
+        같은 깊이의 블록들은 동시에 조회하므로 깊이 한 단계당 대략 한 번의 왕복 시간이 듭니다.
+        각 노드는 id, type, text와 (하위 블록이 있으면) children 리스트를 가집니다.
+        max_depth에 걸려 조회하지 못한 하위 블록이 있으면 has_more_children이 True입니다.
+        max_depth가 None이면 NOTION_BLOCK_TREE_DEPTH를 사용하고, 0이면 아무것도 조회하지 않습니다.
+        """
+        if max_depth is None:
+            max_depth = DEFAULT_BLOCK_TREE_DEPTH
+        if max_depth <= 0:
+            return []
+        root = {"id": block_id, "children": []}
+        level = [root]
+        depth = 0
+        
+        def fetch(node):
+            try:
+                return list(self.iter_block_children(node["id"]))
+            except NotionAPIError as e:
+                return e
+        
+        with ThreadPoolExecutor(max_workers=concurrency or DEFAULT_BLOCK_TREE_CONCURRENCY,
+                                thread_name_prefix="notion-block-tree") as executor:
+            while level:
+                next_level = []
+                for node, blocks in zip(level, executor.map(fetch, level)):
+                    if isinstance(blocks, NotionAPIError):
+                        if node is root:
+                            raise blocks
+                        node["error"] = str(blocks)
+                        continue
+                    for block in blocks:
+                        child = self._compact_block(block)
+                        node["children"].append(child)
+                        if not block.get('has_children') or child["type"] in BLOCK_TREE_SKIP_TYPES:
+                            continue
+                        if depth + 1 < max_depth:
+                            child["children"] = []
+                            next_level.append(child)
+                        else:
+                            child["has_more_children"] = True
+                level = next_level
+                depth += 1
+        
+        return root["children"]
+    
+    def append_block_children(self, block_id, children):
+        """블록에 하위 항목을 추가합니다.
+        
+        100개 제한과 2000자 제한에 맞게 나눈 뒤 순서대로 여러 번에 걸쳐 추가합니다.
+        """
+        result = None
+        appended = []
+        for chunk in iter_upload_chunks(children):
+            result = self._append_block_chunk(block_id, chunk)
+            if 'results' not in result:
+                # 실패하면 중단 (이후 청크를 추가하면 순서가 어긋남)
+                return result
+            appended.extend(result['results'])
+        
+        if result is None:
+            return {"object": "list", "results": []}
+        result['results'] = appended
+        if self.search_index is not None and block_id in self.search_index:
+            self.search_index.append_text(block_id, blocks_text(appended))
+        return result
+    
+    def _append_remaining_chunks(self, page, first_chunk, chunks):
+        """생성된 페이지에 남은 블록 청크를 순서대로 추가합니다.
+        
+        추가에 실패하면 페이지 응답에 append_error를 담아 반환합니다.
+        검색 색인이 설정되어 있으면 실제로 업로드된 내용으로 페이지를 색인합니다.
+        """
+        indexing = self.search_index is not None
+        texts = [blocks_text(first_chunk)] if indexing and first_chunk else []
+        try:
+            for index, chunk in enumerate(chunks, start=1):
+                result = self._append_block_chunk(page['id'], chunk)
+                if 'results' not in result:
+                    logger.error("페이지 %s에 %d번째 블록 청크 추가 실패", page['id'], index + 1)
+                    page['append_error'] = result
+                    break
+                if indexing:
+                    texts.append(blocks_text(chunk))
+        finally:
+            chunks.close()
+        if indexing:
+            self.search_index.add_page(page, "\n".join(texts))
+        return page
+    
+    def search(self, query="", filter_params=None, sort_params=None, start_cursor=None, page_size=None):
+        """노션 내 객체를 검색합니다 (한 페이지)."""
         url = f"{self.base_url}/search"
         
         payload = {}
@@ -381,14 +796,19 @@ class NotionMCPClient:
             payload["filter"] = filter_params
         if sort_params:
             payload["sort"] = sort_params
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+        if page_size:
+            payload["page_size"] = page_size
             
-        print(f"[노션 API 요청] POST {url}")
-        print(f"[노션 API 요청 본문] {json.dumps(payload, ensure_ascii=False)}")
-        
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(f"[노션 API 응답] 상태 코드: {response.status_code}")
+        response = self._request("POST", url, payload)
         
-        if response.status_code != 200:
-            print(f"[노션 API 오류] {response.text}")
-            
-        return response.json() 
\ No newline at end of file
+        return json_codec.loads(response.content)
+    
+    def iter_search(self, query="", filter_params=None, sort_params=None, page_size=None, max_items=None):
+        """검색 결과 전체를 커서를 따라가며 하나씩 반환합니다."""
+        return self._iter_paginated(
+            lambda cursor, size: self.search(query, filter_params, sort_params, cursor, size),
+            page_size,
+            max_items
+        )
@@ -0,0 +1,371 @@
+import os
+import sys
+import json_codec
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from dotenv import load_dotenv
+from mcp_logging import get_logger
+
+# .env 파일에서 환경 변수 로드
+load_dotenv()
+
+logger = get_logger("notion.mirror")
+
+# 미러 기본 설정
+DEFAULT_MIRROR_MAX_AGE = float(os.getenv("NOTION_MIRROR_MAX_AGE", "300"))  # 이 시간(초) 안에 동기화된 미러만 사용
+# 증분 동기화는 보관/삭제된 페이지를 알 수 없으므로 이 간격(초)마다 전체 동기화로 정리 (0이면 사용 안 함)
+DEFAULT_FULL_SYNC_INTERVAL = float(os.getenv("NOTION_MIRROR_FULL_SYNC_INTERVAL", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS databases (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    schema_json TEXT,
+    high_water_mark TEXT,
+    last_synced_at REAL,
+    last_full_sync_at REAL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    database_id TEXT NOT NULL,
+    title TEXT,
+    url TEXT,
+    last_edited_time TEXT,
+    page_json TEXT NOT NULL,
+    block_tree_json TEXT,
+    block_text TEXT,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS pages_database_idx ON pages (database_id, last_edited_time);
+"""
+
+
+def flatten_block_text(nodes):
+    """블록 트리의 텍스트를 줄 단위로 이어 붙입니다."""
+    lines = []
+    for node in nodes:
+        if node.get('text'):
+            lines.append(node['text'])
+        lines.extend(flatten_block_text(node.get('children', [])).splitlines())
+    return "\n".join(lines)
+
+
+def property_plain_value(prop_data):
+    """페이지 속성 값을 필터 비교용 값으로 변환합니다."""
+    prop_type = prop_data.get('type')
+    value = prop_data.get(prop_type)
+    if prop_type in ('title', 'rich_text'):
+        return ''.join(item.get('plain_text', '') for item in value or [])
+    if prop_type in ('select', 'status'):
+        return value.get('name') if value else None
+    if prop_type == 'multi_select':
+        return [item.get('name') for item in value or []]
+    if prop_type in ('number', 'checkbox', 'url', 'email', 'phone_number'):
+        return value
+    if prop_type == 'date':
+        return value.get('start') if value else None
+    return value
+
+
+# 로컬에서 평가할 수 있는 필터 연산자
+_SUPPORTED_FILTER_TYPES = {'title', 'rich_text', 'select', 'status', 'multi_select',
+                           'number', 'checkbox', 'url', 'email', 'phone_number'}
+
+
+def _match_condition(value, condition):
+    """단일 필터 조건을 평가합니다. 지원하지 않는 연산자면 None."""
+    if len(condition) != 1:
+        return None
+    operator, expected = next(iter(condition.items()))
+    if operator == 'equals':
+        return value == expected
+    if operator == 'does_not_equal':
+        return value != expected
+    if operator == 'contains':
+        if isinstance(value, list):
+            return expected in value
+        return value is not None and str(expected).lower() in str(value).lower()
+    if operator == 'does_not_contain':
+        if isinstance(value, list):
+            return expected not in value
+        return value is None or str(expected).lower() not in str(value).lower()
+    if operator == 'is_empty':
+        return not value
+    if operator == 'is_not_empty':
+        return bool(value)
+    return None
+
+
+def match_filter(page, filter_obj):
+    """노션 필터를 로컬에서 평가합니다. 평가할 수 없는 필터면 None을 반환합니다."""
+    if not filter_obj:
+        return True
+    if 'and' in filter_obj or 'or' in filter_obj:
+        sub_filters = filter_obj['and'] if 'and' in filter_obj else filter_obj['or']
+        results = [match_filter(page, sub) for sub in sub_filters or []]
+        if any(result is None for result in results):
+            return None
+        return all(results) if 'and' in filter_obj else any(results)
+
+    prop_name = filter_obj.get('property')
+    filter_types = [key for key in filter_obj if key in _SUPPORTED_FILTER_TYPES]
+    if not prop_name or len(filter_types) != 1 or len(filter_obj) != 2:
+        return None
+    prop_data = page.get('properties', {}).get(prop_name)
+    if prop_data is None:
+        return None
+    return _match_condition(property_plain_value(prop_data), filter_obj[filter_types[0]])
+
+
+class NotionMirror:
+    """선택한 노션 데이터베이스를 로컬 SQLite 파일에 미러링합니다.
+
+    sync()는 last_edited_time 필터와 커서 페이지네이션으로 바뀐 페이지만 가져와
+    페이지 속성과 블록 트리를 저장합니다. 읽기는 query()로 로컬에서 처리하고,
+    쓰기는 항상 노션 API로 직접 보냅니다.
+
+    mark_stale()은 데이터베이스의 세대 번호를 올립니다. 동기화 도중 세대가 바뀌면
+    그 동기화는 미러를 최신으로 표시하지 않고, 백그라운드 동기화를 한 번 더 실행합니다.
+    """
+
+    def __init__(self, notion_client, path=None, max_age=None, full_sync_interval=None):
+        self.notion_client = notion_client
+        self.path = path or os.getenv("NOTION_MIRROR_PATH", "notion_mirror.sqlite3")
+        self.max_age = DEFAULT_MIRROR_MAX_AGE if max_age is None else max_age
+        self.full_sync_interval = DEFAULT_FULL_SYNC_INTERVAL if full_sync_interval is None else full_sync_interval
+        self._write_lock = threading.Lock()
+        self._syncing = set()
+        self._resync = set()
+        self._generations = {}
+        self._syncing_lock = threading.Lock()
+        # 동기화한 페이지를 함께 반영할 검색 색인 (선택 사항, SearchIndex)
+        self.search_index = None
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(databases)")]
+            if 'last_full_sync_at' not in columns:
+                # 이전 버전에서 만든 미러 파일
+                conn.execute("ALTER TABLE databases ADD COLUMN last_full_sync_at REAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _database_row(self, database_id):
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT title, high_water_mark, last_synced_at, last_full_sync_at FROM databases WHERE id = ?",
+                (database_id,)
+            ).fetchone()
+
+    def is_mirrored(self, database_id):
+        """데이터베이스가 미러 대상으로 등록되어 있는지 확인합니다."""
+        return self._database_row(database_id) is not None
+
+    def age(self, database_id):
+        """마지막 동기화 이후 경과 시간(초)을 반환합니다. 동기화한 적 없으면 None."""
+        row = self._database_row(database_id)
+        if not row or row[2] is None:
+            return None
+        return time.time() - row[2]
+
+    def is_fresh(self, database_id, max_age=None):
+        """미러가 max_age 초 안에 동기화되었는지 확인합니다."""
+        age = self.age(database_id)
+        max_age = self.max_age if max_age is None else max_age
+        return age is not None and age <= max_age
+
+    def _generation(self, database_id):
+        with self._syncing_lock:
+            return self._generations.get(database_id, 0)
+
+    def mark_stale(self, database_id):
+        """쓰기 이후 미러가 더 이상 최신이 아님을 표시합니다 (다음 동기화 전까지 노션 API로 조회).
+
+        이미 진행 중인 동기화는 쓰기 이전에 페이지를 읽었을 수 있으므로 미러를 최신으로 표시하지 않습니다.
+        """
+        with self._syncing_lock:
+            self._generations[database_id] = self._generations.get(database_id, 0) + 1
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE databases SET last_synced_at = NULL WHERE id = ?", (database_id,))
+
+    def needs_full_sync(self, database_id):
+        """마지막 전체 동기화 이후 full_sync_interval 초가 지났는지 확인합니다."""
+        if not self.full_sync_interval:
+            return False
+        row = self._database_row(database_id)
+        return not row or row[3] is None or time.time() - row[3] >= self.full_sync_interval
+
+    def sync(self, database_id, full=None):
+        """데이터베이스를 증분 동기화하고 갱신된 페이지 수를 반환합니다.
+
+        full=True 이면 전체 페이지를 다시 읽고, 노션에서 사라진(보관된) 페이지를 미러에서 삭제합니다.
+        full=None 이면 마지막 전체 동기화 후 full_sync_interval 초가 지났을 때 전체 동기화합니다.
+        """
+        started = time.time()
+        generation = self._generation(database_id)
+        if full is None:
+            full = self.needs_full_sync(database_id)
+        row = self._database_row(database_id)
+        high_water_mark = None if full or not row else row[1]
+
+        schema = self.notion_client.get_database_schema(database_id)
+        entry = self.notion_client.database_catalog.get(database_id)
+        title = entry['title'] if entry else None
+
+        filter_params = None
+        if high_water_mark:
+            # last_edited_time은 분 단위라 같은 분의 페이지를 다시 읽을 수 있음 (upsert라 안전)
+            filter_params = {"filter": {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": high_water_mark}
+            }}
+
+        seen_ids = []
+        archived_ids = []
+        new_high_water_mark = high_water_mark
+        for page in self.notion_client.iter_query_database(database_id, filter_params):
+            if page.get('archived') or page.get('in_trash'):
+                archived_ids.append(page['id'])
+                continue
+            block_tree = self.notion_client.get_block_tree(page['id'])
+            page_title = self._page_title(page, schema.get('title_property'))
+            with self._write_lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    """INSERT OR REPLACE INTO pages
+                       (id, database_id, title, url, last_edited_time, page_json, block_tree_json, block_text, synced_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (page['id'], database_id, page_title, page.get('url'), page.get('last_edited_time'),
+                     json_codec.dumps(page), json_codec.dumps(block_tree),
+                     flatten_block_text(block_tree), started)
+                )
+            if self.search_index is not None:
+                self.search_index.add_page(page, flatten_block_text(block_tree), database_id)
+            seen_ids.append(page['id'])
+            if page.get('last_edited_time') and (new_high_water_mark is None or page['last_edited_time'] > new_high_water_mark):
+                new_high_water_mark = page['last_edited_time']
+
+        # 동기화 도중 mark_stale()이 호출되었으면 쓰기가 반영되지 않았을 수 있으므로 최신으로 표시하지 않음
+        superseded = self._generation(database_id) != generation
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            removed_ids = list(archived_ids)
+            if full:
+                placeholders = ','.join('?' * len(seen_ids))
+                removed_ids += [row[0] for row in conn.execute(
+                    f"SELECT id FROM pages WHERE database_id = ? AND id NOT IN ({placeholders})",
+                    [database_id] + seen_ids
+                )]
+            conn.executemany(
+                "DELETE FROM pages WHERE database_id = ? AND id = ?",
+                [(database_id, page_id) for page_id in removed_ids]
+            )
+            if self.search_index is not None:
+                for page_id in removed_ids:
+                    self.search_index.remove(page_id)
+            conn.execute(
+                """INSERT INTO databases (id, title, schema_json, high_water_mark, last_synced_at, last_full_sync_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET title = excluded.title, schema_json = excluded.schema_json,
+                   high_water_mark = excluded.high_water_mark, last_synced_at = excluded.last_synced_at,
+                   last_full_sync_at = COALESCE(excluded.last_full_sync_at, databases.last_full_sync_at)""",
+                (database_id, title, json_codec.dumps(schema.get('property_types', {})),
+                 new_high_water_mark, None if superseded else started, started if full else None)
+            )
+
+        logger.info("미러 동기화 완료", extra={"fields": {
+            "database_id": database_id,
+            "pages": len(seen_ids),
+            "removed": len(removed_ids),
+            "full": full,
+            "superseded": superseded,
+            "duration_ms": round((time.time() - started) * 1000, 1)
+        }})
+        return len(seen_ids)
+
+    def sync_in_background(self, database_id):
+        """백그라운드 스레드에서 동기화를 시작합니다.
+
+        이미 동기화 중이면 새 스레드를 만들지 않고, 진행 중인 동기화가 끝난 뒤 한 번 더 동기화하도록 예약합니다.
+        """
+        with self._syncing_lock:
+            if database_id in self._syncing:
+                self._resync.add(database_id)
+                return
+            self._syncing.add(database_id)
+
+        def run():
+            while True:
+                try:
+                    self.sync(database_id)
+                except Exception as e:
+                    logger.error("백그라운드 미러 동기화 오류 (%s): %s", database_id, e)
+                with self._syncing_lock:
+                    if database_id not in self._resync:
+                        self._syncing.discard(database_id)
+                        return
+                    self._resync.discard(database_id)
+
+        threading.Thread(target=run, name="notion-mirror-sync", daemon=True).start()
+
+    def iter_pages(self):
+        """미러에 저장된 모든 페이지를 (페이지 객체, 블록 텍스트, 데이터베이스 ID)로 반환합니다."""
+        with closing(self._connect()) as conn:
+            for page_json, block_text, database_id in conn.execute(
+                "SELECT page_json, block_text, database_id FROM pages"
+            ):
+                yield json_codec.loads(page_json), block_text or "", database_id
+
+    def _page_title(self, page, title_property):
+        if title_property and title_property in page.get('properties', {}):
+            return property_plain_value(page['properties'][title_property])
+        return None
+
+    def query(self, database_id, filter_params=None, max_items=None, max_age=None):
+        """미러에서 페이지를 조회합니다.
+
+        미러가 신선하지 않거나 필터를 로컬에서 평가할 수 없으면 None을 반환합니다.
+        성공하면 (페이지 객체, 블록 트리) 튜플 리스트를 최근 수정 순으로 반환합니다.
+        """
+        if not self.is_fresh(database_id, max_age):
+            return None
+
+        filter_obj = (filter_params or {}).get('filter')
+        results = []
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT page_json, block_tree_json FROM pages WHERE database_id = ? ORDER BY last_edited_time DESC",
+                (database_id,)
+            )
+            for page_json, block_tree_json in rows:
+                page = json_codec.loads(page_json)
+                matched = match_filter(page, filter_obj)
+                if matched is None:
+                    logger.debug("미러에서 평가할 수 없는 필터, 노션 API로 조회: %s", filter_obj)
+                    return None
+                if matched:
+                    results.append((page, json_codec.loads(block_tree_json or "[]")))
+                    if max_items and len(results) >= max_items:
+                        break
+        return results
+
+
+if __name__ == "__main__":
+    # 사용법: python notion_mirror.py [--full] <데이터베이스 이름 또는 ID> ...
+    from notion_client import NotionMCPClient
+
+    args = sys.argv[1:]
+    full = True if "--full" in args else None
+    names = [arg for arg in args if arg != "--full"]
+    if not names:
+        print("사용법: python notion_mirror.py [--full] <데이터베이스 이름 또는 ID> ...")
+        sys.exit(1)
+
+    client = NotionMCPClient()
+    mirror = NotionMirror(client)
+    for name in names:
+        database_id = client.find_database_by_name(name) or name
+        count = mirror.sync(database_id, full=full)
+        print(f"{name}: {count}개 페이지 동기화됨 ({mirror.path})")
@@ -1,31 +1,143 @@
 import os
+import re
+from functools import lru_cache
 from openai import AzureOpenAI
 from dotenv import load_dotenv
-import re
-import json
+import json_codec
+from llm_cache import LLMCache, CACHE_ENABLED, make_key
+from token_counter import TokenUsage, count_tokens, count_messages_tokens
+from llm_policy import LLMCallPolicy
+from mcp_logging import get_logger
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-class OpenAIMCPClient:
-    def __init__(self, api_key=None):
-        """Azure OpenAI API 클라이언트를 초기화합니다."""
-        # API 키를 인자로 받거나 환경 변수에서 가져옴
-        self.api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("Azure OpenAI API 키가 필요합니다.")
-        
-        # Azure OpenAI 클라이언트 설정
-        self.client = AzureOpenAI(
-            api_key=self.api_key,
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
-    
-    def analyze_intent(self, user_input):
-        """사용자 입력의 의도를 분석합니다."""
-        try:
-            system_prompt = """당신은 사용자의 입력을 분석하여 적절한 작업을 결정하는 전문가입니다.
+logger = get_logger("openai")
+
+# 의도 분석과 명령 파싱을 도구 호출 한 번으로 처리할지 여부 (0이면 기존 2단계 호출 사용)
+DEFAULT_TOOL_CALLING = os.getenv("OPENAI_TOOL_CALLING", "1") not in ("0", "false", "False")
+
+# 2단계 분석의 명령 파싱 temperature. 기본값 0.7은 LLM_CACHE_MAX_TEMPERATURE(0.5)보다 높아 캐시하지 않으며,
+# 그 이하로 낮추면 반복되는 명령의 파싱 결과를 응답 캐시에서 처리
+COMMAND_TEMPERATURE = float(os.getenv("OPENAI_COMMAND_TEMPERATURE", "0.7"))
+
+# LLM 백엔드: azure(기본값) 또는 fake(오프라인 가짜 백엔드, fake_openai.py)
+LLM_BACKEND = os.getenv("OPENAI_BACKEND", "azure")
+
+_CONTENT_TYPE = {"type": "string", "enum": ["text", "todo", "bullet"], "description": "내용 형식, 기본값 text"}
+
+# 컨트롤러 작업별 도구 정의 (이름 -> (설명, 매개변수 JSON 스키마))
+NOTION_ACTIONS = {
+    "get_databases": ("사용자의 노션 데이터베이스 목록 조회", {
+        "type": "object", "properties": {}
+    }),
+    "query_database": ("특정 데이터베이스의 항목 조회 (조건 검색 포함)", {
+        "type": "object",
+        "properties": {
+            "database_id": {"type": "string", "description": "데이터베이스 이름 (ID 대신 이름 사용)"},
+            "filter": {
+                "type": "object",
+                "description": "선택 사항. {\"property\": 속성 이름, \"equals\" 또는 \"contains\": 검색어}",
+                "properties": {
+                    "property": {"type": "string"},
+                    "equals": {"type": "string"},
+                    "contains": {"type": "string"}
+                }
+            },
+            "limit": {"type": "integer", "description": "최대 항목 수"}
+        },
+        "required": ["database_id"]
+    }),
+    "search_pages": ("데이터베이스를 특정하지 않고 페이지 제목과 본문에서 키워드 검색", {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string"},
+            "limit": {"type": "integer"}
+        },
+        "required": ["query"]
+    }),
+    "create_page": ("데이터베이스에 항목(페이지) 하나 추가", {
+        "type": "object",
+        "properties": {
+            "parent_id": {"type": "string", "description": "데이터베이스 이름 (ID 대신 이름 사용), 없으면 첫 번째 데이터베이스"},
+            "title": {"type": "string"},
+            "properties": {"type": "object", "description": "속성 이름 -> 값"},
+            "content_prompt": {"type": "string", "description": "페이지 내용 생성을 위한 프롬프트"},
+            "content_type": _CONTENT_TYPE
+        },
+        "required": ["title"]
+    }),
+    "create_pages_bulk": ("데이터베이스에 두 개 이상의 항목을 한 번에 추가", {
+        "type": "object",
+        "properties": {
+            "database_id": {"type": "string", "description": "데이터베이스 이름 (ID 대신 이름 사용)"},
+            "rows": {"type": "array", "items": {"type": "object"}, "description": "항목마다 속성 이름 -> 단순 값"}
+        },
+        "required": ["database_id", "rows"]
+    }),
+    "create_page_in_workspace": ("데이터베이스 없이 워크스페이스에 새 페이지 생성", {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "content_prompt": {"type": "string", "description": "페이지 내용 생성을 위한 프롬프트"},
+            "content_type": _CONTENT_TYPE,
+            "icon": {"type": "string", "description": "이모지 또는 이미지 URL"}
+        },
+        "required": ["title"]
+    }),
+    "create_database": ("새 데이터베이스 생성", {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "parent_page_id": {"type": "string", "description": "선택 사항, 없으면 자동으로 생성"}
+        },
+        "required": ["title"]
+    }),
+    "update_page": ("기존 페이지의 속성 수정", {
+        "type": "object",
+        "properties": {
+            "page_id": {"type": "string"},
+            "properties": {"type": "object"}
+        },
+        "required": ["page_id", "properties"]
+    }),
+    "generate_content": ("노션에 넣을 콘텐츠를 AI로 생성만 함 (저장하지 않음)", {
+        "type": "object",
+        "properties": {
+            "prompt": {"type": "string"},
+            "content_type": _CONTENT_TYPE
+        },
+        "required": ["prompt"]
+    })
+}
+
+NOTION_TOOLS = [
+    {"type": "function", "function": {"name": name, "description": description, "parameters": schema}}
+    for name, (description, schema) in NOTION_ACTIONS.items()
+]
+
+_JSON_TYPES = {"string": str, "integer": int, "object": dict, "array": list}
+
+
+def validate_action_arguments(action, arguments):
+    """도구 호출 인자를 작업 스키마로 검사합니다. 문제가 있으면 오류 메시지, 없으면 None."""
+    if action not in NOTION_ACTIONS:
+        return f"알 수 없는 작업: {action}"
+    if not isinstance(arguments, dict):
+        return "인자가 객체가 아닙니다."
+    schema = NOTION_ACTIONS[action][1]
+    for name in schema.get("required", []):
+        if arguments.get(name) in (None, "", [], {}):
+            return f"필수 인자 누락: {name}"
+    for name, value in arguments.items():
+        expected = _JSON_TYPES.get(schema["properties"].get(name, {}).get("type"))
+        if expected and value is not None and not isinstance(value, expected):
+            return f"인자 형식 오류: {name}"
+    return None
+
+
+# 의도 분석 (notion_command / general_chat) 시스템 프롬프트
+INTENT_SYSTEM_PROMPT = """당신은 사용자의 입력을 분석하여 적절한 작업을 결정하는 전문가입니다.
 다음 중 하나의 의도를 결정해야 합니다:
 
 1. notion_command: Notion 관련 작업 (데이터베이스 생성, 페이지 추가 등)
@@ -49,102 +161,16 @@ Notion 관련 키워드:
 
 중요: 반드시 위의 JSON 형식으로만 응답하고, 다른 텍스트나 설명은 추가하지 마세요."""
 
-            response = self.client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
-                ],
-                temperature=0.3
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            # JSON 형식 검증
-            try:
-                # 응답 내용에서 JSON 부분만 추출 (가끔 모델이 다른 텍스트를 추가할 수 있음)
-                json_pattern = r'(\{.*\})'
-                json_match = re.search(json_pattern, result, re.DOTALL)
-                
-                if json_match:
-                    json_str = json_match.group(1)
-                    # 유효성 검사
-                    json.loads(json_str)
-                    return json_str
-                else:
-                    # JSON 아니면 기본값 반환
-                    return '{"intent": "general_chat", "explanation": "의도 분석 실패, 일반 대화로 처리"}'
-            except:
-                # JSON 파싱 오류 시 기본값 반환
-                return '{"intent": "general_chat", "explanation": "의도 분석 실패, 일반 대화로 처리"}'
-                
-        except Exception as e:
-            print(f"의도 분석 오류: {str(e)}")
-            return '{"intent": "general_chat", "explanation": "오류 발생"}'
-            
-    def chat(self, user_input, conversation_history=None):
-        """일반적인 대화를 처리합니다."""
-        try:
-            messages = [
-                {"role": "system", "content": "당신은 친절하고 지식이 풍부한 AI 어시스턴트입니다. 사용자의 질문에 명확하고 도움이 되는 답변을 제공합니다."}
-            ]
-            
-            # 대화 기록이 있으면 추가
-            if conversation_history:
-                messages.extend(conversation_history)
-            
-            # 현재 사용자 입력 추가
-            messages.append({"role": "user", "content": user_input})
-            
-            response = self.client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-                messages=messages,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"대화 처리 오류: {str(e)}"
-    
-    def generate_text(self, prompt, model=None, max_tokens=1000, temperature=0.7, system_prompt=None):
-        """텍스트 생성 함수"""
-        try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            else:
-                messages.append({"role": "system", "content": "You are a helpful assistant."})
-                
-            messages.append({"role": "user", "content": prompt})
-            
-            response = self.client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"텍스트 생성 오류: {str(e)}"
-    
-    def generate_notion_content(self, prompt, content_type="text"):
-        """노션에 적합한 콘텐츠를 생성합니다."""
-        instruction = ""
-        if content_type == "text":
-            instruction = "노션 페이지에 들어갈 텍스트 콘텐츠를 생성해주세요."
-        elif content_type == "todo":
-            instruction = "노션 To-Do 목록을 생성해주세요. 각 항목은 새로운 줄에 '- [ ] ' 형식으로 작성해주세요."
-        elif content_type == "table":
-            instruction = "노션 테이블 형식의 데이터를 생성해주세요. 마크다운 테이블 형식으로 작성해주세요."
-        elif content_type == "bullet":
-            instruction = "노션 글머리 기호 목록을 생성해주세요. 각 항목은 새로운 줄에 '- ' 형식으로 작성해주세요."
-        
-        full_prompt = f"{instruction}\n\n{prompt}"
-        return self.generate_text(full_prompt)
-    
-    def parse_notion_command(self, command):
-        """사용자 명령을 분석하여 노션 작업으로 변환합니다."""
-        try:
-            system_prompt = """당신은 사용자 명령을 노션 API 작업으로 변환하는 전문가입니다.
+# 도구 호출 라우팅 시스템 프롬프트
+ROUTE_SYSTEM_PROMPT = """당신은 노션 작업 도우미입니다.
+사용자의 요청이 노션 작업이면 알맞은 도구를 하나 호출하고, 그렇지 않으면 도구 없이 친절하고 명확하게 직접 답변하세요.
+데이터베이스나 페이지는 ID 대신 사용자가 말한 이름으로 지정하세요 (예: "KT 데이터베이스" -> "KT").
+데이터베이스 내용을 보려는 요청은 query_database, 데이터베이스 없이 페이지를 만들려는 요청은 create_page_in_workspace,
+데이터베이스에 항목 하나를 추가하면 create_page, 여러 개를 추가하면 create_pages_bulk를 사용하세요."""
+
+# 노션 명령 파싱 (JSON 응답) 시스템 프롬프트의 정적 앞부분.
+# 모든 요청에서 바이트 단위로 같아야 공급자 측 프롬프트 캐시가 적용되므로 요청마다 달라지는 내용은 넣지 않음
+COMMAND_PROMPT_PREFIX = """당신은 사용자 명령을 노션 API 작업으로 변환하는 전문가입니다.
 사용자의 자연어 명령을 분석하여 적절한 노션 API 작업과 필요한 매개변수를 JSON 형식으로 제공해야 합니다.
 
 가능한 작업 유형:
@@ -155,12 +181,34 @@ Notion 관련 키워드:
 5. create_database: 새 데이터베이스 생성
 6. update_page: 기존 페이지 업데이트
 7. generate_content: AI로 콘텐츠 생성
+8. search_pages: 페이지 제목과 본문에서 키워드로 검색 (데이터베이스를 특정하지 않을 때)
+9. create_pages_bulk: 데이터베이스에 여러 항목(페이지)을 한 번에 생성
 
 중요: 데이터베이스나 페이지를 식별할 때는 ID 대신 이름을 사용하세요.
 예를 들어, "KT 데이터베이스 ID" 대신 단순히 "KT"라고 지정하세요.
 시스템이 이름으로 실제 ID를 찾을 수 있습니다.
 
-데이터베이스 생성 시 필요한 매개변수 예시:
+사용자가 "xx 데이터베이스 만들어줘"와 같이 요청하면 반드시 create_database 작업을 사용하세요.
+사용자가 그냥 페이지를 생성하려는 의도면 create_page_in_workspace 작업을 사용하세요.
+데이터베이스에 항목을 추가하려는 의도면 create_page 작업을 사용하세요.
+두 개 이상의 항목을 한 번에 추가하려는 의도면 create_pages_bulk 작업을 사용하세요.
+사용자가 데이터베이스 내용이나 항목을 보고 싶어하면 반드시 query_database 작업을 사용하세요.
+특정 데이터베이스 없이 어떤 내용이 담긴 페이지를 찾으려는 의도면 search_pages 작업을 사용하세요.
+
+JSON 응답 형식은 다음과 같아야 합니다:
+{
+  "action": "작업유형",
+  "parameters": {
+    // 작업에 필요한 매개변수들
+  },
+  "description": "작업에 대한 간단한 설명"
+}
+
+중요: 반드시 유효한 JSON 형식으로만 응답하고, JSON 외에 다른 텍스트나 설명은 추가하지 마세요."""
+
+# 작업별 매개변수 예시 (명령과 관련된 작업의 예시만 정적 앞부분 뒤에 이 순서대로 덧붙임)
+COMMAND_ACTION_EXAMPLES = {
+    "create_database": """데이터베이스 생성 시 필요한 매개변수 예시:
 {
   "action": "create_database",
   "parameters": {
@@ -168,9 +216,8 @@ Notion 관련 키워드:
     "parent_page_id": "부모_페이지_ID" // 선택 사항, 없으면 자동으로 생성됨
   },
   "description": "새 데이터베이스 생성"
-}
-
-워크스페이스에 페이지 생성 시 필요한 매개변수 예시:
+}""",
+    "create_page_in_workspace": """워크스페이스에 페이지 생성 시 필요한 매개변수 예시:
 {
   "action": "create_page_in_workspace",
   "parameters": {
@@ -180,9 +227,8 @@ Notion 관련 키워드:
     "icon": "🚀" // 선택 사항, 이모지 또는 이미지 URL
   },
   "description": "워크스페이스에 새 페이지 생성"
-}
-
-데이터베이스 내 페이지 생성 시 필요한 매개변수 예시:
+}""",
+    "create_page": """데이터베이스 내 페이지 생성 시 필요한 매개변수 예시:
 {
   "action": "create_page",
   "parameters": {
@@ -198,9 +244,8 @@ Notion 관련 키워드:
     "content_type": "text" // text, todo, bullet 중 하나, 기본값은 text
   },
   "description": "데이터베이스에 새 페이지 생성"
-}
-
-데이터베이스 쿼리 시 필요한 매개변수 예시:
+}""",
+    "query_database": """데이터베이스 쿼리 시 필요한 매개변수 예시:
 {
   "action": "query_database",
   "parameters": {
@@ -212,70 +257,442 @@ Notion 관련 키워드:
     }
   },
   "description": "데이터베이스 내 항목 조회"
-}
-
-사용자가 "xx 데이터베이스 만들어줘"와 같이 요청하면 반드시 create_database 작업을 사용하세요.
-사용자가 그냥 페이지를 생성하려는 의도면 create_page_in_workspace 작업을 사용하세요.
-데이터베이스에 항목을 추가하려는 의도면 create_page 작업을 사용하세요.
-사용자가 데이터베이스 내용이나 항목을 보고 싶어하면 반드시 query_database 작업을 사용하세요.
-
-JSON 응답 형식은 다음과 같아야 합니다:
+}""",
+    "create_pages_bulk": """데이터베이스에 여러 항목을 한 번에 추가할 때 필요한 매개변수 예시:
 {
-  "action": "작업유형",
+  "action": "create_pages_bulk",
   "parameters": {
-    // 작업에 필요한 매개변수들
+    "database_id": "데이터베이스 이름", // 데이터베이스의 정확한 ID 대신 이름을 사용
+    "rows": [ // 항목마다 속성 이름 -> 값 (값은 문자열, 숫자, 목록 등 단순 값으로 작성)
+      {"Name": "첫 번째 항목", "Status": "진행 중"},
+      {"Name": "두 번째 항목", "Status": "완료", "Tags": ["긴급", "백엔드"]}
+    ]
   },
-  "description": "작업에 대한 간단한 설명"
+  "description": "데이터베이스에 여러 항목 일괄 생성"
+}""",
+    "search_pages": """페이지 검색 시 필요한 매개변수 예시:
+{
+  "action": "search_pages",
+  "parameters": {
+    "query": "검색어",
+    "limit": 10 // 선택 사항, 최대 결과 수
+  },
+  "description": "페이지 전문 검색"
+}""",
+    "update_page": """페이지 수정 시 필요한 매개변수 예시:
+{
+  "action": "update_page",
+  "parameters": {
+    "page_id": "페이지 ID",
+    "properties": {"Status": {"select": {"name": "완료"}}}
+  },
+  "description": "페이지 속성 수정"
+}""",
+    "generate_content": """콘텐츠 생성 시 필요한 매개변수 예시:
+{
+  "action": "generate_content",
+  "parameters": {
+    "prompt": "생성할 내용 설명",
+    "content_type": "text" // text, todo, bullet 중 하나, 기본값은 text
+  },
+  "description": "노션 콘텐츠 생성"
+}"""
 }
 
-중요: 반드시 유효한 JSON 형식으로만 응답하고, JSON 외에 다른 텍스트나 설명은 추가하지 마세요."""
+# 명령에 쓰인 동사로 예시가 필요한 작업을 고름 (어느 것에도 해당하지 않으면 모든 예시 포함)
+_COMMAND_ACTION_GROUPS = (
+    (re.compile(r"추가|생성|만들|작성|등록|넣어|저장"),
+     ("create_database", "create_page_in_workspace", "create_page", "create_pages_bulk")),
+    (re.compile(r"조회|보여|찾아|검색|목록|리스트|알려"), ("query_database", "search_pages")),
+    (re.compile(r"수정|업데이트|변경|바꿔"), ("update_page",)),
+    (re.compile(r"초안|아이디어|써\s*줘|생성해\s*줘|만들어\s*줘"), ("generate_content",))
+)
+
+
+def select_command_actions(command):
+    """명령과 관련된 작업 이름을 COMMAND_ACTION_EXAMPLES 순서의 튜플로 반환합니다."""
+    selected = set()
+    for pattern, actions in _COMMAND_ACTION_GROUPS:
+        if pattern.search(command or ""):
+            selected.update(actions)
+    if not selected:
+        return tuple(COMMAND_ACTION_EXAMPLES)
+    return tuple(action for action in COMMAND_ACTION_EXAMPLES if action in selected)
+
+
+@lru_cache(maxsize=None)
+def command_system_prompt(actions=None):
+    """정적 앞부분 뒤에 주어진 작업의 예시만 붙인 명령 파싱 시스템 프롬프트를 반환합니다 (None이면 모든 예시)."""
+    actions = tuple(COMMAND_ACTION_EXAMPLES) if actions is None else actions
+    examples = [COMMAND_ACTION_EXAMPLES[action] for action in COMMAND_ACTION_EXAMPLES if action in actions]
+    if not examples:
+        return COMMAND_PROMPT_PREFIX
+    return COMMAND_PROMPT_PREFIX + "\n\n" + "\n\n".join(examples)
+
+
+# 모든 작업 예시를 포함한 전체 프롬프트 (토큰 절감량 계산의 기준)
+COMMAND_SYSTEM_PROMPT = command_system_prompt()
+
+CHAT_SYSTEM_PROMPT = "당신은 친절하고 지식이 풍부한 AI 어시스턴트입니다. 사용자의 질문에 명확하고 도움이 되는 답변을 제공합니다."
+
+# 대화 기록 요약 시스템 프롬프트
+SUMMARY_SYSTEM_PROMPT = """당신은 대화 내용을 요약하는 전문가입니다.
+이전 요약과 새로 추가된 대화를 합쳐 하나의 간결한 요약으로 만들어주세요.
+사용자의 목표, 언급된 노션 데이터베이스/페이지 이름, 결정된 사항과 선호를 우선해서 남기고 인사말 같은 내용은 생략하세요.
+요약문만 응답하고 다른 설명은 추가하지 마세요."""
+
+# 콘텐츠 형식별 생성 지시문
+CONTENT_INSTRUCTIONS = {
+    "text": "노션 페이지에 들어갈 텍스트 콘텐츠를 생성해주세요.",
+    "todo": "노션 To-Do 목록을 생성해주세요. 각 항목은 새로운 줄에 '- [ ] ' 형식으로 작성해주세요.",
+    "table": "노션 테이블 형식의 데이터를 생성해주세요. 마크다운 테이블 형식으로 작성해주세요.",
+    "bullet": "노션 글머리 기호 목록을 생성해주세요. 각 항목은 새로운 줄에 '- ' 형식으로 작성해주세요."
+}
+
+
+@lru_cache(maxsize=64)
+def _prompt_tokens(prompt, deployment):
+    """고정 프롬프트의 토큰 수 (프롬프트 조합이 몇 가지뿐이므로 캐시)."""
+    return count_tokens(prompt, deployment)
+
+
+def build_command_prompt(command):
+    """명령에 맞는 명령 파싱 시스템 프롬프트와 전체 프롬프트 대비 아낀 토큰 수를 반환합니다."""
+    system_prompt = command_system_prompt(select_command_actions(command))
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    return system_prompt, _prompt_tokens(COMMAND_SYSTEM_PROMPT, deployment) - _prompt_tokens(system_prompt, deployment)
+
+
+def record_usage(token_usage, label, usage, saved_tokens=0):
+    """응답의 usage(프롬프트 캐시 적중 토큰 포함)를 토큰 사용량에 기록합니다."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    token_usage.record(
+        label,
+        usage.prompt_tokens,
+        usage.completion_tokens,
+        getattr(details, "cached_tokens", 0) or 0,
+        saved_tokens
+    )
+
+
+def record_stream_usage(token_usage, label, deployment, messages, content, saved_tokens=0):
+    """스트리밍 응답에는 사용량이 없으므로 프롬프트와 응답 토큰 수 추정치를 기록합니다."""
+    token_usage.record(
+        label,
+        count_messages_tokens(messages, deployment),
+        count_tokens(content, deployment),
+        saved_tokens=saved_tokens
+    )
+
+
+def cache_key(cache, kind, deployment, messages, temperature, **options):
+    """응답 캐시 키를 반환합니다. 캐시가 없거나 캐시 대상 호출이 아니면 None."""
+    if cache is None or not kind or not cache.is_cacheable(kind, temperature):
+        return None
+    return make_key(deployment, messages, temperature, **options)
+
+
+def completion_result(response):
+    """채팅 완성 응답을 {"content", "tool_calls": [{"name", "arguments"}]} 딕셔너리로 변환합니다."""
+    message = response.choices[0].message
+    return {
+        "content": message.content,
+        "tool_calls": [
+            {"name": call.function.name, "arguments": call.function.arguments}
+            for call in message.tool_calls or []
+        ]
+    }
+
+
+def content_prompt(prompt, content_type="text"):
+    """콘텐츠 형식 지시문을 붙인 생성 프롬프트를 만듭니다."""
+    return f"{CONTENT_INSTRUCTIONS.get(content_type, '')}\n\n{prompt}"
+
+
+def default_command_action(command, description="JSON 파싱 실패로 기본 작업 수행"):
+    """명령을 파싱하지 못했을 때 사용할 기본 작업 (워크스페이스에 페이지 생성)."""
+    return {
+        "action": "create_page_in_workspace",
+        "parameters": {
+            "title": "새 페이지",
+            "content_prompt": command
+        },
+        "description": description
+    }
+
+
+def parse_intent_response(text):
+    """의도 분석 응답에서 JSON 부분만 추출해 한 번만 파싱합니다 (가끔 모델이 다른 텍스트를 추가할 수 있음)."""
+    intent_data = json_codec.extract_object((text or "").strip())
+    if intent_data is None or "intent" not in intent_data:
+        # JSON이 아니면 기본값 반환
+        return {"intent": "general_chat", "explanation": "의도 분석 실패, 일반 대화로 처리"}
+    return intent_data
+
+
+def parse_route_message(message):
+    """도구 호출 라우팅 응답을 작업 딕셔너리로 변환합니다. 인자가 올바르지 않으면 None."""
+    if not message["tool_calls"]:
+        return {"action": "general_chat", "response": message["content"] or ""}
+    
+    call = message["tool_calls"][0]
+    try:
+        arguments = json_codec.loads(call["arguments"] or "{}")
+    except json_codec.JSONDecodeError:
+        arguments = None
+    error = validate_action_arguments(call["name"], arguments)
+    if error:
+        logger.warning("도구 호출 인자 검증 실패 (%s): %s", call["name"], error)
+        return None
+    return {"action": call["name"], "parameters": arguments}
+
+
+class OpenAIMCPClient:
+    def __init__(self, api_key=None):
+        """Azure OpenAI API 클라이언트를 초기화합니다."""
+        # API 키를 인자로 받거나 환경 변수에서 가져옴
+        self.api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
+        self.tool_calling = DEFAULT_TOOL_CALLING
+        
+        if LLM_BACKEND == "fake":
+            # 오프라인 벤치마크/테스트용 가짜 백엔드 (API 키와 네트워크 불필요)
+            from fake_openai import FakeAzureOpenAI
+            self.client = FakeAzureOpenAI()
+            logger.info("가짜 LLM 백엔드 사용 (OPENAI_BACKEND=fake)")
+        else:
+            if not self.api_key:
+                raise ValueError("Azure OpenAI API 키가 필요합니다.")
             
-            prompt = f"다음 사용자 명령을 노션 작업으로 변환해주세요: {command}"
+            # Azure OpenAI 클라이언트 설정
+            self.client = AzureOpenAI(
+                api_key=self.api_key,
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                # 재시도와 타임아웃은 호출 정책(self.policy)에서 호출 종류별로 처리
+                max_retries=0
+            )
+        # 호출 종류별 마감 시간, 지터 백오프 재시도, 지연에 민감한 호출의 헤지 요청
+        self.policy = LLMCallPolicy()
+        
+        # 낮은 temperature 호출의 응답 캐시 (메모리 LRU + 선택적 디스크)
+        self.cache = LLMCache() if CACHE_ENABLED else None
+        # 호출 종류별 토큰 사용량 (프롬프트 캐시 적중, 프롬프트 축소로 아낀 토큰 포함)
+        self.token_usage = TokenUsage()
+    
+    def _complete(self, kind, messages, temperature, cache_if=None, on_token=None, label=None, saved_tokens=0, **options):
+        """채팅 완성을 요청하고 {"content", "tool_calls": [{"name", "arguments"}]}를 반환합니다.
+        
+        kind가 캐시 대상이고 temperature가 충분히 낮으면 응답 캐시를 사용합니다.
+        cache_if가 주어지면 그 결과가 참인 응답만 저장합니다. API 오류는 그대로 발생시킵니다.
+        on_token이 주어지면 스트리밍으로 요청하고 텍스트 조각이 도착할 때마다 호출합니다
+        (도구 호출 없이 텍스트만 받는 요청에서 사용).
+        토큰 사용량과 호출 정책(마감 시간, 재시도, 헤지)은 label(기본값은 kind)별로 적용하며,
+        saved_tokens는 프롬프트 축소로 아낀 토큰 수입니다.
+        """
+        label = label or kind or "chat"
+        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        key = cache_key(self.cache, kind, deployment, messages, temperature, **options)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.debug("LLM 캐시 적중 (%s)", kind)
+                if on_token and cached["content"]:
+                    on_token(cached["content"])
+                return cached
+        
+        if on_token is not None:
+            emitted = []
             
-            response = self.generate_text(prompt, system_prompt=system_prompt)
+            def on_piece(text):
+                emitted.append(text)
+                on_token(text)
             
-            # JSON 형식 검증
-            try:
-                # 응답 내용에서 JSON 부분만 추출 (가끔 모델이 다른 텍스트를 추가할 수 있음)
-                json_pattern = r'(\{.*\})'
-                json_match = re.search(json_pattern, response, re.DOTALL)
+            # 이미 전달한 텍스트가 있으면 중복되지 않도록 재시도하지 않고, 헤지 요청도 보내지 않음
+            content = self.policy.call(
+                label,
+                lambda timeout: self._stream_content(deployment, messages, temperature, on_piece, timeout=timeout, **options),
+                hedge=False,
+                retry_if=lambda: not emitted
+            )
+            result = {"content": content, "tool_calls": []}
+            record_stream_usage(self.token_usage, label, deployment, messages, content, saved_tokens)
+            if key is not None and (cache_if is None or cache_if(result)):
+                self.cache.set(kind, key, result)
+            return result
+        
+        response = self.policy.call(
+            label,
+            lambda timeout: self.client.chat.completions.create(
+                model=deployment,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+                **options
+            )
+        )
+        record_usage(self.token_usage, label, response.usage, saved_tokens)
+        result = completion_result(response)
+        if key is not None and (cache_if is None or cache_if(result)):
+            self.cache.set(kind, key, result)
+        return result
+    
+    def _stream_content(self, deployment, messages, temperature, on_token, **options):
+        """스트리밍으로 채팅 완성을 받아 조각마다 on_token을 호출하고 전체 텍스트를 반환합니다."""
+        stream = self.client.chat.completions.create(
+            model=deployment,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            **options
+        )
+        pieces = []
+        for chunk in stream:
+            # Azure는 콘텐츠 필터 결과만 담긴(choices가 빈) 조각을 보내기도 함
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                pieces.append(text)
+                on_token(text)
+        return "".join(pieces)
+    
+    def analyze_intent(self, user_input):
+        """사용자 입력의 의도를 분석합니다.
+        
+        {"intent": ..., "explanation": ...} 딕셔너리를 반환합니다.
+        """
+        try:
+            response = self._complete(
+                "intent",
+                [
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_input}
+                ],
+                0.3
+            )
+            return parse_intent_response(response["content"])
+        except Exception as e:
+            logger.error("의도 분석 오류: %s", e)
+            return {"intent": "general_chat", "explanation": "오류 발생"}
+            
+    def route_command(self, user_input, conversation_history=None):
+        """의도 분석과 명령 파싱을 도구 호출 한 번으로 처리합니다.
+        
+        노션 작업이면 {"action": 작업, "parameters": {...}}를, 일반 대화면
+        {"action": "general_chat", "response": 답변}을 반환합니다.
+        도구 호출을 사용할 수 없거나 인자가 올바르지 않으면 None을 반환하므로
+        호출자는 analyze_intent/parse_notion_command로 대체해야 합니다.
+        """
+        messages = [{"role": "system", "content": ROUTE_SYSTEM_PROMPT}]
+        if conversation_history:
+            messages.extend(conversation_history)
+        messages.append({"role": "user", "content": user_input})
+        
+        try:
+            # 일반 대화 답변은 시점에 따라 달라질 수 있으므로 도구 호출 결과만 캐시
+            message = self._complete(
+                "route",
+                messages,
+                0.3,
+                cache_if=lambda result: bool(result["tool_calls"]),
+                tools=NOTION_TOOLS,
+                tool_choice="auto"
+            )
+        except Exception as e:
+            logger.warning("도구 호출 라우팅 실패, 2단계 분석으로 대체: %s", e)
+            return None
+        
+        return parse_route_message(message)
+    
+    def chat(self, user_input, conversation_history=None, on_token=None):
+        """일반적인 대화를 처리합니다. on_token이 주어지면 답변을 스트리밍으로 전달합니다."""
+        try:
+            messages = [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT}
+            ]
+            
+            # 대화 기록이 있으면 추가
+            if conversation_history:
+                messages.extend(conversation_history)
+            
+            # 현재 사용자 입력 추가
+            messages.append({"role": "user", "content": user_input})
+            
+            response = self._complete(None, messages, 0.7, on_token=on_token)
+            return response["content"]
+        except Exception as e:
+            return f"대화 처리 오류: {str(e)}"
+    
+    def summarize_conversation(self, previous_summary, messages, max_tokens=300):
+        """이전 요약에 밀려난 대화 메시지를 접어 넣은 새 요약을 반환합니다.
+        
+        ConversationWindow의 summarizer로 사용되며, 오류는 호출자가 처리하도록 그대로 발생시킵니다.
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = f"이전 요약:\n{previous_summary or '(없음)'}\n\n새 대화:\n{transcript}"
+        response = self._complete(
+            None,
+            [
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            0.3,
+            label="summary",
+            max_tokens=max_tokens
+        )
+        return response["content"]
+    
+    def generate_text(self, prompt, model=None, max_tokens=1000, temperature=0.7, system_prompt=None, cache_kind="text", on_token=None):
+        """텍스트 생성 함수
+        
+        temperature가 LLM_CACHE_MAX_TEMPERATURE 이하이면 cache_kind의 TTL로 응답을 캐시합니다.
+        on_token이 주어지면 생성되는 텍스트를 조각 단위로 전달합니다.
+        """
+        try:
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            else:
+                messages.append({"role": "system", "content": "You are a helpful assistant."})
                 
-                if json_match:
-                    json_str = json_match.group(1)
-                    # 유효성 검사
-                    json.loads(json_str)
-                    return json_str
-                else:
-                    # JSON 형식이 아니면 기본 응답 제공
-                    default_response = {
-                        "action": "create_page_in_workspace",
-                        "parameters": {
-                            "title": "새 페이지",
-                            "content_prompt": command
-                        },
-                        "description": "JSON 파싱 실패로 기본 작업 수행"
-                    }
-                    return json.dumps(default_response, ensure_ascii=False)
-            except:
-                # JSON 파싱 오류 시 기본값 반환
-                default_response = {
-                    "action": "create_page_in_workspace",
-                    "parameters": {
-                        "title": "새 페이지",
-                        "content_prompt": command
-                    },
-                    "description": "JSON 파싱 실패로 기본 작업 수행"
-                }
-                return json.dumps(default_response, ensure_ascii=False)
+            messages.append({"role": "user", "content": prompt})
+            
+            response = self._complete(cache_kind, messages, temperature, on_token=on_token, max_tokens=max_tokens)
+            return response["content"]
+        except Exception as e:
+            return f"텍스트 생성 오류: {str(e)}"
+    
+    def generate_notion_content(self, prompt, content_type="text", on_token=None):
+        """노션에 적합한 콘텐츠를 생성합니다. on_token이 주어지면 생성 중인 텍스트를 스트리밍합니다."""
+        return self.generate_text(content_prompt(prompt, content_type), on_token=on_token)
+    
+    def parse_notion_command(self, command):
+        """사용자 명령을 분석하여 노션 작업으로 변환합니다.
+        
+        {"action": ..., "parameters": {...}, "description": ...} 딕셔너리를 반환합니다.
+        """
+        try:
+            # 정적 앞부분 + 명령과 관련된 작업 예시만 보내고, 명령은 사용자 메시지에만 넣음
+            system_prompt, saved_tokens = build_command_prompt(command)
+            
+            # temperature가 캐시 기준 이하일 때만 반복 명령을 캐시에서 처리 (COMMAND_TEMPERATURE 참고)
+            response = self._complete(
+                "command",
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"다음 사용자 명령을 노션 작업으로 변환해주세요: {command}"}
+                ],
+                COMMAND_TEMPERATURE,
+                saved_tokens=saved_tokens,
+                max_tokens=1000
+            )["content"]
+            
+            # 응답 내용에서 JSON 부분만 추출해 한 번만 파싱 (가끔 모델이 다른 텍스트를 추가할 수 있음)
+            # JSON 형식이 아니면 기본 응답 제공
+            return json_codec.extract_object(response) or default_command_action(command)
         except Exception as e:
-            print(f"명령 파싱 오류: {str(e)}")
+            logger.error("명령 파싱 오류: %s", e)
             # 오류 발생 시 기본 응답 제공
-            default_response = {
-                "action": "create_page_in_workspace",
-                "parameters": {
-                    "title": "새 페이지",
-                    "content_prompt": command
-                },
-                "description": "오류로 인한 기본 작업 수행"
-            }
-            return json.dumps(default_response, ensure_ascii=False) 
\ No newline at end of file
+            return default_command_action(command, "오류로 인한 기본 작업 수행")
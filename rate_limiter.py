@@ -0,0 +1,121 @@
+import time
+import asyncio
+import random
+import threading
+
+
+class TokenBucket:
+    """스레드 안전한 토큰 버킷 레이트 리미터입니다.
+
+    acquire()는 토큰을 예약하고 필요한 만큼 대기합니다. 토큰이 음수가 될 수 있어
+    대기 중인 요청들이 도착 순서대로 일정한 간격으로 풀려납니다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        # rate: 초당 허용 요청 수, capacity: 순간적으로 허용하는 최대 버스트
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # 통계
+        self._waiting = 0
+        self._acquired = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._pauses = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def _reserve(self):
+        """토큰 하나를 예약하고 기다려야 할 시간(초)을 반환합니다."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait > 0:
+                self._waiting += 1
+        return wait
+
+    def _release(self, wait):
+        """대기가 끝난 예약을 통계에 반영합니다."""
+        with self._lock:
+            if wait > 0:
+                self._waiting -= 1
+                self._throttled += 1
+            self._acquired += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 대기하고, 대기한 시간(초)을 반환합니다."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self._release(wait)
+        return wait
+
+    def try_acquire(self):
+        """토큰이 있으면 하나를 가져가 True, 없으면 대기하지 않고 False를 반환합니다."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                self._throttled += 1
+                return False
+            self._tokens -= 1
+            self._acquired += 1
+            return True
+
+    async def acquire_async(self):
+        """acquire()의 asyncio 버전입니다. 이벤트 루프를 막지 않고 대기합니다."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._release(wait)
+        return wait
+
+    def pause(self, seconds):
+        """서버가 요청한 시간(Retry-After) 동안 모든 호출자를 멈춥니다."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # 토큰을 음수로 만들어 이후 acquire()가 최소 seconds 만큼 대기하게 함
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._pauses += 1
+
+    def stats(self):
+        """대기열 길이와 대기 시간 통계를 반환합니다."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "available_tokens": round(self._tokens, 3),
+                "queue_depth": self._waiting,
+                "acquired": self._acquired,
+                "throttled": self._throttled,
+                "pauses": self._pauses,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "avg_wait_seconds": round(self._total_wait / self._acquired, 3) if self._acquired else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3)
+            }
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """지수 백오프에 full jitter를 적용한 대기 시간을 반환합니다."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Retry-After 헤더 값을 초 단위로 변환합니다. 해석할 수 없으면 None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,249 @@
+import re
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter
+from mcp_logging import get_logger
+
+logger = get_logger("search_index")
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 제목 토큰 가중치 (제목에 나온 단어는 본문보다 중요하게 취급)
+TITLE_WEIGHT = 3
+
+# 한글/한자/가나는 n-gram으로, 영문/숫자는 단어 단위로 토큰화
+_TOKEN_PATTERN = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]+|[぀-ヿ一-鿿]+|[a-z0-9]+")
+_ASCII_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text, n=2):
+    """텍스트를 검색용 토큰 리스트로 변환합니다.
+
+    한국어는 띄어쓰기와 조사 때문에 단어 단위 매칭이 잘 안 되므로 글자 n-gram(기본 2-gram)을 사용합니다.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", text).casefold()
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        run = match.group(0)
+        if _ASCII_PATTERN.fullmatch(run) or len(run) <= n:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+
+def rich_text_plain(items):
+    """rich_text 배열에서 텍스트를 추출합니다 (응답의 plain_text 또는 요청의 text.content)."""
+    return ''.join(
+        item.get('plain_text') or item.get('text', {}).get('content', '')
+        for item in items or []
+    )
+
+
+def page_property_texts(page):
+    """페이지 객체에서 (제목, 속성 텍스트) 를 추출합니다."""
+    title = ""
+    texts = []
+    for prop_data in page.get('properties', {}).values():
+        prop_type = prop_data.get('type')
+        value = prop_data.get(prop_type)
+        if prop_type == 'title':
+            title = rich_text_plain(value)
+        elif prop_type == 'rich_text':
+            texts.append(rich_text_plain(value))
+        elif prop_type in ('select', 'status') and value:
+            texts.append(value.get('name', ''))
+        elif prop_type == 'multi_select':
+            texts.extend(item.get('name', '') for item in value or [])
+        elif prop_type in ('url', 'email', 'phone_number') and value:
+            texts.append(str(value))
+    return title, "\n".join(text for text in texts if text)
+
+
+def blocks_text(blocks):
+    """블록 리스트(요청/응답 형식)에서 텍스트를 줄 단위로 추출합니다."""
+    lines = []
+    for block in blocks or []:
+        block_type = block.get('type')
+        body = block.get(block_type) if block_type else None
+        if isinstance(body, dict):
+            text = rich_text_plain(body.get('rich_text'))
+            if text:
+                lines.append(text)
+            lines.extend(blocks_text(body.get('children')).splitlines())
+    return "\n".join(lines)
+
+
+class SearchIndex:
+    """페이지 제목, 속성 텍스트, 블록 텍스트에 대한 메모리 역색인입니다.
+
+    BM25로 순위를 매기며, 페이지 생성/블록 추가 시 증분으로 갱신됩니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}     # token -> {page_id: 가중 tf}
+        self._doc_terms = {}    # page_id -> Counter(token)
+        self._doc_length = {}   # page_id -> 토큰 수
+        self._docs = {}         # page_id -> 메타 정보 및 원문 (스니펫용)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, page_id):
+        return page_id in self._docs
+
+    def _remove_locked(self, page_id):
+        terms = self._doc_terms.pop(page_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(page_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= self._doc_length.pop(page_id, 0)
+        self._docs.pop(page_id, None)
+
+    def _add_locked(self, page_id, doc):
+        terms = Counter(tokenize(doc["body"]))
+        for token in tokenize(doc["title"]):
+            terms[token] += TITLE_WEIGHT
+        for token, count in terms.items():
+            self._postings.setdefault(token, {})[page_id] = count
+        length = sum(terms.values())
+        self._doc_terms[page_id] = terms
+        self._doc_length[page_id] = length
+        self._total_length += length
+        self._docs[page_id] = doc
+
+    def add_document(self, page_id, title="", body="", database_id=None, url=None, property_text=""):
+        """문서를 색인에 추가합니다. 이미 있으면 교체합니다.
+
+        property_text는 body 앞부분에 들어 있는 속성 텍스트로, update_page()가 속성만 교체할 때 사용합니다.
+        """
+        doc = {"id": page_id, "title": title or "", "body": body or "", "database_id": database_id, "url": url,
+               "property_text": property_text or ""}
+        with self._lock:
+            self._remove_locked(page_id)
+            self._add_locked(page_id, doc)
+
+    def add_page(self, page, block_text="", database_id=None):
+        """노션 페이지 객체(와 블록 텍스트)를 색인에 추가합니다."""
+        title, property_text = page_property_texts(page)
+        if database_id is None:
+            database_id = page.get('parent', {}).get('database_id')
+        body = "\n".join(text for text in (property_text, block_text) if text)
+        self.add_document(page['id'], title, body, database_id, page.get('url'), property_text)
+
+    def update_page(self, page):
+        """수정된 페이지 객체로 문서의 제목과 속성 텍스트를 교체합니다 (블록 텍스트는 유지).
+
+        색인에 없는 페이지면 아무것도 하지 않고 False를 반환합니다.
+        """
+        title, property_text = page_property_texts(page)
+        with self._lock:
+            doc = self._docs.get(page['id'])
+            if doc is None:
+                return False
+            old_property_text = doc.get("property_text", "")
+            body = doc["body"]
+            if old_property_text and body.startswith(old_property_text):
+                body = body[len(old_property_text):].lstrip("\n")
+            doc = dict(
+                doc,
+                title=title,
+                property_text=property_text,
+                body="\n".join(text for text in (property_text, body) if text),
+                url=page.get('url') or doc["url"]
+            )
+            self._remove_locked(page['id'])
+            self._add_locked(page['id'], doc)
+        return True
+
+    def append_text(self, page_id, text):
+        """기존 문서 본문에 텍스트를 덧붙입니다. 문서가 없으면 새로 만듭니다."""
+        if not text:
+            return
+        with self._lock:
+            doc = dict(self._docs.get(page_id) or {"id": page_id, "title": "", "body": "", "database_id": None, "url": None,
+                                                   "property_text": ""})
+            doc["body"] = f"{doc['body']}\n{text}" if doc["body"] else text
+            self._remove_locked(page_id)
+            self._add_locked(page_id, doc)
+
+    def remove(self, page_id):
+        """문서를 색인에서 제거합니다."""
+        with self._lock:
+            self._remove_locked(page_id)
+
+    def search(self, query, limit=10, database_id=None):
+        """BM25 점수 순으로 문서를 검색합니다.
+
+        [{"id", "title", "url", "database_id", "score", "snippet"}, ...] 를 반환합니다.
+        """
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+            scores = Counter()
+            for token in query_tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for page_id, tf in postings.items():
+                    length_norm = 1 - BM25_B + BM25_B * self._doc_length[page_id] / average_length
+                    scores[page_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+
+            if database_id:
+                candidates = ((page_id, score) for page_id, score in scores.items()
+                              if self._docs[page_id]["database_id"] == database_id)
+            else:
+                candidates = scores.items()
+            top = heapq.nlargest(limit, candidates, key=lambda item: item[1])
+            docs = [(self._docs[page_id], score) for page_id, score in top]
+
+        return [
+            {
+                "id": doc["id"],
+                "title": doc["title"],
+                "url": doc["url"],
+                "database_id": doc["database_id"],
+                "score": round(score, 4),
+                "snippet": self._snippet(doc, query)
+            }
+            for doc, score in docs
+        ]
+
+    def _snippet(self, doc, query, width=60):
+        """검색어가 처음 나오는 위치 주변의 본문을 잘라 반환합니다."""
+        body = doc["body"]
+        position = body.casefold().find(query.casefold().strip())
+        if position == -1:
+            return body[:width * 2].replace("\n", " ")
+        start = max(0, position - width)
+        snippet = body[start:position + len(query) + width].replace("\n", " ")
+        return ("..." if start > 0 else "") + snippet
+
+    def add_from_mirror(self, mirror):
+        """로컬 미러에 저장된 모든 페이지를 색인에 추가하고 추가한 문서 수를 반환합니다."""
+        count = 0
+        for page, block_text, database_id in mirror.iter_pages():
+            self.add_page(page, block_text, database_id)
+            count += 1
+        logger.info("미러에서 검색 색인 구축: %d개 페이지", count)
+        return count
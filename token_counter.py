@@ -0,0 +1,96 @@
+import os
+import re
+import threading
+from functools import lru_cache
+from mcp_logging import get_logger
+
+# tiktoken이 설치되어 있으면 정확히 세고, 없으면 글자 종류별 근사치를 사용
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = get_logger("tokens")
+
+# 배포 이름으로 인코딩을 알 수 없을 때 사용할 tiktoken 인코딩
+DEFAULT_ENCODING = os.getenv("LLM_TOKEN_ENCODING", "o200k_base")
+
+# 채팅 메시지 하나에 붙는 형식 토큰 수와 응답 시작 토큰 수 (OpenAI 채팅 형식 기준)
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+_ASCII_RUN = re.compile(r"[\x00-\x7f]+")
+
+
+@lru_cache(maxsize=None)
+def _encoding(deployment):
+    """배포(모델) 이름에 맞는 tiktoken 인코딩을 반환합니다. 사용할 수 없으면 None."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(deployment or "")
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # 인코딩 파일을 내려받을 수 없는 환경 등
+        logger.warning("tiktoken 인코딩을 불러오지 못해 근사치로 셉니다: %s", e)
+        return None
+
+
+def estimate_tokens(text):
+    """tiktoken 없이 토큰 수를 근사합니다 (영문 등 ASCII는 약 4글자당 1토큰, 한글 등은 글자당 1토큰)."""
+    if not text:
+        return 0
+    ascii_chars = sum(len(run) for run in _ASCII_RUN.findall(text))
+    return -(-ascii_chars // 4) + (len(text) - ascii_chars)
+
+
+def count_tokens(text, deployment=None):
+    """텍스트의 토큰 수를 반환합니다."""
+    if not text:
+        return 0
+    encoding = _encoding(deployment)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message, deployment=None):
+    """채팅 메시지 하나의 토큰 수 (역할/형식 토큰 포함)를 반환합니다."""
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "", deployment)
+
+
+def count_messages_tokens(messages, deployment=None):
+    """채팅 메시지 목록 전체의 프롬프트 토큰 수를 반환합니다."""
+    return REPLY_PRIMING_TOKENS + sum(count_message_tokens(message, deployment) for message in messages)
+
+
+class TokenUsage:
+    """호출 종류별 프롬프트/응답 토큰 사용량과 프롬프트 캐시 적중, 프롬프트 축소로 아낀 토큰 수를 집계합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def record(self, kind, prompt_tokens=0, completion_tokens=0, cached_tokens=0, saved_tokens=0):
+        """호출 한 번의 토큰 사용량을 기록합니다."""
+        with self._lock:
+            totals = self._kinds.setdefault(kind, {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "saved_tokens": 0
+            })
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens or 0
+            totals["completion_tokens"] += completion_tokens or 0
+            totals["cached_tokens"] += cached_tokens or 0
+            totals["saved_tokens"] += saved_tokens or 0
+
+    def stats(self):
+        """종류별 합계와 호출당 평균 프롬프트 토큰, 캐시 적중 비율을 반환합니다."""
+        with self._lock:
+            kinds = {kind: dict(totals) for kind, totals in self._kinds.items()}
+        for totals in kinds.values():
+            totals["avg_prompt_tokens"] = round(totals["prompt_tokens"] / totals["calls"], 1)
+            totals["cached_ratio"] = round(totals["cached_tokens"] / totals["prompt_tokens"], 4) if totals["prompt_tokens"] else 0.0
+        return kinds